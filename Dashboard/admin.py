@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from Dashboard.models import Student, University, Course, CourseRegistration, StudentDegree, TimePlanBooking, Degree, \
-    ExamOutcome, Semester, CourseSemester
+    ExamOutcome, Semester, CourseSemester, RecurringBooking, RecurringBookingException
 
 """
 In this file the different database models are activated for the admin panel.
@@ -74,3 +74,15 @@ class CourseRegistrationAdmin(admin.ModelAdmin):
 @admin.register(TimePlanBooking)
 class TimePlanBookingAdmin(admin.ModelAdmin):
     list_display = ["course_registration", "from_date", "from_time", "until_date", "until_time"]
+
+
+class RecurringBookingExceptionInline(admin.TabularInline):
+    model = RecurringBookingException
+    extra = 1
+
+
+@admin.register(RecurringBooking)
+class RecurringBookingAdmin(admin.ModelAdmin):
+    list_display = ["course_registration", "start_date", "end_date", "from_time", "until_time", "interval_weeks",
+                    "materialized_until"]
+    inlines = [RecurringBookingExceptionInline]
@@ -0,0 +1,150 @@
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy
+except ImportError:
+    # numpy is an optional dependency of the analytics (requirements-analytics.txt),
+    # the dashboard itself works without it
+    numpy = None
+
+"""
+This file contains the calculations of the university analytics
+
+The database aggregates the raw data to a few rows per course, grade, degree or quarter hour of the week,
+so the number of rows does not grow with the number of students. Those rows are loaded into numpy arrays
+and the statistics of all courses and degrees are calculated at once instead of one after the other.
+"""
+
+# the grades from 1.0 to 6.0 are counted in bins of 0.5, the grade 6.0 is part of the last bin.
+# Other grades are ignored, e.g. the grade 0 that marks a deleted grade
+GRADE_BIN_EDGES = [1.0 + number * 0.5 for number in range(11)]
+
+# exams with a grade up to this grade are passed
+PASSED_GRADE = 4.0
+
+# the progress of a degree is counted in bins of 10 percent, completed degrees are part of the last bin
+PROGRESS_BINS = 10
+
+QUARTERS_PER_WEEK = 7 * 24 * 4
+
+# the 01.01.1970 was a thursday, so the weeks of the minutes since then start three days after a monday
+EPOCH_WEEKDAY = 3
+
+
+def is_analytics_available() -> bool:
+    return numpy is not None
+
+
+class UniversityAnalytics:
+    """
+    This class calculates the statistics of the courses and degrees of a university out of aggregated rows.
+    The results are returned as lists in the order of the given course and degree ids
+    """
+
+    def __init__(self, course_ids: list[int], degree_ids: list[int]):
+        if numpy is None:
+            raise ImproperlyConfigured(
+                "the analytics require numpy, it is installed with: pip install -r requirements-analytics.txt")
+        # the ids are sorted, so the rows are assigned to their course or degree with a binary search
+        self._course_ids = numpy.array(course_ids, dtype=numpy.int64)
+        self._degree_ids = numpy.array(degree_ids, dtype=numpy.int64)
+        self._course_order = numpy.argsort(self._course_ids)
+        self._degree_order = numpy.argsort(self._degree_ids)
+
+    def get_registration_statistics(self, rows) -> tuple[list[int], list[float | None]]:
+        """
+        Calculates the number of registrations and the average spent hours per course
+        out of rows of course id, number of registrations and sum of the spent hours
+        """
+        data = self.__to_array(rows, 3)
+        index = self.__get_index(self._course_ids, self._course_order, data[:, 0])
+        registrations = numpy.bincount(index, weights=data[:, 1], minlength=len(self._course_ids))
+        spent_hours = numpy.bincount(index, weights=data[:, 2], minlength=len(self._course_ids))
+        return registrations.astype(int).tolist(), self.__to_list(self.__divide(spent_hours, registrations))
+
+    def get_exam_statistics(self, rows) -> tuple[list[int], list[float | None], list[float | None], list[list[int]]]:
+        """
+        Calculates the number of exam attempts, the pass rate, the average grade and the grade distribution
+        per course out of rows of course id, grade and number of outcomes. Outcomes with a grade outside
+        of the grade bins are not counted. An exam is passed if its grade is at most PASSED_GRADE
+        """
+        data = self.__to_array(rows, 3)
+        data = data[(data[:, 1] >= GRADE_BIN_EDGES[0]) & (data[:, 1] <= GRADE_BIN_EDGES[-1])]
+        index = self.__get_index(self._course_ids, self._course_order, data[:, 0])
+        grades = data[:, 1]
+        counts = data[:, 2]
+        attempts = numpy.bincount(index, weights=counts, minlength=len(self._course_ids))
+        passed = numpy.bincount(index, weights=counts * (grades <= PASSED_GRADE), minlength=len(self._course_ids))
+        grade_sums = numpy.bincount(index, weights=counts * grades, minlength=len(self._course_ids))
+
+        # the bins include their lower edge, only the last bin also includes its upper edge
+        grade_bins = numpy.searchsorted(GRADE_BIN_EDGES, grades, side="right") - 1
+        grade_bins[grades == GRADE_BIN_EDGES[-1]] = len(GRADE_BIN_EDGES) - 2
+        distributions = numpy.zeros((len(self._course_ids), len(GRADE_BIN_EDGES) - 1))
+        numpy.add.at(distributions, (index, grade_bins), counts)
+        return (attempts.astype(int).tolist(), self.__to_list(self.__divide(passed, attempts), 3),
+                self.__to_list(self.__divide(grade_sums, attempts)), distributions.astype(int).tolist())
+
+    def get_progress_statistics(self, rows) -> \
+            tuple[list[int], list[float | None], list[float | None], list[list[int]]]:
+        """
+        Calculates the number of students, the average and median progress in percent and the progress
+        distribution per degree out of rows of degree id, ects goal, collected ects and number of students
+        """
+        data = self.__to_array(rows, 4)
+        index = self.__get_index(self._degree_ids, self._degree_order, data[:, 0])
+        progress = numpy.divide(data[:, 2] * 100, data[:, 1], out=numpy.zeros(len(data)), where=data[:, 1] > 0)
+        counts = data[:, 3]
+        students = numpy.bincount(index, weights=counts, minlength=len(self._degree_ids))
+        progress_sums = numpy.bincount(index, weights=counts * progress, minlength=len(self._degree_ids))
+
+        progress_bins = numpy.clip((progress // (100 / PROGRESS_BINS)).astype(int), 0, PROGRESS_BINS - 1)
+        distributions = numpy.zeros((len(self._degree_ids), PROGRESS_BINS))
+        numpy.add.at(distributions, (index, progress_bins), counts)
+
+        # the rows are sorted by degree and progress, the median of a degree is the progress at which
+        # the cumulated number of students reaches half of the students of the degree
+        order = numpy.lexsort((progress, index))
+        cumulated_students = numpy.cumsum(counts[order])
+        first_students = numpy.cumsum(students) - students
+        positions = numpy.searchsorted(cumulated_students, first_students + students / 2, side="left")
+        medians = numpy.full(len(self._degree_ids), numpy.nan)
+        has_students = students > 0
+        medians[has_students] = progress[order][positions[has_students]]
+
+        return (students.astype(int).tolist(), self.__to_list(self.__divide(progress_sums, students), 1),
+                self.__to_list(medians, 1), distributions.astype(int).tolist())
+
+    def get_booking_density(self, rows) -> list[list[float]]:
+        """
+        Calculates the booked hours per hour of the week, monday first, out of rows of the quarter hour
+        of the week since 01.01.1970 in which the bookings start, their number of quarter hours and their number
+        """
+        data = self.__to_array(rows, 3).astype(numpy.int64)
+        starts = data[:, 0] % QUARTERS_PER_WEEK
+        ends = starts + numpy.clip(data[:, 1], 0, QUARTERS_PER_WEEK)
+
+        # each booking adds its number at the start and removes it at the end, the cumulated sum is the
+        # number of bookings per quarter hour. Bookings that reach into the next week are folded back
+        changes = numpy.zeros(2 * QUARTERS_PER_WEEK + 1)
+        numpy.add.at(changes, starts, data[:, 2])
+        numpy.add.at(changes, ends, -data[:, 2])
+        bookings = numpy.cumsum(changes)[:2 * QUARTERS_PER_WEEK]
+        bookings = bookings[:QUARTERS_PER_WEEK] + bookings[QUARTERS_PER_WEEK:]
+
+        hours = bookings.reshape(7 * 24, 4).sum(axis=1) / 4
+        return numpy.round(numpy.roll(hours, EPOCH_WEEKDAY * 24), 2).reshape(7, 24).tolist()
+
+    def __to_array(self, rows, columns: int):
+        return numpy.array(list(rows), dtype=float).reshape(-1, columns)
+
+    def __get_index(self, ids, order, row_ids):
+        # rows of unknown ids cannot occur, because the rows are filtered by the university as well
+        return order[numpy.searchsorted(ids, row_ids.astype(numpy.int64), sorter=order)]
+
+    def __divide(self, dividends, divisors):
+        return numpy.divide(dividends, divisors, out=numpy.full(len(dividends), numpy.nan), where=divisors > 0)
+
+    def __to_list(self, values, digits=2) -> list[float | None]:
+        # courses and degrees without data have no value
+        return [None if numpy.isnan(value) else round(float(value), digits) for value in values]
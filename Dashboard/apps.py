@@ -7,3 +7,7 @@ This file contains a django generated class to setup the AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "Dashboard"
+
+    def ready(self):
+        # connect the signal handlers of the dashboard models
+        from Dashboard import signals
@@ -0,0 +1,153 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from threading import Lock
+
+from django.conf import settings
+
+from Dashboard.recurrence import RecurrenceRule
+
+"""
+This file contains the in memory index of the time plan bookings of the students
+which is used to check booking conflicts without a database round trip
+"""
+
+
+class BookingIntervalIndex:
+    """
+    This index stores the minute ranges of all bookings of a student as sorted arrays.
+    The bookings are sorted by their start, additionally the running maximum of the
+    end minutes is stored. With both arrays the range of candidates that may overlap a
+    given range is found with binary searches, so a lookup costs O(log n + k).
+    The rules of the recurring bookings are kept as they are and only expanded within
+    the range of a lookup.
+    """
+    _starts: list[int]
+    _ends: list[int]
+    _max_ends: list[int]
+    _booking_ids: list[int]
+    _rules: list[RecurrenceRule]
+
+    @property
+    def booking_ids(self) -> list[int]:
+        return self._booking_ids
+
+    @property
+    def rules(self) -> list[RecurrenceRule]:
+        return self._rules
+
+    def __init__(self, bookings: list[tuple[int, int, int]], rules: list[RecurrenceRule] = ()):
+        """
+        The bookings are given as tuples of start minute, end minute and booking id
+        """
+        bookings = sorted(bookings)
+        self._starts = [start for start, _, _ in bookings]
+        self._ends = [end for _, end, _ in bookings]
+        self._max_ends = list(accumulate(self._ends, max))
+        self._booking_ids = [booking_id for _, _, booking_id in bookings]
+        self._rules = list(rules)
+
+    def __len__(self):
+        return len(self._booking_ids)
+
+    def get_overlapping(self, start_minute: int, end_minute: int) -> list[int]:
+        """
+        Returns the ids of all bookings that overlap the given minute range
+        """
+        # all bookings before the first index end before the range starts
+        first = bisect_right(self._max_ends, start_minute)
+
+        # all bookings from the last index on start after the range ends
+        last = bisect_left(self._starts, end_minute)
+
+        return [self._booking_ids[x] for x in range(first, last) if self._ends[x] > start_minute]
+
+    def has_overlapping(self, start_minute: int, end_minute: int) -> bool:
+        """
+        Checks if any booking overlaps the given minute range
+        """
+        first = bisect_right(self._max_ends, start_minute)
+        last = bisect_left(self._starts, end_minute)
+        return any(self._ends[x] > start_minute for x in range(first, last)) or any(
+            next(rule.iter_occurrences(start_minute, end_minute), None) is not None for rule in self._rules)
+
+    def iter_free_ranges(self, start_minute: int, end_minute: int):
+        """
+        Yields the ranges within the given minute range that are not covered by any booking
+        or occurrence of a recurring booking as tuples of start and end minute, ordered by their start
+        """
+        first = bisect_right(self._max_ends, start_minute)
+        last = bisect_left(self._starts, end_minute)
+        ranges = zip(self._starts[first:last], self._ends[first:last])
+        if self._rules:
+            # the occurrences within the range are merged with the bookings
+            ranges = sorted([*ranges, *(occurrence for rule in self._rules
+                                        for occurrence in rule.iter_occurrences(start_minute, end_minute))])
+
+        current = start_minute
+        for start, end in ranges:
+            # the ranges are sorted by their start, so everything before the next start is free
+            if start > current:
+                yield current, start
+            current = max(current, end)
+        if current < end_minute:
+            yield current, end_minute
+
+
+class BookingIndexRegistry:
+    """
+    This registry holds the booking indexes of the recently used students for the current process.
+    The indexes are built lazily on first use and dropped if a booking of the student changes.
+    The registry is process local, so each index is stored with the cache versions of the student
+    it was built for. Changes within other processes bump those versions and the index is built again.
+    The least recently used indexes are dropped if more than the maximum number of indexes are held
+    """
+
+    def __init__(self, max_size: int):
+        self._indexes = OrderedDict()
+        self._max_size = max_size
+        self._lock = Lock()
+        # counts the invalidations to detect changes while an index is loaded
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def get(self, student_id: int, loader, rule_loader=None, version=None) -> BookingIntervalIndex:
+        """
+        Returns the index of the student, the loaders are called to fetch the bookings and the rules
+        of the recurring bookings if no index exists for the given version
+        """
+        student_id = int(student_id)
+        with self._lock:
+            stored_version, index = self._indexes.get(student_id, (None, None))
+            if index is not None and stored_version == version:
+                self._indexes.move_to_end(student_id)
+            else:
+                index = None
+            generation = self._generation
+        if index is None:
+            index = BookingIntervalIndex(loader(student_id), rule_loader(student_id) if rule_loader else ())
+            with self._lock:
+                # an index loaded during an invalidation may be outdated and is not kept
+                if generation == self._generation:
+                    self._indexes[student_id] = (version, index)
+                    self._indexes.move_to_end(student_id)
+                    while len(self._indexes) > self._max_size:
+                        self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, student_id: int | None = None):
+        """
+        Drops the index of the student, if no student is given all indexes are dropped
+        """
+        with self._lock:
+            self._generation += 1
+            if student_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(int(student_id), None)
+
+
+# the registry that is shared by the services of the process
+booking_index_registry = BookingIndexRegistry(settings.DASHBOARD_BOOKING_INDEX_SIZE)
@@ -0,0 +1,104 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from Dashboard.metrics import CACHE_REQUESTS_TOTAL
+
+"""
+This file contains the versioned cache of the dashboard sections
+
+Each student has a version counter which is bumped whenever data of the student changes,
+data shared by all students like universities and courses is covered by a global version.
+Cached sections contain the versions in their key, so a bump makes the old entries unreachable
+and no entries need to be deleted.
+"""
+
+# marker to distinguish a cache miss from a cached None value
+CACHE_MISS = object()
+
+GLOBAL_VERSION_KEY = "dashboard:version"
+STUDENT_VERSION_KEY = "dashboard:version:student:{}"
+
+
+def get_version_keys(student_id: int | None) -> list[str]:
+    return [GLOBAL_VERSION_KEY] + ([STUDENT_VERSION_KEY.format(student_id)] if student_id is not None else [])
+
+
+def bump_version(key: str):
+    """
+    Increases a version counter. A missing counter is started with the current time,
+    so that a counter that was evicted from the cache never returns an old version again
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_student_version(student_id: int | None):
+    """
+    Invalidates all cached sections of the student, if no student is given all sections are invalidated
+    """
+    bump_version(STUDENT_VERSION_KEY.format(student_id) if student_id is not None else GLOBAL_VERSION_KEY)
+
+
+def bump_global_version():
+    """
+    Invalidates the cached sections of all students
+    """
+    bump_version(GLOBAL_VERSION_KEY)
+
+
+class DashboardCache:
+    """
+    This class caches the sections of the dashboard for a student.
+    The versions are fetched once when the first section is requested and reused for the
+    other sections, so an instance should only be used within one request.
+    """
+
+    def __init__(self, student_id: int | None = None, enabled: bool = True):
+        self._student_id = student_id
+        self._enabled = enabled
+        self._versions = None
+
+    def get_versions(self) -> list[int]:
+        if self._versions is None:
+            keys = get_version_keys(self._student_id)
+            versions = cache.get_many(keys)
+
+            # start missing counters so that the following requests find the same versions
+            for key in keys:
+                if key not in versions:
+                    cache.add(key, time.time_ns(), None)
+                    versions[key] = cache.get(key)
+            self._versions = [versions[key] for key in keys]
+        return self._versions
+
+    def get_etag(self, *key_parts) -> str:
+        """
+        Returns an etag that changes whenever the versions or the given key parts change
+        """
+        return hashlib.md5(repr([self._student_id, *self.get_versions(), *key_parts]).encode()).hexdigest()
+
+    def get_or_set(self, section: str, loader, *key_parts, timeout: int | None = None):
+        """
+        Returns the cached section for the given key parts, the loader is called on a cache miss.
+        Sections that do not follow the versions of the students can be cached with a shorter timeout
+        """
+        if not self._enabled:
+            return loader()
+
+        # the key parts may contain request parameters, so they are hashed to get a valid cache key
+        parts_hash = hashlib.md5(repr(key_parts).encode()).hexdigest()
+        key = ":".join(str(x) for x in ["dashboard", section, self._student_id, *self.get_versions(), parts_hash])
+        value = cache.get(key, CACHE_MISS)
+        if value is not CACHE_MISS:
+            CACHE_REQUESTS_TOTAL.labels(section=section, result="hit").inc()
+            return value
+
+        CACHE_REQUESTS_TOTAL.labels(section=section, result="miss").inc()
+        value = loader()
+        cache.set(key, value, timeout if timeout is not None else settings.DASHBOARD_CACHE_TIMEOUT)
+        return value
@@ -1,5 +1,7 @@
 from datetime import datetime, time, date
 
+from Dashboard.occupancy import WeekOccupancy
+
 """
 This file contains all data transfer objects (DTO)
 """
@@ -198,6 +200,474 @@ class CourseDto:
         self._grade = grade
 
 
+class CoursePageDto:
+    """
+    This DTO stores the courses of one page of the course list and the page navigation details
+    """
+    _courses: list[CourseDto]
+    _number: int
+    _num_pages: int
+
+    @property
+    def courses(self) -> list[CourseDto]:
+        return self._courses
+
+    @courses.setter
+    def courses(self, courses: list[CourseDto]):
+        self._courses = courses
+
+    @property
+    def number(self) -> int:
+        return self._number
+
+    @number.setter
+    def number(self, number: int):
+        self._number = number
+
+    @property
+    def num_pages(self) -> int:
+        return self._num_pages
+
+    @num_pages.setter
+    def num_pages(self, num_pages: int):
+        self._num_pages = num_pages
+
+    @property
+    def has_previous(self) -> bool:
+        return self._number > 1
+
+    @property
+    def has_next(self) -> bool:
+        return self._number < self._num_pages
+
+    @property
+    def previous_page_number(self) -> int:
+        return self._number - 1
+
+    @property
+    def next_page_number(self) -> int:
+        return self._number + 1
+
+    def __iter__(self):
+        return iter(self._courses)
+
+    def __len__(self):
+        return len(self._courses)
+
+    def __init__(self, courses: list[CourseDto], number: int, num_pages: int):
+        self._courses = courses
+        self._number = number
+        self._num_pages = num_pages
+
+
+class FreeSlotDto:
+    """
+    This DTO stores a free time range of the calendar that can be booked
+    """
+    _start: datetime
+    _end: datetime
+
+    @property
+    def start(self) -> datetime:
+        return self._start
+
+    @start.setter
+    def start(self, start: datetime):
+        self._start = start
+
+    @property
+    def end(self) -> datetime:
+        return self._end
+
+    @end.setter
+    def end(self, end: datetime):
+        self._end = end
+
+    @property
+    def date(self) -> date:
+        return self._start.date()
+
+    @property
+    def from_time(self) -> time:
+        return self._start.time()
+
+    @property
+    def until_time(self) -> time:
+        return self._end.time()
+
+    def __init__(self, start: datetime, end: datetime):
+        self._start = start
+        self._end = end
+
+
+class StudyPlanDto:
+    """
+    This DTO stores the sessions proposed by the study plan scheduler as unsaved bookings
+    and the hours per course registration that did not fit until the target date
+    """
+    _bookings: list
+    _unscheduled_hours: dict
+
+    @property
+    def bookings(self) -> list:
+        return self._bookings
+
+    @bookings.setter
+    def bookings(self, bookings: list):
+        self._bookings = bookings
+
+    @property
+    def unscheduled_hours(self) -> dict:
+        return self._unscheduled_hours
+
+    @unscheduled_hours.setter
+    def unscheduled_hours(self, unscheduled_hours: dict):
+        self._unscheduled_hours = unscheduled_hours
+
+    @property
+    def planned_hours(self) -> float:
+        return sum(booking.end_minute - booking.start_minute for booking in self._bookings) / 60
+
+    def __init__(self, bookings: list, unscheduled_hours: dict):
+        self._bookings = bookings
+        self._unscheduled_hours = unscheduled_hours
+
+
+class BookingImportDto:
+    """
+    This DTO stores the result of a booking import with the number of imported bookings
+    and the rejected rows as tuples of line number and error
+    """
+    _imported: int
+    _errors: list[tuple[int, str]]
+
+    @property
+    def imported(self) -> int:
+        return self._imported
+
+    @imported.setter
+    def imported(self, imported: int):
+        self._imported = imported
+
+    @property
+    def errors(self) -> list[tuple[int, str]]:
+        return self._errors
+
+    @errors.setter
+    def errors(self, errors: list[tuple[int, str]]):
+        self._errors = errors
+
+    def __init__(self, imported: int, errors: list[tuple[int, str]]):
+        self._imported = imported
+        self._errors = errors
+
+
+class CatalogImportDto:
+    """
+    This DTO stores the result of a catalog import with the changes as tuples of action, entry type
+    and description, e.g. ("update", "course", "Degree / Course: ects_points 5 -> 6"), and the
+    rejected rows as tuples of line and error
+    """
+    _changes: list[tuple[str, str, str]]
+    _errors: list[tuple[int | str, str]]
+
+    @property
+    def changes(self) -> list[tuple[str, str, str]]:
+        return self._changes
+
+    @changes.setter
+    def changes(self, changes: list[tuple[str, str, str]]):
+        self._changes = changes
+
+    @property
+    def errors(self) -> list[tuple[int | str, str]]:
+        return self._errors
+
+    @errors.setter
+    def errors(self, errors: list[tuple[int | str, str]]):
+        self._errors = errors
+
+    @property
+    def change_counts(self) -> dict[tuple[str, str], int]:
+        # the number of changes per action and entry type
+        counts = {}
+        for action, entry_type, _ in self._changes:
+            counts[(action, entry_type)] = counts.get((action, entry_type), 0) + 1
+        return counts
+
+    def __init__(self, changes: list[tuple[str, str, str]], errors: list[tuple[int | str, str]]):
+        self._changes = changes
+        self._errors = errors
+
+
+class CourseAnalyticsDto:
+    """
+    This DTO stores the statistics of a course over all students of the university,
+    the grade distribution contains the number of exam outcomes per grade bin of 0.5
+    """
+    _course_id: int
+    _name: str
+    _degree_name: str
+    _expected_hours: float
+    _registrations: int
+    _average_spent_hours: float | None
+    _exam_attempts: int
+    _pass_rate: float | None
+    _average_grade: float | None
+    _grade_distribution: list[int]
+
+    @property
+    def course_id(self) -> int:
+        return self._course_id
+
+    @course_id.setter
+    def course_id(self, course_id: int):
+        self._course_id = course_id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
+
+    @property
+    def degree_name(self) -> str:
+        return self._degree_name
+
+    @degree_name.setter
+    def degree_name(self, degree_name: str):
+        self._degree_name = degree_name
+
+    @property
+    def expected_hours(self) -> float:
+        return self._expected_hours
+
+    @expected_hours.setter
+    def expected_hours(self, expected_hours: float):
+        self._expected_hours = expected_hours
+
+    @property
+    def registrations(self) -> int:
+        return self._registrations
+
+    @registrations.setter
+    def registrations(self, registrations: int):
+        self._registrations = registrations
+
+    @property
+    def average_spent_hours(self) -> float | None:
+        return self._average_spent_hours
+
+    @average_spent_hours.setter
+    def average_spent_hours(self, average_spent_hours: float | None):
+        self._average_spent_hours = average_spent_hours
+
+    @property
+    def exam_attempts(self) -> int:
+        return self._exam_attempts
+
+    @exam_attempts.setter
+    def exam_attempts(self, exam_attempts: int):
+        self._exam_attempts = exam_attempts
+
+    @property
+    def pass_rate(self) -> float | None:
+        return self._pass_rate
+
+    @pass_rate.setter
+    def pass_rate(self, pass_rate: float | None):
+        self._pass_rate = pass_rate
+
+    @property
+    def average_grade(self) -> float | None:
+        return self._average_grade
+
+    @average_grade.setter
+    def average_grade(self, average_grade: float | None):
+        self._average_grade = average_grade
+
+    @property
+    def grade_distribution(self) -> list[int]:
+        return self._grade_distribution
+
+    @grade_distribution.setter
+    def grade_distribution(self, grade_distribution: list[int]):
+        self._grade_distribution = grade_distribution
+
+    @property
+    def spent_ratio(self) -> float | None:
+        # the share of the expected hours that the students spent on average
+        if self._average_spent_hours is None or not self._expected_hours:
+            return None
+        return round(self._average_spent_hours / self._expected_hours, 2)
+
+    def __init__(self, course_id: int, name: str, degree_name: str, expected_hours: float, registrations: int,
+                 average_spent_hours: float | None, exam_attempts: int, pass_rate: float | None,
+                 average_grade: float | None, grade_distribution: list[int]):
+        self._course_id = course_id
+        self._name = name
+        self._degree_name = degree_name
+        self._expected_hours = expected_hours
+        self._registrations = registrations
+        self._average_spent_hours = average_spent_hours
+        self._exam_attempts = exam_attempts
+        self._pass_rate = pass_rate
+        self._average_grade = average_grade
+        self._grade_distribution = grade_distribution
+
+
+class DegreeAnalyticsDto:
+    """
+    This DTO stores the ects progress of the students of a degree in percent of the ects goal,
+    the progress distribution contains the number of students per bin of 10 percent
+    """
+    _degree_id: int
+    _name: str
+    _ects_goal: int
+    _students: int
+    _average_progress: float | None
+    _median_progress: float | None
+    _progress_distribution: list[int]
+
+    @property
+    def degree_id(self) -> int:
+        return self._degree_id
+
+    @degree_id.setter
+    def degree_id(self, degree_id: int):
+        self._degree_id = degree_id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
+
+    @property
+    def ects_goal(self) -> int:
+        return self._ects_goal
+
+    @ects_goal.setter
+    def ects_goal(self, ects_goal: int):
+        self._ects_goal = ects_goal
+
+    @property
+    def students(self) -> int:
+        return self._students
+
+    @students.setter
+    def students(self, students: int):
+        self._students = students
+
+    @property
+    def average_progress(self) -> float | None:
+        return self._average_progress
+
+    @average_progress.setter
+    def average_progress(self, average_progress: float | None):
+        self._average_progress = average_progress
+
+    @property
+    def median_progress(self) -> float | None:
+        return self._median_progress
+
+    @median_progress.setter
+    def median_progress(self, median_progress: float | None):
+        self._median_progress = median_progress
+
+    @property
+    def progress_distribution(self) -> list[int]:
+        return self._progress_distribution
+
+    @progress_distribution.setter
+    def progress_distribution(self, progress_distribution: list[int]):
+        self._progress_distribution = progress_distribution
+
+    def __init__(self, degree_id: int, name: str, ects_goal: int, students: int, average_progress: float | None,
+                 median_progress: float | None, progress_distribution: list[int]):
+        self._degree_id = degree_id
+        self._name = name
+        self._ects_goal = ects_goal
+        self._students = students
+        self._average_progress = average_progress
+        self._median_progress = median_progress
+        self._progress_distribution = progress_distribution
+
+
+class UniversityAnalyticsDto:
+    """
+    This DTO stores the analytics of a university, the booking density contains the booked hours
+    of all students per hour of the week with monday first
+    """
+    _university_id: int
+    _university_name: str
+    _courses: list[CourseAnalyticsDto]
+    _degrees: list[DegreeAnalyticsDto]
+    _booking_density: list[list[float]]
+    _created: datetime
+
+    @property
+    def university_id(self) -> int:
+        return self._university_id
+
+    @university_id.setter
+    def university_id(self, university_id: int):
+        self._university_id = university_id
+
+    @property
+    def university_name(self) -> str:
+        return self._university_name
+
+    @university_name.setter
+    def university_name(self, university_name: str):
+        self._university_name = university_name
+
+    @property
+    def courses(self) -> list[CourseAnalyticsDto]:
+        return self._courses
+
+    @courses.setter
+    def courses(self, courses: list[CourseAnalyticsDto]):
+        self._courses = courses
+
+    @property
+    def degrees(self) -> list[DegreeAnalyticsDto]:
+        return self._degrees
+
+    @degrees.setter
+    def degrees(self, degrees: list[DegreeAnalyticsDto]):
+        self._degrees = degrees
+
+    @property
+    def booking_density(self) -> list[list[float]]:
+        return self._booking_density
+
+    @booking_density.setter
+    def booking_density(self, booking_density: list[list[float]]):
+        self._booking_density = booking_density
+
+    @property
+    def created(self) -> datetime:
+        return self._created
+
+    @created.setter
+    def created(self, created: datetime):
+        self._created = created
+
+    def __init__(self, university_id: int, university_name: str, courses: list[CourseAnalyticsDto],
+                 degrees: list[DegreeAnalyticsDto], booking_density: list[list[float]], created: datetime):
+        self._university_id = university_id
+        self._university_name = university_name
+        self._courses = courses
+        self._degrees = degrees
+        self._booking_density = booking_density
+        self._created = created
+
+
 class TimeSlotDto:
     """
     This DTO stores the content of the time slot and also the time blocks
@@ -257,13 +727,108 @@ class TimeSlotDto:
             self._booked = True
 
 
+class CalendarBlockDto:
+    """
+    This DTO stores consecutive time slots of a weekday with the same content as one block,
+    empty slots are merged into blocks as well
+    """
+    _start_time: time
+    _span: int
+    _entry_name: str
+    _bg_color: str
+    _fg_color: str
+
+    @property
+    def start_time(self) -> time:
+        return self._start_time
+
+    @start_time.setter
+    def start_time(self, start_time: time):
+        self._start_time = start_time
+
+    @property
+    def start_slot(self) -> int:
+        return self._start_time.hour * 4 + self._start_time.minute // 15
+
+    @property
+    def span(self) -> int:
+        return self._span
+
+    @span.setter
+    def span(self, span: int):
+        self._span = span
+
+    @property
+    def entry_name(self) -> str:
+        return self._entry_name
+
+    @entry_name.setter
+    def entry_name(self, entry_name: str):
+        self._entry_name = entry_name
+
+    @property
+    def bg_color(self) -> str:
+        return self._bg_color
+
+    @bg_color.setter
+    def bg_color(self, bg_color: str):
+        self._bg_color = bg_color
+
+    @property
+    def fg_color(self) -> str:
+        return self._fg_color
+
+    @fg_color.setter
+    def fg_color(self, fg_color: str):
+        self._fg_color = fg_color
+
+    @property
+    def booked(self) -> bool:
+        return bool(self._entry_name)
+
+    def __init__(self, start_time: time, span: int, entry_name: str = "", bg_color: str = "", fg_color: str = ""):
+        self._start_time = start_time
+        self._span = span
+        self._entry_name = entry_name
+        self._bg_color = bg_color
+        self._fg_color = fg_color
+
+
+class CalendarRowDto:
+    """
+    This DTO stores a row of the calendar table with the blocks of the weekdays that start within it,
+    the weekdays that are covered by a block of a previous row have no entry
+    """
+    _slot_time: time
+    _blocks: list[CalendarBlockDto]
+
+    @property
+    def slot_time(self) -> time:
+        return self._slot_time
+
+    @property
+    def label(self) -> str:
+        return self._slot_time.strftime("%H:%M")
+
+    @property
+    def blocks(self) -> list[CalendarBlockDto]:
+        return self._blocks
+
+    def __init__(self, slot_time: time):
+        self._slot_time = slot_time
+        self._blocks = []
+
+
 class WeekDayDto:
     """
-    This DTO stores the time bookings of the weekdays
+    This DTO stores the time bookings of the weekdays.
+    The time slots and blocks are built from the occupancy of the week when they are accessed first
     """
     _day: int
     _date: date
+    _occupancy: WeekOccupancy | None
     _time_slots = list[tuple()]
+    _blocks: list[CalendarBlockDto]
 
     @property
     def day(self) -> int:
@@ -283,16 +848,44 @@ class WeekDayDto:
 
     @property
     def time_slots(self) -> list[tuple]:
+        """
+        Returns a tuple of the hour and its 4 time slots for each of the 24 hours
+        """
+        if self._time_slots is None:
+            self._time_slots = []
+            for hour in range(0, 24):
+                time_blocks = []
+                for slot in range(hour * 4, hour * 4 + 4):
+                    booking = self._occupancy.get_booking(self._day, slot) if self._occupancy else None
+                    time_blocks.append(TimeSlotDto(time(hour, slot % 4 * 15), *(booking or ())))
+                self._time_slots.append((hour, time_blocks))
         return self._time_slots
 
     @time_slots.setter
     def time_slots(self, time_slots: list[tuple]):
         self._time_slots = time_slots
 
-    def __init__(self, day: int, week_date: datetime.date):
+    @property
+    def blocks(self) -> list[CalendarBlockDto]:
+        """
+        Returns the consecutive time slots with the same booking, or no booking, merged into blocks
+        """
+        if self._blocks is None:
+            runs = self._occupancy.get_runs(self._day) if self._occupancy else [(0, 24 * 4, None)]
+            self._blocks = [CalendarBlockDto(time(start_slot // 4, start_slot % 4 * 15), span, *(booking or ()))
+                            for start_slot, span, booking in runs]
+        return self._blocks
+
+    @blocks.setter
+    def blocks(self, blocks: list[CalendarBlockDto]):
+        self._blocks = blocks
+
+    def __init__(self, day: int, week_date: datetime.date, occupancy: WeekOccupancy | None = None):
         self._day = day
         self._date = week_date
-        self.time_slots = []
+        self._occupancy = occupancy
+        self._time_slots = None
+        self._blocks = None
 
 
 class WeekDto:
@@ -301,6 +894,7 @@ class WeekDto:
     """
     _week_number: int
     _week_days: list[WeekDayDto]
+    _occupancy: WeekOccupancy | None
 
     @property
     def week_number(self) -> int:
@@ -318,6 +912,22 @@ class WeekDto:
     def week_days(self, week_days: list[WeekDayDto]):
         self._week_days = week_days
 
-    def __init__(self, week_number: int):
+    @property
+    def occupancy(self) -> WeekOccupancy | None:
+        return self._occupancy
+
+    @property
+    def calendar_rows(self) -> list[CalendarRowDto]:
+        """
+        Arranges the blocks of the weekdays by their start into the 96 rows of 15 minutes of the calendar table
+        """
+        rows = [CalendarRowDto(time(slot // 4, slot % 4 * 15)) for slot in range(0, 24 * 4)]
+        for week_day in self._week_days:
+            for block in week_day.blocks:
+                rows[block.start_slot].blocks.append(block)
+        return rows
+
+    def __init__(self, week_number: int, occupancy: WeekOccupancy | None = None):
         self._week_number = week_number
+        self._occupancy = occupancy
         self.week_days = []
@@ -0,0 +1,192 @@
+import csv
+import json
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+from Dashboard.models import TimePlanBooking
+
+"""
+This file contains the writers of the files that are exported out of the dashboard
+
+The writers receive the rows as iterator and yield the file in chunks of text, so an export
+is streamed to the client and never built completely in memory.
+"""
+
+# columns of the transcript csv files, each row is a course registration of a student
+TRANSCRIPT_CSV_COLUMNS = ["student_id", "first_name", "last_name", "degree_id", "degree", "ects_goal", "ects_collected",
+                          "progress", "course_id", "course", "ects_points", "expected_hours", "spent_hours",
+                          "completed", "exam_attempts", "passed", "grade"]
+
+
+class GroupedRows:
+    """
+    This class reads rows that are sorted by their first value and returns the rows of one key after the other.
+    The keys have to be requested in ascending order, the rows of keys that are not requested are skipped
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._next_row = next(self._rows, None)
+
+    def pop(self, key) -> list[tuple]:
+        rows = []
+        while self._next_row is not None and self._next_row[0] <= key:
+            if self._next_row[0] == key:
+                rows.append(self._next_row)
+            self._next_row = next(self._rows, None)
+        return rows
+
+
+class TranscriptJsonlWriter:
+    """
+    This writer yields a json line per transcript of a student
+    """
+
+    def __init__(self, transcripts, transcripts_per_chunk=100):
+        self._transcripts = transcripts
+        self._transcripts_per_chunk = transcripts_per_chunk
+
+    def __iter__(self):
+        lines = []
+        for transcript in self._transcripts:
+            lines.append(json.dumps(transcript) + "\n")
+            if len(lines) >= self._transcripts_per_chunk:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+
+
+class TranscriptCsvWriter:
+    """
+    This writer yields a csv row per course registration of the transcripts. The degree columns contain
+    the degree of the course, students without registrations are written as one row without a course
+    """
+
+    def __init__(self, transcripts, transcripts_per_chunk=100):
+        self._transcripts = transcripts
+        self._transcripts_per_chunk = transcripts_per_chunk
+
+    def __iter__(self):
+        # the csv writer writes into a list, which is joined to a chunk
+        lines = []
+        writer = csv.writer(ListWriter(lines), lineterminator="\r\n")
+        writer.writerow(TRANSCRIPT_CSV_COLUMNS)
+        for number, transcript in enumerate(self._transcripts, start=1):
+            writer.writerows(self.__get_rows(transcript))
+            if number % self._transcripts_per_chunk == 0:
+                yield "".join(lines)
+                lines.clear()
+        yield "".join(lines)
+
+    def __get_rows(self, transcript: dict):
+        student = [transcript["student_id"], transcript["first_name"], transcript["last_name"]]
+        degrees = {degree["degree_id"]: degree for degree in transcript["degrees"]}
+        if not transcript["courses"]:
+            degree = transcript["degrees"][0] if transcript["degrees"] else None
+            yield student + self.__get_degree_columns(degree, None) + [""] * 9
+        for course in transcript["courses"]:
+            exams = course["exams"]
+            passed_exams = [exam for exam in exams if exam["passed"]]
+            # the grade of the passed exam is exported, otherwise the grade of the last attempt
+            grade = passed_exams[-1]["grade"] if passed_exams else exams[-1]["grade"] if exams else ""
+            yield student + self.__get_degree_columns(degrees.get(course["degree_id"]), course["degree_id"]) + [
+                course["course_id"], course["name"], course["ects_points"], course["expected_hours"],
+                course["spent_hours"], course["completed"], len(exams), bool(passed_exams), grade]
+
+    def __get_degree_columns(self, degree: dict | None, degree_id: int | None) -> list:
+        if degree is None:
+            return [degree_id if degree_id is not None else "", "", "", "", ""]
+        return [degree["degree_id"], degree["name"], degree["ects_goal"], degree["ects_collected"], degree["progress"]]
+
+
+# writers and content types of the transcript export formats
+TRANSCRIPT_FORMATS = {
+    "csv": (TranscriptCsvWriter, "text/csv; charset=utf-8"),
+    "jsonl": (TranscriptJsonlWriter, "application/jsonl; charset=utf-8"),
+}
+
+
+class ListWriter:
+    """
+    This class collects the lines of a csv writer in a list
+    """
+
+    def __init__(self, lines: list[str]):
+        self._lines = lines
+
+    def write(self, line: str):
+        self._lines.append(line)
+
+
+class IcsFeedWriter:
+    """
+    This writer yields an iCalendar feed out of events. An event is a tuple of uid, start and end
+    minute since 01.01.1970, course name, background and foreground color. The summary of an event is
+    the course and the colors are added as categories, so the feed can be imported again
+    """
+
+    def __init__(self, events, calendar_name: str, events_per_chunk=200):
+        self._events = events
+        self._calendar_name = calendar_name
+        self._events_per_chunk = events_per_chunk
+        self._local_zone = ZoneInfo(settings.TIME_ZONE)
+
+    def __iter__(self):
+        # all events are stamped with the time the feed was generated
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        yield self.__join([
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//Dashboard//Time plan//EN",
+            "CALSCALE:GREGORIAN",
+            f"X-WR-CALNAME:{self.__escape_text(self._calendar_name)}",
+        ])
+
+        # the events are joined to chunks, a response with a chunk per line would be slow
+        lines = []
+        for uid, start_minute, end_minute, course_name, bg_color, fg_color in self._events:
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{uid}",
+                f"DTSTAMP:{timestamp}",
+                f"DTSTART:{self.__format_minute(start_minute)}",
+                f"DTEND:{self.__format_minute(end_minute)}",
+                f"SUMMARY:{self.__escape_text(course_name)}",
+                f"CATEGORIES:{self.__escape_text(bg_color)},{self.__escape_text(fg_color)}",
+                "END:VEVENT",
+            ]
+            if len(lines) >= 8 * self._events_per_chunk:
+                yield self.__join(lines)
+                lines = []
+        yield self.__join(lines + ["END:VCALENDAR"])
+
+    def __format_minute(self, minute: int) -> str:
+        # the bookings are saved in local time, the feed contains the times in utc
+        return TimePlanBooking.from_minute(minute).replace(tzinfo=self._local_zone).astimezone(
+            timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    def __escape_text(self, value: str) -> str:
+        return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+    def __join(self, lines: list[str]) -> str:
+        return "".join(self.__fold(line) + "\r\n" for line in lines)
+
+    def __fold(self, line: str) -> str:
+        """
+        Folds a content line into lines of at most 75 octets, the continuation lines start with a space
+        """
+        if len(line.encode()) <= 75:
+            return line
+        parts = []
+        part = ""
+        for character in line:
+            # the continuation lines have one octet less because of the leading space
+            if len((part + character).encode()) > (75 if not parts else 74):
+                parts.append(part)
+                part = ""
+            part += character
+        parts.append(part)
+        return "\r\n ".join(parts)
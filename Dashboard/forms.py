@@ -1,6 +1,11 @@
+from datetime import datetime, time, timedelta
+
 from django import forms
+from django.conf import settings
 from django.core.exceptions import ValidationError
 
+from Dashboard.models import TimePlanBooking
+
 """
 This file contains all django forms for validations of input data
 """
@@ -94,6 +99,7 @@ class TimePlanManagementForm(forms.Form):
     from_time = forms.TimeField(required=True)
     until_date = forms.DateField(required=True)
     until_time = forms.TimeField(required=True)
+    repeat_until = forms.DateField(required=False)
 
     def clean(self):
         clean_data = self.cleaned_data
@@ -129,8 +135,169 @@ class TimePlanManagementForm(forms.Form):
         if from_date == to_date and from_time >= until_time:
             raise ValidationError(f'Fromtime {from_time} must be before Untiltime {until_time}')
 
+        calendar_service = CalendarService()
+
+        # a repeated booking takes place every week until the repeat date, each occurrence is checked
+        repeat_until = clean_data.get("repeat_until")
+        if repeat_until:
+            if repeat_until <= from_date:
+                raise ValidationError(f'Repeatdate {repeat_until} must be after Fromdate {from_date}')
+            if repeat_until > from_date + timedelta(days=366):
+                raise ValidationError(f'Repeatdate {repeat_until} must be within one year')
+
+            conflict_date = calendar_service.get_recurring_booking_conflict(student_id, from_date, from_time,
+                                                                            until_time, repeat_until)
+            if conflict_date is not None:
+                raise ValidationError(f'Booking are conflicting on {conflict_date.strftime("%d.%m.%Y")}, '
+                                      f'please choose another date or time')
+            return clean_data
+
         # check if there is already an entry within the given timespan
-        if CalendarService().get_time_plan_booking_between(student_id, from_date, from_time, until_time).exists():
+        if calendar_service.has_time_plan_booking_conflict(student_id, from_date, from_time, until_time):
+            # suggest the next free time with the same duration instead of letting the user guess
+            start = datetime.combine(from_date, from_time)
+            free_slots = calendar_service.find_free_slots(
+                student_id, datetime.combine(to_date, until_time) - start,
+                (start, start + timedelta(days=settings.DASHBOARD_FREE_SLOT_DAYS)), limit=1)
+            if free_slots:
+                raise ValidationError(f'Booking are conflicting, the next free time is '
+                                      f'{free_slots[0].start.strftime("%d.%m.%Y %H:%M")} - '
+                                      f'{free_slots[0].until_time.strftime("%H:%M")}')
             raise ValidationError(f'Booking are conflicting, please choose another date or time')
 
         return clean_data
+
+
+class FreeSlotForm(forms.Form):
+    """
+    This form is used to search free slots for a new time plan entry of the selected student
+    """
+    duration = forms.IntegerField(min_value=15, max_value=12 * 60, required=True)
+    from_date = forms.DateField(required=False)
+    days = forms.IntegerField(min_value=1, max_value=92, required=False)
+    limit = forms.IntegerField(min_value=1, max_value=20, required=False)
+
+    def clean(self):
+        clean_data = self.cleaned_data
+
+        # the search starts now if no date or the current date is given, the past is never searched
+        now = datetime.now().replace(second=0, microsecond=0)
+        from_date = clean_data.get("from_date")
+        clean_data["window_start"] = now if from_date is None or from_date <= now.date() else \
+            datetime.combine(from_date, time(0, 0))
+
+        days = clean_data.get("days") or settings.DASHBOARD_FREE_SLOT_DAYS
+        clean_data["window_end"] = datetime.combine(clean_data["window_start"].date() + timedelta(days=days),
+                                                    time(0, 0))
+        clean_data["limit"] = clean_data.get("limit") or 5
+        return clean_data
+
+
+class StudyPlanForm(forms.Form):
+    """
+    This form is used to plan learning sessions for the open courses of the selected student
+    """
+    until_date = forms.DateField(required=True)
+    daily_hours = forms.FloatField(min_value=0.5, max_value=12, required=True)
+    session_hours = forms.FloatField(min_value=0.5, max_value=4, required=False)
+
+    def clean(self):
+        clean_data = self.cleaned_data
+        until_date = clean_data.get("until_date")
+
+        # the sessions are planned from the next quarter hour on until the end of the target date
+        now = datetime.now().replace(second=0, microsecond=0)
+        clean_data["window_start"] = now + timedelta(minutes=15 - now.minute % 15)
+        if until_date is not None:
+            if until_date < now.date():
+                raise ValidationError(f'Untildate {until_date} must not be in the past')
+            if until_date > now.date() + timedelta(days=366):
+                raise ValidationError(f'Untildate {until_date} must be within one year')
+            clean_data["window_end"] = datetime.combine(until_date + timedelta(days=1), time(0, 0))
+
+        clean_data["session_hours"] = clean_data.get("session_hours") or 2
+        return clean_data
+
+
+class BookingImportRowForm(forms.Form):
+    """
+    This form is used to validate a row of an imported file with the rules of the time plan form,
+    the course and the conflicts are checked for all rows together by the import
+    """
+    course = forms.CharField(required=True)
+    from_date = forms.DateField(required=True)
+    from_time = forms.TimeField(required=True)
+    until_date = forms.DateField(required=True)
+    until_time = forms.TimeField(required=True)
+
+    def clean(self):
+        clean_data = self.cleaned_data
+        if self.errors:
+            return clean_data
+
+        from_date = clean_data["from_date"]
+        from_time = clean_data["from_time"]
+        until_time = clean_data["until_time"]
+
+        # to reduce complexity only allow bookings on the same day
+        if from_date != clean_data["until_date"]:
+            raise ValidationError(f'currently only bookings on the same day are allowed')
+
+        # the times are rounded down to 15 min steps like the time plan form does it
+        clean_data["from_time"] = time(from_time.hour, from_time.minute - from_time.minute % 15)
+        clean_data["until_time"] = time(until_time.hour, until_time.minute - until_time.minute % 15)
+        if clean_data["from_time"] >= clean_data["until_time"]:
+            raise ValidationError(f'Fromtime {from_time} must be before Untiltime {until_time} in 15 min steps')
+
+        return clean_data
+
+
+class CatalogRowForm(forms.Form):
+    """
+    This form is used to validate a row of an imported catalog, a row without course only defines
+    the degree and the semester
+    """
+    degree = forms.CharField(max_length=255, required=True)
+    ects_goal = forms.IntegerField(min_value=1, required=True)
+    semester = forms.IntegerField(min_value=1, required=False)
+    semester_name = forms.CharField(max_length=255, required=False)
+    course = forms.CharField(max_length=255, required=False)
+    ects_points = forms.IntegerField(min_value=0, required=False)
+    expected_hours = forms.FloatField(min_value=0, required=False)
+    bg_color = forms.RegexField(regex=r"^#[0-9a-fA-F]{6}$", required=False)
+    fg_color = forms.RegexField(regex=r"^#[0-9a-fA-F]{6}$", required=False)
+
+    def clean(self):
+        clean_data = self.cleaned_data
+        if self.errors:
+            return clean_data
+
+        if clean_data["course"] and (clean_data["ects_points"] is None or clean_data["expected_hours"] is None):
+            raise ValidationError(f'the course {clean_data["course"]} needs ects points and expected hours')
+        if clean_data["semester_name"] and clean_data["semester"] is None:
+            raise ValidationError(f'the semester {clean_data["semester_name"]} needs a number')
+        return clean_data
+
+
+class CalendarFeedForm(forms.Form):
+    """
+    This form is used to limit the calendar feed of a student to a range of days, both days are included
+    """
+    from_date = forms.DateField(required=False)
+    to_date = forms.DateField(required=False)
+
+    def clean(self):
+        clean_data = self.cleaned_data
+        if self.errors:
+            return clean_data
+
+        from_date = clean_data.get("from_date")
+        to_date = clean_data.get("to_date")
+        if from_date is not None and to_date is not None and from_date > to_date:
+            raise ValidationError(f'From {from_date} must not be after to {to_date}')
+
+        clean_data["start_minute"] = TimePlanBooking.to_minute(from_date, time(0, 0)) \
+            if from_date is not None else None
+        clean_data["end_minute"] = TimePlanBooking.to_minute(to_date + timedelta(days=1), time(0, 0)) \
+            if to_date is not None else None
+        return clean_data
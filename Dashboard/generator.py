@@ -0,0 +1,252 @@
+import random
+from datetime import date, time, timedelta
+
+from django.db import connection, transaction
+
+from Dashboard.booking_index import booking_index_registry
+from Dashboard.cache import bump_global_version
+from Dashboard.models import University, Degree, Semester, Course, CourseSemester, Student, StudentDegree, \
+    CourseRegistration, ExamOutcome, TimePlanBooking
+
+"""
+This file contains the generator of synthetic data for load tests and benchmarks
+
+The catalog of each university is created first, afterwards the students are created in chunks.
+For each chunk the registrations, exam outcomes and bookings are planned in memory and inserted
+with bulk_create. The derived values like the spent hours and the collected ects are calculated
+while planning, so the generated data is consistent without recomputing it afterwards.
+"""
+
+# predefined scales that are used by the benchmark, the values are counts per parent entry
+SCALES = {
+    "small": {
+        "universities": 1, "degrees": 2, "semesters": 6, "courses": 5, "students": 50,
+        "registrations": 20, "exam_ratio": 0.5, "years": 1, "bookings_per_week": 5,
+    },
+    "medium": {
+        "universities": 2, "degrees": 4, "semesters": 6, "courses": 6, "students": 500,
+        "registrations": 25, "exam_ratio": 0.5, "years": 2, "bookings_per_week": 5,
+    },
+    "large": {
+        "universities": 2, "degrees": 5, "semesters": 6, "courses": 8, "students": 1000,
+        "registrations": 30, "exam_ratio": 0.5, "years": 2, "bookings_per_week": 5,
+    },
+}
+
+FIRST_NAMES = ["Anna", "Ben", "Clara", "David", "Emma", "Felix", "Hans", "Jane", "John", "Lea", "Lukas", "Mia",
+               "Noah", "Paul", "Peter", "Sophie"]
+LAST_NAMES = ["Bauer", "Fischer", "Hoffmann", "Keller", "Meier", "Muster", "Mustermann", "Schmid", "Schneider",
+              "Weber"]
+
+# grades of the exam outcomes, grades above 4 are failed
+GRADES = [round(1 + x / 10, 1) for x in range(0, 41)]
+
+# the bookings of a week are placed in distinct blocks of three hours, so they never overlap
+BOOKING_BLOCK_HOURS = [8, 11, 14, 17]
+
+# a booking starts within the first hour of its block and lasts 45 minutes up to 2 hours
+BOOKING_SLOTS = [(start_offset, duration) for start_offset in range(0, 60, 15) for duration in range(45, 121, 15)]
+
+# number of students whose data is planned and inserted together
+STUDENT_CHUNK_SIZE = 100
+
+
+class SyntheticDataGenerator:
+    """
+    This class generates universities with their catalog and students with registrations,
+    exam outcomes and bookings. The same seed always generates the same data
+    """
+
+    def __init__(self, universities=1, degrees=2, semesters=6, courses=5, students=50, registrations=20,
+                 exam_ratio=0.5, years=1, bookings_per_week=5, seed=0, batch_size=5000):
+        self._universities = universities
+        self._degrees = degrees
+        self._semesters = semesters
+        self._courses = courses
+        self._students = students
+        self._registrations = registrations
+        self._exam_ratio = exam_ratio
+        self._years = years
+        # each week has 7 days with one booking per block at most
+        self._bookings_per_week = min(bookings_per_week, 7 * len(BOOKING_BLOCK_HOURS))
+        self._batch_size = batch_size
+        self._random = random.Random(seed)
+        self._counts = {}
+
+    def generate(self) -> dict[str, int]:
+        """
+        Generates all data within a single transaction and returns the number of created rows per model
+        """
+        self._counts = {model.__name__: 0 for model in (University, Degree, Semester, Course, CourseSemester,
+                                                        Student, StudentDegree, CourseRegistration, ExamOutcome,
+                                                        TimePlanBooking)}
+        with transaction.atomic():
+            universities = self.__create(University, [University(_name=f"University {x + 1}")
+                                                      for x in range(self._universities)])
+            for university in universities:
+                courses_per_degree = self.__create_catalog(university)
+                self.__create_students(university, courses_per_degree)
+
+            # bulk_create skips the signals, so the caches and indexes are invalidated here
+            transaction.on_commit(bump_global_version)
+        booking_index_registry.invalidate()
+        return self._counts
+
+    def __create(self, model, objects: list) -> list:
+        # sqlite and postgres return the primary keys, so the objects can be referenced afterwards
+        self._counts[model.__name__] += len(objects)
+        return model.objects.bulk_create(objects, batch_size=self._batch_size)
+
+    def __create_catalog(self, university: University) -> dict[Degree, list[Course]]:
+        """
+        Creates the degrees of the university with their semesters and courses
+        """
+        degrees = self.__create(Degree, [
+            Degree(_name=f"Degree {x + 1} ({university.name})", _ects_goal=180, _university=university)
+            for x in range(self._degrees)])
+
+        semesters = self.__create(Semester, [
+            Semester(_degree=degree, _name=f"Semester {x + 1}", _number=x + 1)
+            for degree in degrees for x in range(self._semesters)])
+
+        courses = self.__create(Course, [
+            self.__build_course(semester, university, x) for semester in semesters for x in range(self._courses)])
+
+        self.__create(CourseSemester, [
+            CourseSemester(_course=course, _semester=semester)
+            for semester, course in zip([semester for semester in semesters for _ in range(self._courses)], courses)])
+
+        courses_per_degree = {degree: [] for degree in degrees}
+        for course in courses:
+            courses_per_degree[course.degree].append(course)
+        return courses_per_degree
+
+    def __build_course(self, semester: Semester, university: University, number: int) -> Course:
+        ects_points = self._random.choice([5, 5, 5, 6, 10])
+        return Course(
+            _name=f"Course {semester.number}.{number + 1} ({semester.degree.name})",
+            _ects_points=ects_points,
+            _expected_hours=ects_points * 30.0,
+            _bg_color=f"#{self._random.randrange(0x1000000):06x}",
+            _fg_color="#ffffff",
+            _degree=semester.degree,
+            _university=university,
+        )
+
+    def __create_students(self, university: University, courses_per_degree: dict[Degree, list[Course]]):
+        """
+        Creates the students of the university chunk by chunk
+        """
+        degrees = list(courses_per_degree)
+        for chunk_start in range(0, self._students, STUDENT_CHUNK_SIZE):
+            students = self.__create(Student, [
+                Student(_first_name=self._random.choice(FIRST_NAMES), _last_name=self._random.choice(LAST_NAMES),
+                        _university=university)
+                for _ in range(min(STUDENT_CHUNK_SIZE, self._students - chunk_start))])
+
+            # plan everything first, the referenced objects get their primary keys while they are inserted
+            planned = [self.__plan_student(student, self._random.choice(degrees), courses_per_degree)
+                       for student in students]
+
+            self.__create(StudentDegree, [student_degree for student_degree, _, _, _ in planned])
+            self.__create(CourseRegistration, [registration for _, registrations, _, _ in planned
+                                               for registration in registrations])
+            self.__create(ExamOutcome, [exam_outcome for _, _, exam_outcomes, _ in planned
+                                        for exam_outcome in exam_outcomes])
+            self.__insert_bookings([booking for _, _, _, bookings in planned for booking in bookings])
+
+    def __plan_student(self, student: Student, degree: Degree, courses_per_degree: dict[Degree, list[Course]]) -> \
+            tuple[StudentDegree, list[CourseRegistration], list[ExamOutcome], list[tuple]]:
+        """
+        Plans the active degree, the registrations, the exam outcomes and the bookings of a student.
+        A registration is completed if its exam is passed, the ects points of those are collected
+        """
+        courses = courses_per_degree[degree]
+        registrations = []
+        exam_outcomes = []
+        ects_collected = 0
+        for course in self._random.sample(courses, min(self._registrations, len(courses))):
+            registration = CourseRegistration(_student=student, _course=course)
+            registrations.append(registration)
+
+            if self._random.random() < self._exam_ratio:
+                grade = self._random.choice(GRADES)
+                passed = grade <= 4
+                exam_outcomes.append(ExamOutcome(_course_registration=registration, _grade=grade, _passed=passed))
+                registration.completed = passed
+                ects_collected += course.ects_points if passed else 0
+
+        # the degree started with the first booking and is still active today
+        start_date = self.__get_first_monday()
+        student_degree = StudentDegree(_student=student, _degree=degree, _start_date=start_date,
+                                       _end_date=max(start_date + timedelta(days=4 * 365),
+                                                     date.today() + timedelta(days=365)),
+                                       _ects_collected=ects_collected)
+        return student_degree, registrations, exam_outcomes, self.__plan_bookings(registrations)
+
+    def __plan_bookings(self, registrations: list[CourseRegistration]) -> list[tuple]:
+        """
+        Plans the bookings of a student from the first monday until four weeks ahead as tuples of
+        registration, date and the start and end minute of the day.
+        The duration of each booking is added to the spent hours of its registration
+        """
+        if not registrations:
+            return []
+
+        # bookings are mostly planned for courses that are not completed yet
+        booked_registrations = [registration for registration in registrations if not registration.completed] \
+            or registrations
+        bookings = []
+        spent_minutes = [0] * len(booked_registrations)
+        first_monday = self.__get_first_monday()
+        for week in range(0, (date.today() - first_monday).days // 7 + 4):
+            week_dates = [first_monday + timedelta(weeks=week, days=day) for day in range(0, 7)]
+
+            # the random values of a week are drawn together which is a lot faster than drawing them one by one
+            blocks = self._random.sample(range(7 * len(BOOKING_BLOCK_HOURS)), self._bookings_per_week)
+            slots = self._random.choices(BOOKING_SLOTS, k=self._bookings_per_week)
+            week_registrations = self._random.choices(range(len(booked_registrations)), k=self._bookings_per_week)
+
+            for block, (start_offset, duration), registration in zip(blocks, slots, week_registrations):
+                day, block_number = divmod(block, len(BOOKING_BLOCK_HOURS))
+                start = BOOKING_BLOCK_HOURS[block_number] * 60 + start_offset
+                bookings.append((booked_registrations[registration], week_dates[day], start, start + duration))
+                spent_minutes[registration] += duration
+
+        for registration, minutes in zip(booked_registrations, spent_minutes):
+            registration.spent_hours = minutes / 60
+        return bookings
+
+    def __insert_bookings(self, bookings: list[tuple]):
+        """
+        Inserts the planned bookings with executemany. The bookings are the bulk of the generated rows,
+        creating a model instance for each of them would take most of the time. The values are prepared
+        like the model does it, including the minute range of update_minutes
+        """
+        operations = connection.ops
+        fields = ["_course_registration", "_from_date", "_from_time", "_until_date", "_until_time",
+                  "_start_minute", "_end_minute"]
+        columns = ", ".join(operations.quote_name(TimePlanBooking._meta.get_field(field).column) for field in fields)
+        sql = (f"INSERT INTO {operations.quote_name(TimePlanBooking._meta.db_table)} ({columns}) "
+               f"VALUES ({', '.join(['%s'] * len(fields))})")
+
+        # the bookings start and end at quarter hours and share their dates, so those are only converted once
+        times = {minute: operations.adapt_timefield_value(time(minute // 60, minute % 60))
+                 for minute in range(0, 24 * 60, 15)}
+        days = {}
+        with connection.cursor() as cursor:
+            for batch_start in range(0, len(bookings), self._batch_size):
+                rows = []
+                for registration, booking_date, start, end in bookings[batch_start:batch_start + self._batch_size]:
+                    if booking_date not in days:
+                        days[booking_date] = (operations.adapt_datefield_value(booking_date),
+                                              TimePlanBooking.to_minute(booking_date, time(0, 0)))
+                    day_date, day_minute = days[booking_date]
+                    rows.append((registration.id, day_date, times[start], day_date, times[end],
+                                 day_minute + start, day_minute + end))
+                cursor.executemany(sql, rows)
+        self._counts[TimePlanBooking.__name__] += len(bookings)
+
+    def __get_first_monday(self) -> date:
+        today = date.today()
+        return today - timedelta(days=today.weekday(), weeks=self._years * 52)
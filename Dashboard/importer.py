@@ -0,0 +1,272 @@
+import csv
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+
+"""
+This file contains the parsers of the files that are imported as time plan bookings or catalogs
+
+The booking readers read the file line by line and yield one row per booking, so a file is never
+loaded completely. A row contains the line number, the course and the date and time values
+as strings like the time plan form receives them. Rows that cannot be parsed contain an error.
+The catalog readers yield one row per course and semester of a degree in the same way.
+"""
+
+# columns of the booking csv files, the course is given by its id or its name
+BOOKING_CSV_COLUMNS = ["course", "from_date", "from_time", "until_date", "until_time"]
+
+# required columns of the catalog csv files, the columns semester, semester_name, bg_color and fg_color
+# are optional. A course that belongs to multiple semesters has a row per semester
+CATALOG_CSV_COLUMNS = ["degree", "ects_goal", "course", "ects_points", "expected_hours"]
+
+
+class CsvRowReader:
+    """
+    This reader yields the rows of a csv file with a header line that contains the required columns,
+    the columns are separated by comma or semicolon
+    """
+
+    def __init__(self, lines, required_columns: list[str]):
+        self._lines = lines
+        self._required_columns = required_columns
+
+    def __iter__(self):
+        lines = iter(self._lines)
+        header = next(lines, "")
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        columns = [column.strip().lower() for column in next(csv.reader([header], delimiter=delimiter), [])]
+        missing_columns = [column for column in self._required_columns if column not in columns]
+        if missing_columns:
+            yield {"line": 1, "error": f"missing columns {', '.join(missing_columns)}"}
+            return
+
+        reader = csv.reader(lines, delimiter=delimiter)
+        for values in reader:
+            # empty lines are skipped, the reader does not count the header line
+            if not any(value.strip() for value in values):
+                continue
+            row = {column: value.strip() for column, value in zip(columns, values)}
+            row["line"] = reader.line_num + 1
+            yield row
+
+
+class IcsBookingReader:
+    """
+    This reader yields a row per event of an iCalendar file. The summary of the event is the course,
+    the start and end are converted to the local time of the dashboard
+    """
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._local_zone = ZoneInfo(settings.TIME_ZONE)
+
+    def __iter__(self):
+        event = None
+        # components within an event like alarms are skipped
+        depth = 0
+        for line_number, name, parameters, value in self.__iter_properties():
+            if name == "BEGIN":
+                if value.upper() == "VEVENT" and event is None:
+                    event = {"line": line_number}
+                elif event is not None:
+                    depth += 1
+            elif name == "END":
+                if depth > 0:
+                    depth -= 1
+                elif value.upper() == "VEVENT" and event is not None:
+                    yield self.__get_row(event)
+                    event = None
+            elif event is not None and depth == 0:
+                event[name] = (parameters, value)
+
+    def __iter_properties(self):
+        """
+        Yields the unfolded content lines as tuples of line number, name, parameters and value
+        """
+        content_line = None
+        line_number = 0
+        for number, line in enumerate(self._lines, start=1):
+            line = line.rstrip("\r\n")
+            # folded lines continue with a space or a tab
+            if line[:1] in (" ", "\t") and content_line is not None:
+                content_line += line[1:]
+                continue
+            if content_line:
+                yield self.__parse_property(line_number, content_line)
+            content_line = line
+            line_number = number
+        if content_line:
+            yield self.__parse_property(line_number, content_line)
+
+    def __parse_property(self, line_number: int, content_line: str) -> tuple[int, str, dict[str, str], str]:
+        # the value starts after the first colon that is not quoted within a parameter
+        quoted = False
+        separator = len(content_line)
+        for index, character in enumerate(content_line):
+            if character == '"':
+                quoted = not quoted
+            elif character == ":" and not quoted:
+                separator = index
+                break
+
+        name, *parameters = content_line[:separator].split(";")
+        parameters = {key.upper(): value.strip('"') for key, value in
+                      (parameter.split("=", 1) for parameter in parameters if "=" in parameter)}
+        return line_number, name.upper(), parameters, content_line[separator + 1:]
+
+    def __get_row(self, event: dict) -> dict:
+        """
+        Converts the properties of an event to a row
+        """
+        row = {"line": event["line"]}
+        if "RRULE" in event:
+            row["error"] = "recurring events are not supported"
+            return row
+
+        try:
+            if "DTSTART" not in event:
+                raise ValueError("the event has no start")
+            start = self.__parse_datetime(*event["DTSTART"])
+            if "DTEND" in event:
+                end = self.__parse_datetime(*event["DTEND"])
+            elif "DURATION" in event:
+                end = start + self.__parse_duration(event["DURATION"][1])
+            else:
+                raise ValueError("the event has no end")
+        except ValueError as error:
+            row["error"] = str(error)
+            return row
+
+        row["course"] = self.__unescape_text(event.get("SUMMARY", ({}, ""))[1]).strip()
+        row["from_date"] = start.date().isoformat()
+        row["from_time"] = start.strftime("%H:%M")
+        row["until_date"] = end.date().isoformat()
+        row["until_time"] = end.strftime("%H:%M")
+        return row
+
+    def __parse_datetime(self, parameters: dict[str, str], value: str) -> datetime:
+        """
+        Parses a date time value and converts it to the local time, all day events have no time and are rejected
+        """
+        if parameters.get("VALUE", "").upper() == "DATE" or len(value) == 8:
+            raise ValueError("all day events are not supported")
+        try:
+            parsed = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+        except ValueError:
+            raise ValueError(f"invalid date time {value}")
+
+        if value.endswith("Z"):
+            parsed = parsed.replace(tzinfo=ZoneInfo("UTC"))
+        elif "TZID" in parameters:
+            try:
+                parsed = parsed.replace(tzinfo=ZoneInfo(parameters["TZID"]))
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"unknown time zone {parameters['TZID']}")
+        else:
+            # floating times are taken as local times
+            return parsed
+        return parsed.astimezone(self._local_zone).replace(tzinfo=None)
+
+    def __parse_duration(self, value: str) -> timedelta:
+        # calendars only use durations with weeks, days, hours, minutes and seconds like P1DT2H30M
+        units = {"W": "weeks", "D": "days", "H": "hours", "M": "minutes", "S": "seconds"}
+        duration = timedelta()
+        number = ""
+        for character in value.lstrip("+").upper():
+            if character.isdigit():
+                number += character
+            elif character in units and number:
+                duration += timedelta(**{units[character]: int(number)})
+                number = ""
+            elif character not in "PT":
+                raise ValueError(f"invalid duration {value}")
+        return duration
+
+    def __unescape_text(self, value: str) -> str:
+        result = []
+        characters = iter(value)
+        for character in characters:
+            if character == "\\":
+                escaped = next(characters, "")
+                result.append("\n" if escaped in ("n", "N") else escaped)
+            else:
+                result.append(character)
+        return "".join(result)
+
+
+class JsonCatalogReader:
+    """
+    This reader yields the rows of a json catalog. The catalog contains a list of degrees with their
+    semesters and courses, the courses list the numbers of their semesters:
+    {"degrees": [{"name": ..., "ects_goal": ..., "semesters": [{"number": ..., "name": ...}],
+                  "courses": [{"name": ..., "ects_points": ..., "expected_hours": ..., "bg_color": ...,
+                               "fg_color": ..., "semesters": [...]}]}]}
+    Catalogs are small compared to booking files, so the file is loaded completely. The line of a row
+    is the position of the course within the catalog like degrees[0].courses[2]
+    """
+
+    def __init__(self, lines):
+        self._lines = lines
+
+    def __iter__(self):
+        try:
+            catalog = json.loads("".join(self._lines))
+        except ValueError as error:
+            yield {"line": 1, "error": f"invalid json: {error}"}
+            return
+        if not isinstance(catalog, dict) or not isinstance(catalog.get("degrees"), list):
+            yield {"line": 1, "error": "the catalog needs a list of degrees"}
+            return
+
+        for degree_number, degree in enumerate(catalog["degrees"]):
+            position = f"degrees[{degree_number}]"
+            if not isinstance(degree, dict):
+                yield {"line": position, "error": "a degree has to be an object"}
+                continue
+            degree_row = {"degree": degree.get("name"), "ects_goal": degree.get("ects_goal")}
+
+            semester_names = {}
+            for semester_number, semester in enumerate(degree.get("semesters") or []):
+                line = f"{position}.semesters[{semester_number}]"
+                if not isinstance(semester, dict):
+                    yield {"line": line, "error": "a semester has to be an object"}
+                    continue
+                # the semesters are also created if no course belongs to them
+                semester_names[semester.get("number")] = semester.get("name")
+                yield {**degree_row, "line": line, "semester": semester.get("number"),
+                       "semester_name": semester.get("name")}
+
+            for course_number, course in enumerate(degree.get("courses") or []):
+                line = f"{position}.courses[{course_number}]"
+                if not isinstance(course, dict):
+                    yield {"line": line, "error": "a course has to be an object"}
+                    continue
+                course_row = {**degree_row, "line": line, "course": course.get("name"),
+                              **{key: course.get(key) for key in ("ects_points", "expected_hours", "bg_color",
+                                                                  "fg_color")}}
+                for semester in course.get("semesters") or [None]:
+                    yield {**course_row, "semester": semester, "semester_name": semester_names.get(semester)}
+
+
+def get_booking_reader(file_name: str, lines) -> CsvRowReader | IcsBookingReader:
+    """
+    Returns the reader for the booking file depending on its extension
+    """
+    if file_name.lower().endswith(".ics"):
+        return IcsBookingReader(lines)
+    if file_name.lower().endswith(".csv"):
+        return CsvRowReader(lines, BOOKING_CSV_COLUMNS)
+    raise ValueError(f"{file_name} is neither an .ics nor a .csv file")
+
+
+def get_catalog_reader(file_name: str, lines) -> CsvRowReader | JsonCatalogReader:
+    """
+    Returns the reader for the catalog file depending on its extension
+    """
+    if file_name.lower().endswith(".json"):
+        return JsonCatalogReader(lines)
+    if file_name.lower().endswith(".csv"):
+        return CsvRowReader(lines, CATALOG_CSV_COLUMNS)
+    raise ValueError(f"{file_name} is neither a .json nor a .csv file")
@@ -0,0 +1,186 @@
+import functools
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+"""
+This file contains the instrumentation of the services and views
+
+For each request the executed sql queries, the time spent in the database and the wall time
+are recorded in total and for each called service method. The QueryBudgetMiddleware
+activates the recording and reports the results.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised if a view executes more queries than its budget allows and strict budgets are enabled
+    """
+    pass
+
+
+class QueryStats:
+    """
+    This class accumulates the calls, queries, sql time and wall time of a method or request
+    """
+    calls: int
+    queries: int
+    sql_time: float
+    wall_time: float
+
+    def __init__(self):
+        self.calls = 0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.wall_time = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "queries": self.queries,
+            "sql_ms": round(self.sql_time * 1000, 3),
+            "wall_ms": round(self.wall_time * 1000, 3),
+        }
+
+
+class RequestMetrics:
+    """
+    This class holds the statistics of the current request and of each service method
+    """
+    total: QueryStats
+    methods: dict[str, QueryStats]
+
+    def __init__(self):
+        self.total = QueryStats()
+        self.methods = {}
+
+    def record_query(self, duration: float):
+        self.total.queries += 1
+        self.total.sql_time += duration
+
+    def get_method_stats(self, name: str) -> QueryStats:
+        return self.methods.setdefault(name, QueryStats())
+
+
+_request_metrics = ContextVar("request_metrics", default=None)
+
+
+def get_request_metrics() -> RequestMetrics | None:
+    return _request_metrics.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper that measures every query of the request
+    """
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics = get_request_metrics()
+        if metrics is not None:
+            metrics.record_query(time.perf_counter() - start)
+
+
+def instrumented(service_class):
+    """
+    Class decorator that records the queries, sql time and wall time of all public methods of a service.
+    Nested service calls are included in the statistics of the calling method
+    """
+
+    def wrap(name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            metrics = get_request_metrics()
+            if metrics is None:
+                return method(*args, **kwargs)
+
+            queries, sql_time, start = metrics.total.queries, metrics.total.sql_time, time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats = metrics.get_method_stats(name)
+                stats.calls += 1
+                stats.queries += metrics.total.queries - queries
+                stats.sql_time += metrics.total.sql_time - sql_time
+                stats.wall_time += time.perf_counter() - start
+
+        return wrapper
+
+    for attribute, value in list(vars(service_class).items()):
+        if callable(value) and not attribute.startswith("_"):
+            setattr(service_class, attribute, wrap(f"{service_class.__name__}.{attribute}", value))
+    return service_class
+
+
+class QueryBudgetMiddleware:
+    """
+    This middleware records the queries of each request and writes them as structured debug log line.
+    If a view exceeds its configured query budget a warning is logged, or an exception is raised
+    if strict budgets are enabled, e.g. for tests
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            # measure the queries of all configured databases
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        metrics.total.calls = 1
+        metrics.total.wall_time = time.perf_counter() - start
+
+        view_name = self.get_view_name(request)
+        # the line is only built if the debug level is enabled for this logger
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({
+                "event": "request_metrics",
+                "method": request.method,
+                "path": request.path,
+                "view": view_name,
+                "status": response.status_code,
+                **metrics.total.to_dict(),
+                "services": {name: stats.to_dict() for name, stats in metrics.methods.items()},
+            }))
+
+        if settings.DASHBOARD_QUERY_STATS_HEADER:
+            response["X-Query-Stats"] = (f"queries={metrics.total.queries};"
+                                         f"sql_ms={metrics.total.sql_time * 1000:.1f};"
+                                         f"wall_ms={metrics.total.wall_time * 1000:.1f}")
+
+        self.check_budget(view_name, metrics.total)
+        return response
+
+    def get_view_name(self, request) -> str | None:
+        """
+        Returns the name of the view class or function that handled the request
+        """
+        if request.resolver_match is None:
+            return None
+        view = request.resolver_match.func
+        return getattr(view, "view_class", view).__name__
+
+    def check_budget(self, view_name: str | None, stats: QueryStats):
+        budget = settings.DASHBOARD_QUERY_BUDGETS.get(view_name)
+        if budget is None or stats.queries <= budget:
+            return
+
+        message = f"{view_name} executed {stats.queries} queries, the budget is {budget}"
+        if settings.DASHBOARD_QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
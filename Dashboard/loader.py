@@ -0,0 +1,76 @@
+from contextvars import ContextVar
+
+"""
+This file contains the request scoped identity map of the services
+
+Within a request every entity is only loaded once from the database, further lookups
+of the same entity return the already loaded instance. The loader is activated for each
+request by the RequestLoaderMiddleware, outside of requests nothing is kept.
+"""
+
+
+class RequestLoader:
+    """
+    This class stores the loaded entities by their kind and key and counts the hits and misses
+    """
+    _entries: dict
+    _hits: int
+    _misses: int
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __init__(self):
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, kind: str, key, load):
+        """
+        Returns the entity of the given kind and key, the load function is only called if the
+        entity was not loaded before. Entities that do not exist are also remembered as None
+        """
+        entry_key = (kind, key)
+        if entry_key in self._entries:
+            self._hits += 1
+            return self._entries[entry_key]
+
+        self._misses += 1
+        value = load()
+        self._entries[entry_key] = value
+        return value
+
+    def discard(self, kind: str, key):
+        """
+        Removes an entity that was changed, so that the next lookup loads it again
+        """
+        self._entries.pop((kind, key), None)
+
+
+_request_loader = ContextVar("request_loader", default=None)
+
+
+def get_request_loader() -> RequestLoader:
+    """
+    Returns the loader of the current request, outside of a request a new loader is
+    returned every time so that no entities are shared
+    """
+    loader = _request_loader.get()
+    return loader if loader is not None else RequestLoader()
+
+
+def activate_request_loader() -> tuple[RequestLoader, object]:
+    """
+    Starts a new loader for the current request and returns it with the token to reset it
+    """
+    loader = RequestLoader()
+    return loader, _request_loader.set(loader)
+
+
+def deactivate_request_loader(token):
+    _request_loader.reset(token)
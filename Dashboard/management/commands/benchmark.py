@@ -0,0 +1,331 @@
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, time as day_time
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+
+from Dashboard.analytics import is_analytics_available
+from Dashboard.booking_index import booking_index_registry
+from Dashboard.forms import GradeManagementForm, TimePlanManagementForm
+from Dashboard.generator import SCALES, SyntheticDataGenerator
+from Dashboard.models import StudentDegree, CourseRegistration, TimePlanBooking
+from Dashboard.services import UniversityService, StudentService, CourseService, CalendarService, ExamService
+
+"""
+This file contains the command to benchmark the services and the dashboard view
+
+The command is executed with: python manage.py benchmark [--scales small medium] [--compare <file>]
+For every scale a test database is created and filled by the synthetic data generator, the scale
+'current' uses the configured database instead. The results are written as json, so that the
+results of different commits can be compared with --compare.
+"""
+
+
+class Command(BaseCommand):
+    help = "Times the service methods and the dashboard view at different scales and writes the results as json"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", nargs="+", default=["small", "medium"], choices=[*SCALES, "current"],
+                            help="scales to benchmark, 'current' uses the configured database")
+        parser.add_argument("--repeat", type=int, default=5, help="number of measurements per entry point")
+        parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data")
+        parser.add_argument("--output", help="file of the results, by default a new file in DASHBOARD_BENCHMARK_DIR")
+        parser.add_argument("--compare", help="results of a previous run to compare the medians with")
+        parser.add_argument("--threshold", type=float, default=1.2,
+                            help="ratio of the medians from which an entry point is reported as regression")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("at least one measurement is needed")
+
+        results = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": self.__get_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "scales": {},
+        }
+
+        # the request logs of the dashboard view would hide the results
+        request_logger = logging.getLogger("Dashboard.instrumentation")
+        log_level = request_logger.level
+        request_logger.setLevel(logging.WARNING)
+        try:
+            for scale in options["scales"]:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"scale {scale}"))
+                results["scales"][scale] = self.__run_scale(scale, options)
+        finally:
+            request_logger.setLevel(log_level)
+
+        output = Path(options["output"]) if options["output"] else Path(settings.DASHBOARD_BENCHMARK_DIR) / \
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit'] or 'unknown'}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"results written to {output}"))
+
+        if options["compare"]:
+            self.__compare(json.loads(Path(options["compare"]).read_text()), results, options["threshold"])
+
+    def __get_commit(self) -> str | None:
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def __run_scale(self, scale: str, options) -> dict:
+        """
+        Benchmarks a scale within its own test database, the current database is only read.
+        All changes of the measurements are rolled back
+        """
+        if scale == "current":
+            return self.__run_benchmark(options["repeat"], None)
+
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            start = time.perf_counter()
+            SyntheticDataGenerator(**SCALES[scale], seed=options["seed"]).generate()
+            return self.__run_benchmark(options["repeat"], time.perf_counter() - start)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def __run_benchmark(self, repeat: int, generate_seconds: float | None) -> dict:
+        rows = {model.__name__: model.objects.count() for model in apps.get_app_config("Dashboard").get_models()}
+        self.stdout.write(", ".join(f"{model}: {count}" for model, count in rows.items()))
+
+        student_degree = StudentDegree.objects.filter(_end_date__gte=date.today()).order_by("_id").first()
+        if student_degree is None:
+            raise CommandError("no student with an active degree was found")
+
+        entries = {}
+        with transaction.atomic():
+            for name, call, cold in self.__get_entry_points(student_degree._student_id):
+                entries[name] = self.__measure(call, repeat, cold)
+                self.stdout.write(f"{name:<60} {entries[name]['median_ms']:>10.2f} ms "
+                                  f"{entries[name]['queries']:>6} queries")
+            transaction.set_rollback(True)
+
+        return {"rows": rows, "generate_seconds": generate_seconds, "entries": entries}
+
+    def __get_entry_points(self, student_id: int) -> list[tuple[str, object, bool]]:
+        """
+        Returns the entry points as tuples of name, function and whether the caches are cleared before each call
+        """
+        university_service = UniversityService()
+        student_service = StudentService()
+        course_service = CourseService()
+        calendar_service = CalendarService()
+        exam_service = ExamService()
+
+        student = student_service.get_student_for_id(student_id)
+        university_id = student.university.id
+        registration = CourseRegistration.objects.filter(_student=student_id).order_by("_id").first()
+        course_id = registration.course.id if registration else CourseService().get_courses_with_registration(
+            student_id).first().id
+        registration_id = registration.id if registration else None
+        today = date.today()
+        start_minute = TimePlanBooking.to_minute(today, day_time(0))
+        now = datetime.combine(today, day_time(8))
+
+        # the dashboard is requested with a session like a browser does it
+        client = Client()
+        session = client.session
+        session["university_id"] = university_id
+        session["student_id"] = student_id
+        session.save()
+
+        return [
+            ("UniversityService.is_university_existing", lambda: university_service.is_university_existing(
+                university_id), True),
+            ("UniversityService.get_university_for_id", lambda: university_service.get_university_for_id(
+                university_id), True),
+            ("UniversityService.get_universities", lambda: list(university_service.get_universities()), True),
+            ("UniversityService.get_university_list", university_service.get_university_list, True),
+            # the analytics are only measured if numpy is installed
+            *([("UniversityService.get_university_analytics", lambda: university_service.get_university_analytics(
+                university_id), True)] if is_analytics_available() else []),
+            ("StudentService.is_student_existing", lambda: student_service.is_student_existing(student_id), True),
+            ("StudentService.get_student_for_id", lambda: student_service.get_student_for_id(student_id), True),
+            ("StudentService.get_student_detail", lambda: student_service.get_student_detail(student_id), True),
+            ("StudentService.get_students_for_university", lambda: list(
+                student_service.get_students_for_university(university_id)), True),
+            ("StudentService.get_student_list", lambda: student_service.get_student_list(university_id), True),
+            ("StudentService.get_student_grade_average", lambda: student_service.get_student_grade_average(
+                student_id), True),
+            ("StudentService.get_student_degree_for_student", lambda: student_service.get_student_degree_for_student(
+                student_id), True),
+            ("StudentService.get_active_student_degrees", lambda: list(
+                student_service.get_active_student_degrees(student_id)), True),
+            ("CourseService.is_course_existing", lambda: course_service.is_course_existing(course_id), True),
+            ("CourseService.is_course_registered_for_student", lambda: course_service.is_course_registered_for_student(
+                student_id, course_id), True),
+            ("CourseService.get_course_for_id", lambda: course_service.get_course_for_id(course_id), True),
+            ("CourseService.get_course_registration_for_student",
+             lambda: course_service.get_course_registration_for_student(student_id, course_id), True),
+            ("CourseService.get_courses_for_student", lambda: list(course_service.get_courses_for_student(
+                student_id)), True),
+            ("CourseService.get_course_semester", lambda: course_service.get_course_semester(course_id), True),
+            ("CourseService.get_course_list", lambda: course_service.get_course_list(student_id, "progress"), True),
+            ("CourseService.get_course_page", lambda: course_service.get_course_page(student_id, "grade", "desc"),
+             True),
+            ("CourseService.get_course_options", lambda: course_service.get_course_options(student_id), True),
+            ("CourseService.get_courses_with_registration", lambda: list(
+                course_service.get_courses_with_registration(student_id)), True),
+            ("CourseService.save_grade_for_course", lambda: self.__save_grade(student_id, course_id), True),
+            ("CourseService.save_new_course_registration", lambda: course_service.save_new_course_registration(
+                student_id, course_id), True),
+            ("CourseService.recompute_ects_collected", course_service.recompute_ects_collected, True),
+            ("CalendarService.get_time_plan_bookings_for_student", lambda: list(
+                calendar_service.get_time_plan_bookings_for_student(student_id)), True),
+            ("CalendarService.get_time_plan_bookings_form_date", lambda: list(
+                calendar_service.get_time_plan_bookings_form_date(student_id, today)), True),
+            ("CalendarService.get_time_plan_booking_between", lambda: list(
+                calendar_service.get_time_plan_booking_between(student_id, today, day_time(8), day_time(12))), True),
+            ("CalendarService.get_booking_index", lambda: calendar_service.get_booking_index(student_id), True),
+            ("CalendarService.has_time_plan_booking_conflict", lambda: calendar_service.has_time_plan_booking_conflict(
+                student_id, today, day_time(8), day_time(12)), False),
+            ("CalendarService.get_time_plan_booking_ids_overlapping",
+             lambda: calendar_service.get_time_plan_booking_ids_overlapping(
+                 student_id, start_minute, start_minute + 24 * 60), False),
+            ("CalendarService.find_free_slots", lambda: calendar_service.find_free_slots(
+                student_id, timedelta(hours=2), (now, now + timedelta(days=14)), limit=20), False),
+            # a semester of sessions is planned for the open courses of the student
+            ("CalendarService.plan_study_sessions", lambda: calendar_service.plan_study_sessions(
+                student_id, (now, now + timedelta(days=120)), 4), False),
+            ("CalendarService.save_study_plan", lambda: calendar_service.save_study_plan(
+                student_id, calendar_service.plan_study_sessions(student_id, (now, now + timedelta(days=120)), 4)),
+             True),
+            ("CalendarService.save_time_plan_booking", lambda: self.__save_time_plan_booking(student, course_id), True),
+            ("CalendarService.get_spent_hours_for_registration",
+             lambda: calendar_service.get_spent_hours_for_registration(registration_id), True),
+            ("CalendarService.recompute_spent_hours", calendar_service.recompute_spent_hours, True),
+            ("CalendarService.generate_calendar_week", lambda: calendar_service.generate_calendar_week(student_id),
+             True),
+            # the week builds its slots lazily, those compare the occupancy with the complete grid of slot dtos
+            ("WeekDto.calendar_rows", lambda: calendar_service.generate_calendar_week(student_id).calendar_rows, True),
+            ("WeekDto.time_slots", lambda: [week_day.time_slots for week_day in calendar_service.generate_calendar_week(
+                student_id).week_days], True),
+            ("CalendarService.get_time_plan_bookings_for_week",
+             lambda: calendar_service.get_time_plan_bookings_for_week(student_id, today), True),
+            ("ExamService.is_exam_outcome_existing", lambda: exam_service.is_exam_outcome_existing(registration_id),
+             True),
+            ("ExamService.get_last_exam_outcome_for_registration",
+             lambda: exam_service.get_last_exam_outcome_for_registration(registration_id), True),
+            ("ExamService.get_all_exam_outcomes_for_registration", lambda: list(
+                exam_service.get_all_exam_outcomes_for_registration(registration_id)), True),
+            ("ExamService.get_all_exam_outcomes_for_student", lambda: list(
+                exam_service.get_all_exam_outcomes_for_student(student_id)), True),
+            ("ExamService.save_exam_outcome_for_registration",
+             lambda: exam_service.save_exam_outcome_for_registration(registration_id, 2.0), True),
+            ("DashboardView.get", lambda: client.get("/dashboard/"), True),
+            ("DashboardView.get cached", lambda: client.get("/dashboard/"), False),
+        ]
+
+    def __measure(self, call, repeat: int, cold: bool) -> dict:
+        """
+        Calls the entry point several times and returns the statistics of the durations.
+        Cold entry points are called with empty caches and booking indexes, the others are called
+        once before the measurement to fill them. The memory is measured within a separate call,
+        because tracing the allocations slows down the calls
+        """
+        executed = []
+
+        def count_query(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        if not cold:
+            with transaction.atomic():
+                call()
+                transaction.set_rollback(True)
+
+        durations = []
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+                booking_index_registry.invalidate()
+            executed.clear()
+
+            # every call runs within a savepoint, so that write operations do not influence the next call
+            with transaction.atomic(), connection.execute_wrapper(count_query):
+                start = time.perf_counter()
+                call()
+                durations.append(time.perf_counter() - start)
+                transaction.set_rollback(True)
+
+        with transaction.atomic():
+            if cold:
+                cache.clear()
+                booking_index_registry.invalidate()
+            tracemalloc.start()
+            try:
+                # the result is kept until the memory is taken, so the retained memory contains it
+                result = call()
+                retained, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            del result
+            transaction.set_rollback(True)
+
+        return {
+            "median_ms": round(statistics.median(durations) * 1000, 3),
+            "mean_ms": round(statistics.mean(durations) * 1000, 3),
+            "min_ms": round(min(durations) * 1000, 3),
+            "max_ms": round(max(durations) * 1000, 3),
+            "queries": len(executed),
+            "peak_kb": round(peak / 1024, 1),
+            "retained_kb": round(retained / 1024, 1),
+        }
+
+    def __save_grade(self, student_id: int, course_id: int):
+        grade_form = GradeManagementForm({"course_id": str(course_id), "grade": 1.0})
+        grade_form.is_valid()
+        CourseService().save_grade_for_course(student_id, grade_form)
+
+    def __save_time_plan_booking(self, student, course_id: int):
+        time_plan_form = TimePlanManagementForm({
+            "course_id": str(course_id), "student_id": str(student.id),
+            "from_date": date.today(), "from_time": day_time(3), "until_date": date.today(), "until_time": day_time(4)
+        })
+        time_plan_form.is_valid()
+        CalendarService().save_time_plan_booking(student, time_plan_form)
+
+    def __compare(self, previous: dict, current: dict, threshold: float):
+        """
+        Compares the medians with a previous run and reports the entry points that got slower than the threshold
+        """
+        self.stdout.write(self.style.MIGRATE_HEADING(f"compared with commit {previous.get('commit')}"))
+        regressions = 0
+        for scale, scale_results in current["scales"].items():
+            previous_entries = previous.get("scales", {}).get(scale, {}).get("entries", {})
+            for name, entry in scale_results["entries"].items():
+                if name not in previous_entries or previous_entries[name]["median_ms"] <= 0:
+                    continue
+                ratio = entry["median_ms"] / previous_entries[name]["median_ms"]
+                line = (f"{scale:<8} {name:<60} {previous_entries[name]['median_ms']:>10.2f} ms -> "
+                        f"{entry['median_ms']:>10.2f} ms ({ratio:.2f}x)")
+                if ratio > threshold:
+                    regressions += 1
+                    self.stdout.write(self.style.WARNING(line))
+                else:
+                    self.stdout.write(line)
+
+        if regressions:
+            self.stdout.write(self.style.WARNING(f"{regressions} entry points are slower than {threshold}x"))
+        else:
+            self.stdout.write(self.style.SUCCESS("no regressions found"))
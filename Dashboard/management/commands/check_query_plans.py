@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from Dashboard.query_plans import QueryPlanChecker, get_student_with_degree
+
+"""
+This file contains the command to verify that the service queries of a database are supported by indexes,
+the same check runs within the tests
+
+The command is executed with: python manage.py check_query_plans [--student <id>]
+"""
+
+
+class Command(BaseCommand):
+    help = "Runs EXPLAIN QUERY PLAN for the queries of the services and fails if a table is scanned completely"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--student", type=int, help="id of the student used to run the service queries")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("query plans can only be checked on a sqlite database")
+
+        student_id = options["student"] or get_student_with_degree()
+        if student_id is None:
+            raise CommandError("no student with an active degree was found")
+
+        failures = []
+        for name, queries in QueryPlanChecker(student_id).get_full_scans_per_method():
+            for sql, full_scans in queries:
+                if full_scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"{name}: full scan on {', '.join(full_scans)}"))
+                    self.stdout.write(f"    {sql}")
+
+            if name not in failures:
+                self.stdout.write(f"{name}: {len(queries)} queries ok")
+
+        if failures:
+            raise CommandError(f"{len(failures)} service methods scan complete tables")
+        self.stdout.write(self.style.SUCCESS("all service queries use indexes"))
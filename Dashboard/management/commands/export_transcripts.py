@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard.exporter import TRANSCRIPT_FORMATS
+from Dashboard.services import StudentService, UniversityService
+
+"""
+This file contains the command to export the transcripts of all students of a university
+
+The command is executed with: python manage.py export_transcripts <university_id> [--format csv|jsonl] [--output <file>]
+Without an output file the transcripts are written to the standard output
+"""
+
+
+class Command(BaseCommand):
+    help = "Exports the degree progress, course registrations, spent hours and grades of all students of a university"
+
+    def add_arguments(self, parser):
+        parser.add_argument("university_id", type=int, help="id of the university")
+        parser.add_argument("--format", choices=TRANSCRIPT_FORMATS, default="csv", help="format of the export")
+        parser.add_argument("--output", help="path of the exported file")
+
+    def handle(self, *args, **options):
+        if not UniversityService().is_university_existing(options["university_id"]):
+            raise CommandError(f"university with id {options['university_id']} was not found")
+
+        start = time.perf_counter()
+        writer = TRANSCRIPT_FORMATS[options["format"]][0]
+        transcripts = StudentService().iter_transcripts_for_university(options["university_id"])
+        if options["output"]:
+            try:
+                with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                    for chunk in writer(transcripts):
+                        output.write(chunk)
+            except OSError as error:
+                raise CommandError(str(error))
+        else:
+            for chunk in writer(transcripts):
+                self.stdout.write(chunk, ending="")
+
+        # the summary is written to stderr, so that it does not end up in the exported data
+        self.stderr.write(self.style.SUCCESS(f"exported the transcripts in {time.perf_counter() - start:.1f} seconds"))
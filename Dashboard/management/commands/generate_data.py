@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard.generator import SCALES, SyntheticDataGenerator
+
+"""
+This file contains the command to generate synthetic data for load tests
+
+The command is executed with: python manage.py generate_data [--scale <name>] [--students <n>] ...
+The generated data is added to the configured database, existing data is kept
+"""
+
+
+class Command(BaseCommand):
+    help = "Generates universities, courses, students, registrations, exam outcomes and bookings in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, default="small",
+                            help="predefined scale, the other arguments override its values")
+        parser.add_argument("--universities", type=int, help="number of universities")
+        parser.add_argument("--degrees", type=int, help="number of degrees per university")
+        parser.add_argument("--semesters", type=int, help="number of semesters per degree")
+        parser.add_argument("--courses", type=int, help="number of courses per semester")
+        parser.add_argument("--students", type=int, help="number of students per university")
+        parser.add_argument("--registrations", type=int, help="number of course registrations per student")
+        parser.add_argument("--exam-ratio", type=float, help="share of the registrations with an exam outcome")
+        parser.add_argument("--years", type=int, help="number of years with bookings until today")
+        parser.add_argument("--bookings-per-week", type=int, help="number of bookings per student and week")
+        parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+        parser.add_argument("--batch-size", type=int, default=5000, help="number of rows per insert statement")
+
+    def handle(self, *args, **options):
+        scale = {key: options[key] if options[key] is not None else value for key, value in
+                 SCALES[options["scale"]].items()}
+        if any(value < 0 for value in scale.values()):
+            raise CommandError("the counts must not be negative")
+
+        start = time.perf_counter()
+        counts = SyntheticDataGenerator(**scale, seed=options["seed"], batch_size=options["batch_size"]).generate()
+        duration = time.perf_counter() - start
+
+        for model, count in counts.items():
+            self.stdout.write(f"{model}: {count} rows")
+        self.stdout.write(self.style.SUCCESS(f"generated {sum(counts.values())} rows in {duration:.1f} seconds"))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard.importer import get_booking_reader
+from Dashboard.services import CalendarService, StudentService
+
+"""
+This file contains the command to import the bookings of a student from an iCalendar or csv file
+
+The command is executed with: python manage.py import_bookings <student_id> <file> [--dry-run]
+The csv files need the columns course, from_date, from_time, until_date and until_time
+"""
+
+
+class Command(BaseCommand):
+    help = "Imports the bookings of a student from an .ics or .csv file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("student_id", type=int, help="id of the student")
+        parser.add_argument("file", help="path of the .ics or .csv file")
+        parser.add_argument("--dry-run", action="store_true", help="only validate the file without saving")
+
+    def handle(self, *args, **options):
+        student = StudentService().get_student_for_id(options["student_id"])
+        if student is None:
+            raise CommandError(f"student with id {options['student_id']} was not found")
+
+        start = time.perf_counter()
+        try:
+            with open(options["file"], encoding="utf-8-sig", newline="") as lines:
+                result = CalendarService().import_bookings(student, get_booking_reader(options["file"], lines),
+                                                           dry_run=options["dry_run"])
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        duration = time.perf_counter() - start
+
+        for line, error in result.errors:
+            self.stdout.write(self.style.WARNING(f"line {line}: {error}"))
+        action = "validated" if options["dry_run"] else "imported"
+        self.stdout.write(self.style.SUCCESS(f"{action} {result.imported} bookings, rejected {len(result.errors)} "
+                                             f"rows in {duration:.1f} seconds"))
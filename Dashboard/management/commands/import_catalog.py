@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard.importer import get_catalog_reader
+from Dashboard.services import UniversityService
+
+"""
+This file contains the command to import the catalog of degrees, semesters and courses of a university
+
+The command is executed with: python manage.py import_catalog <university_id> <file> [--dry-run]
+The catalog is given as .json or .csv file, the dry run lists the changes without saving them
+"""
+
+
+class Command(BaseCommand):
+    help = "Creates or updates the degrees, semesters and courses of a university from a .json or .csv catalog"
+
+    def add_arguments(self, parser):
+        parser.add_argument("university_id", type=int, help="id of the university")
+        parser.add_argument("file", help="path of the .json or .csv file")
+        parser.add_argument("--dry-run", action="store_true", help="only list the changes without saving them")
+
+    def handle(self, *args, **options):
+        university_service = UniversityService()
+        if not university_service.is_university_existing(options["university_id"]):
+            raise CommandError(f"university with id {options['university_id']} was not found")
+
+        start = time.perf_counter()
+        try:
+            with open(options["file"], encoding="utf-8-sig", newline="") as lines:
+                result = university_service.import_catalog(
+                    university_service.get_university_for_id(options["university_id"]),
+                    get_catalog_reader(options["file"], lines), dry_run=options["dry_run"])
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        duration = time.perf_counter() - start
+
+        if result.errors:
+            for line, error in result.errors:
+                self.stdout.write(self.style.WARNING(f"line {line}: {error}"))
+            raise CommandError(f"the catalog was not imported because of {len(result.errors)} invalid rows")
+
+        # the dry run lists every change like a diff, otherwise only the number of changes is written
+        if options["dry_run"]:
+            for action, entry_type, description in result.changes:
+                self.stdout.write(f"{'+' if action == 'create' else '~'} {entry_type} {description}")
+        for (action, entry_type), count in result.change_counts.items():
+            self.stdout.write(f"{'would ' if options['dry_run'] else ''}{action} {count} {entry_type} entries")
+        self.stdout.write(self.style.SUCCESS(f"{'checked' if options['dry_run'] else 'imported'} the catalog with "
+                                             f"{len(result.changes)} changes in {duration:.1f} seconds"))
@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from Dashboard.services import CalendarService
+
+"""
+This file contains the command to save the due occurrences of the recurring bookings as bookings,
+so that they count into the spent hours. It should be scheduled once a day, e.g. with cron
+
+The command is executed with: python manage.py materialize_recurring_bookings [--until <date>]
+"""
+
+
+class Command(BaseCommand):
+    help = "Saves the occurrences of all recurring bookings until today as bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--until", type=date.fromisoformat, default=date.today(),
+                            help="last date of the saved occurrences as YYYY-MM-DD, by default today")
+
+    def handle(self, *args, **options):
+        bookings = CalendarService().materialize_recurring_bookings(options["until"])
+        self.stdout.write(self.style.SUCCESS(f"saved {bookings} occurrences until {options['until']}"))
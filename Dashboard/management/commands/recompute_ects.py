@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from Dashboard.services import CourseService
+
+"""
+This file contains the command to verify the collected ects of the student degrees
+
+The command is executed with: python manage.py recompute_ects [--repair]
+"""
+
+
+class Command(BaseCommand):
+    help = "Recomputes the collected ects of all student degrees and reports or repairs differences"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repair", action="store_true", help="write the recomputed values to the database")
+
+    def handle(self, *args, **options):
+        drifts = CourseService().recompute_ects_collected(repair=options["repair"])
+
+        # list every degree with a stored value that differs from the completed courses
+        for student_degree, stored_ects, expected_ects in drifts:
+            self.stdout.write(f"{student_degree}: stored {stored_ects} expected {expected_ects}")
+
+        if not drifts:
+            self.stdout.write(self.style.SUCCESS("collected ects of all student degrees are consistent"))
+        elif options["repair"]:
+            self.stdout.write(self.style.SUCCESS(f"repaired {len(drifts)} student degrees"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drifts)} student degrees differ, use --repair to fix them"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from Dashboard.services import CalendarService
+
+"""
+This file contains the command to verify the spent hours of the course registrations
+
+The command is executed with: python manage.py recompute_spent_hours [--repair]
+"""
+
+
+class Command(BaseCommand):
+    help = "Recomputes the spent hours of all course registrations and reports or repairs differences"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repair", action="store_true", help="write the recomputed values to the database")
+
+    def handle(self, *args, **options):
+        drifts = CalendarService().recompute_spent_hours(repair=options["repair"])
+
+        # list every registration with stored hours that differ from the bookings
+        for course_registration, stored_hours, expected_hours in drifts:
+            self.stdout.write(f"{course_registration}: stored {stored_hours} expected {expected_hours}")
+
+        if not drifts:
+            self.stdout.write(self.style.SUCCESS("spent hours of all course registrations are consistent"))
+        elif options["repair"]:
+            self.stdout.write(self.style.SUCCESS(f"repaired {len(drifts)} course registrations"))
+        else:
+            self.stdout.write(
+                self.style.WARNING(f"{len(drifts)} course registrations differ, use --repair to fix them"))
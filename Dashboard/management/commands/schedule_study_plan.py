@@ -0,0 +1,51 @@
+from datetime import datetime, date, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard.services import CalendarService, StudentService
+
+"""
+This file contains the command to plan learning sessions for the open courses of a student
+
+The command is executed with: python manage.py schedule_study_plan <student_id> <until_date> [--daily-hours <h>] ...
+Without --save the proposed sessions are only listed
+"""
+
+
+class Command(BaseCommand):
+    help = "Plans learning sessions for the remaining hours of the open courses of a student"
+
+    def add_arguments(self, parser):
+        parser.add_argument("student_id", type=int, help="id of the student")
+        parser.add_argument("until_date", type=date.fromisoformat, help="target completion date as YYYY-MM-DD")
+        parser.add_argument("--from-date", type=date.fromisoformat, help="first day of the plan, default is now")
+        parser.add_argument("--daily-hours", type=float, default=4, help="maximum learning hours per day")
+        parser.add_argument("--session-hours", type=float, default=2, help="maximum hours of a single session")
+        parser.add_argument("--save", action="store_true", help="insert the proposed sessions as bookings")
+
+    def handle(self, *args, **options):
+        if not StudentService().is_student_existing(options["student_id"]):
+            raise CommandError(f"student with id {options['student_id']} was not found")
+
+        window_start = datetime.combine(options["from_date"], time(0, 0)) if options["from_date"] else \
+            datetime.now().replace(second=0, microsecond=0)
+        window_end = datetime.combine(options["until_date"] + timedelta(days=1), time(0, 0))
+        if window_end <= window_start:
+            raise CommandError("the until date must not be before the first day of the plan")
+
+        calendar_service = CalendarService()
+        study_plan = calendar_service.plan_study_sessions(options["student_id"], (window_start, window_end),
+                                                          options["daily_hours"], options["session_hours"])
+
+        for booking in study_plan.bookings:
+            self.stdout.write(f"{booking.from_date} {booking.from_time:%H:%M} - {booking.until_time:%H:%M} "
+                              f"{booking.course_registration.course.name}")
+        for course_registration, hours in study_plan.unscheduled_hours.items():
+            self.stdout.write(self.style.WARNING(f"{course_registration.course.name}: {hours:.2f} hours do not fit"))
+
+        if options["save"]:
+            saved = calendar_service.save_study_plan(options["student_id"], study_plan)
+            self.stdout.write(self.style.SUCCESS(f"saved {saved} bookings with {study_plan.planned_hours:.2f} hours"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"proposed {len(study_plan.bookings)} bookings with "
+                                                 f"{study_plan.planned_hours:.2f} hours, use --save to insert them"))
@@ -0,0 +1,202 @@
+import time
+from contextlib import ContextDecorator
+from threading import Lock
+
+"""
+This file contains the metrics of the dashboard hot paths
+
+The metrics are kept in memory of the process and exported in the Prometheus text format
+by the MetricsView. Counters and histograms are thread safe and only need a lock and a few
+additions per observation.
+"""
+
+# default buckets in seconds for the duration histograms
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# buckets for the number of database queries per request
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 15, 20, 30, 50, 100, 250)
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Timer(ContextDecorator):
+    """
+    Measures the duration of a code block or function and observes it in a histogram
+    """
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+        self._start = None
+
+    def _recreate_cm(self):
+        # as decorator every call gets its own timer, so that concurrent calls do not share the start
+        return Timer(self._histogram)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Metric:
+    """
+    Base class of the metrics, a metric has a child for every combination of label values
+    """
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children = {}
+        self._lock = Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self.create_child()
+        return child
+
+    def create_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in sorted(children):
+            lines.extend(child.collect(self.name, dict(zip(self.labelnames, key))))
+        return lines
+
+
+class CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def collect(self, name: str, labels: dict) -> list[str]:
+        with self._lock:
+            value = self._value
+        return [f"{name}{format_labels(labels)} {format_value(value)}"]
+
+
+class HistogramChild:
+    def __init__(self, buckets: tuple):
+        self._buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            # the counts are stored per bucket and summed up cumulative on export
+            for index, bound in enumerate(self._buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+                    break
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> Timer:
+        return Timer(self)
+
+    def collect(self, name: str, labels: dict) -> list[str]:
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self._buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{format_labels(labels, le=format_value(bound))} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels(labels, le='+Inf')} {count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return lines
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def create_child(self):
+        return CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def create_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self) -> Timer:
+        return self.labels().time()
+
+
+class MetricsRegistry:
+    """
+    This registry holds all metrics that are exported
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def export(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(line for metric in metrics for line in metric.collect()) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION_SECONDS = registry.register(Histogram(
+    "dashboard_request_duration_seconds", "Duration of the dashboard view requests", ("method", "form_type")))
+REQUEST_QUERIES = registry.register(Histogram(
+    "dashboard_request_queries", "Number of database queries of the dashboard view requests",
+    ("method", "form_type"), QUERY_BUCKETS))
+TEMPLATE_RENDER_SECONDS = registry.register(Histogram(
+    "dashboard_template_render_seconds", "Duration of the dashboard template rendering"))
+CALENDAR_GENERATION_SECONDS = registry.register(Histogram(
+    "dashboard_calendar_generation_seconds", "Duration of the calendar week generation"))
+COURSE_LIST_SECONDS = registry.register(Histogram(
+    "dashboard_course_list_seconds", "Duration of building the course list", ("kind",)))
+CACHE_REQUESTS_TOTAL = registry.register(Counter(
+    "dashboard_cache_requests_total", "Lookups of cached dashboard sections", ("section", "result")))
@@ -0,0 +1,57 @@
+import logging
+
+from Dashboard.loader import activate_request_loader, deactivate_request_loader
+from Dashboard.profiling import ProfileCapture
+
+"""
+This file contains the middlewares of the dashboard
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLoaderMiddleware:
+    """
+    This middleware activates the request scoped identity map for the services
+    and logs how many lookups were answered without a database query
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        loader, token = activate_request_loader()
+        try:
+            return self.get_response(request)
+        finally:
+            deactivate_request_loader(token)
+            logger.debug("request loader %s %s: %d hits, %d misses",
+                         request.method, request.path, loader.hits, loader.misses)
+
+
+class ProfilingMiddleware:
+    """
+    This middleware profiles single requests of staff users on demand.
+    Profiling is requested with the query parameter profile or the header X-Profile,
+    the value memory also traces the memory allocations
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.GET.get("profile") or request.headers.get("X-Profile")
+        if not mode or not request.user.is_staff:
+            return self.get_response(request)
+
+        # the views skip their caches, otherwise the profile would only show cache lookups
+        request.profiling = True
+        with ProfileCapture(f"{request.method} {request.get_full_path()}", trace_memory=mode == "memory") as capture:
+            response = self.get_response(request)
+            # template responses are rendered lazily, so they are rendered within the profile
+            if hasattr(response, "render") and callable(response.render):
+                response.render()
+
+        # the request is not profiled if another request is profiled at the same time
+        response["X-Profile-Capture"] = capture.name if capture.active else "skipped"
+        return response
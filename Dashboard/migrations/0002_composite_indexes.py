@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Dashboard", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="courseregistration",
+            index=models.Index(
+                fields=["_student", "_course"], name="registration_student_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="examoutcome",
+            index=models.Index(
+                fields=["_course_registration", "_passed"],
+                name="examoutcome_registration_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="studentdegree",
+            index=models.Index(
+                fields=["_student", "_end_date"], name="studentdegree_student_end_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timeplanbooking",
+            index=models.Index(
+                fields=["_course_registration", "_from_date", "_from_time"],
+                name="booking_registration_from_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from datetime import date
+
+from django.db import migrations, models
+
+# ordinal of the 01.01.1970 which is the base of the minute ranges
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_minute(booking_date, booking_time):
+    return (booking_date.toordinal() - EPOCH_ORDINAL) * 24 * 60 + booking_time.hour * 60 + booking_time.minute
+
+
+def backfill_minutes(apps, schema_editor):
+    """
+    Calculates the minute range of the existing bookings in batches
+    """
+    TimePlanBooking = apps.get_model("Dashboard", "TimePlanBooking")
+    batch = []
+    for booking in TimePlanBooking.objects.only(
+        "_from_date", "_from_time", "_until_date", "_until_time"
+    ).iterator(chunk_size=2000):
+        booking._start_minute = to_minute(booking._from_date, booking._from_time)
+        booking._end_minute = to_minute(booking._until_date, booking._until_time)
+        batch.append(booking)
+        if len(batch) >= 2000:
+            TimePlanBooking.objects.bulk_update(batch, ["_start_minute", "_end_minute"])
+            batch = []
+    TimePlanBooking.objects.bulk_update(batch, ["_start_minute", "_end_minute"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Dashboard", "0002_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timeplanbooking",
+            name="_start_minute",
+            field=models.IntegerField(db_column="start_minute", editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="timeplanbooking",
+            name="_end_minute",
+            field=models.IntegerField(db_column="end_minute", editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_minutes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="timeplanbooking",
+            name="_start_minute",
+            field=models.IntegerField(db_column="start_minute", editable=False),
+        ),
+        migrations.AlterField(
+            model_name="timeplanbooking",
+            name="_end_minute",
+            field=models.IntegerField(db_column="end_minute", editable=False),
+        ),
+        migrations.RemoveIndex(
+            model_name="timeplanbooking",
+            name="booking_registration_from_idx",
+        ),
+        migrations.AddIndex(
+            model_name="timeplanbooking",
+            index=models.Index(
+                fields=["_course_registration", "_start_minute", "_end_minute"],
+                name="booking_registration_min_idx",
+            ),
+        ),
+    ]
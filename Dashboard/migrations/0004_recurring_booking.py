@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0003_booking_minute_range'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringBooking',
+            fields=[
+                ('_id', models.AutoField(db_column='id', primary_key=True, serialize=False)),
+                ('_start_date', models.DateField(db_column='start_date')),
+                ('_end_date', models.DateField(db_column='end_date')),
+                ('_from_time', models.TimeField(db_column='from_time')),
+                ('_until_time', models.TimeField(db_column='until_time')),
+                ('_interval_weeks', models.PositiveSmallIntegerField(db_column='interval_weeks', default=1)),
+                ('_materialized_until', models.DateField(blank=True, db_column='materialized_until', null=True)),
+                ('_course_registration', models.ForeignKey(db_column='course_registration', on_delete=django.db.models.deletion.CASCADE, to='Dashboard.courseregistration')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecurringBookingException',
+            fields=[
+                ('_id', models.AutoField(db_column='id', primary_key=True, serialize=False)),
+                ('_exception_date', models.DateField(db_column='exception_date')),
+                ('_recurring_booking', models.ForeignKey(db_column='recurring_booking', on_delete=django.db.models.deletion.CASCADE, to='Dashboard.recurringbooking')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recurringbooking',
+            index=models.Index(fields=['_course_registration', '_end_date'], name='recurring_registration_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recurringbookingexception',
+            constraint=models.UniqueConstraint(fields=('_recurring_booking', '_exception_date'), name='recurring_exception_unique'),
+        ),
+    ]
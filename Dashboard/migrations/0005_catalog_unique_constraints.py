@@ -0,0 +1,69 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+# fields of the unique constraints whose duplicates cannot be merged automatically
+CATALOG_UNIQUE_FIELDS = [
+    ("Degree", ["_university", "_name"]),
+    ("Semester", ["_degree", "_number"]),
+    ("Course", ["_degree", "_name"]),
+]
+
+
+def check_catalog_duplicates(apps, schema_editor):
+    """
+    Fails with a list of the duplicated degrees, semesters and courses before the constraints are added.
+    Those are referenced by the students, so they have to be merged or renamed in the admin panel first
+    """
+    duplicates = []
+    for model_name, fields in CATALOG_UNIQUE_FIELDS:
+        model = apps.get_model("Dashboard", model_name)
+        for duplicate in model.objects.values(*fields).annotate(ids=Count("_id")).filter(ids__gt=1):
+            ids = list(model.objects.filter(**{field: duplicate[field] for field in fields}).order_by(
+                "_id").values_list("_id", flat=True))
+            values = ", ".join(f"{field.lstrip('_')}={duplicate[field]}" for field in fields)
+            duplicates.append(f"{model_name} {values}: ids {', '.join(map(str, ids))}")
+
+    if duplicates:
+        raise RuntimeError("the catalog contains duplicates that violate the new unique constraints, "
+                           "merge or rename them before migrating:\n" + "\n".join(duplicates))
+
+
+def delete_duplicate_course_semesters(apps, schema_editor):
+    """
+    Deletes the duplicated assignments of a course to a semester, the first assignment is kept
+    """
+    CourseSemester = apps.get_model("Dashboard", "CourseSemester")
+    duplicates = CourseSemester.objects.values("_course", "_semester").annotate(
+        first_id=Min("_id"), count=Count("_id")).filter(count__gt=1)
+    for duplicate in duplicates:
+        CourseSemester.objects.filter(_course=duplicate["_course"], _semester=duplicate["_semester"]).exclude(
+            _id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Dashboard", "0004_recurring_booking"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_catalog_duplicates, migrations.RunPython.noop),
+        migrations.RunPython(delete_duplicate_course_semesters, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="degree",
+            constraint=models.UniqueConstraint(fields=["_university", "_name"], name="degree_university_name_unique"),
+        ),
+        migrations.AddConstraint(
+            model_name="semester",
+            constraint=models.UniqueConstraint(fields=["_degree", "_number"], name="semester_degree_number_unique"),
+        ),
+        migrations.AddConstraint(
+            model_name="course",
+            constraint=models.UniqueConstraint(fields=["_degree", "_name"], name="course_degree_name_unique"),
+        ),
+        migrations.AddConstraint(
+            model_name="coursesemester",
+            constraint=models.UniqueConstraint(fields=["_course", "_semester"], name="coursesemester_unique"),
+        ),
+    ]
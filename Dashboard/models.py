@@ -1,12 +1,17 @@
-from datetime import datetime
+from datetime import datetime, date, time
 
 from django.db import models
 
+from Dashboard.recurrence import RecurrenceRule
+
 """
 This file contains all database models
 Properties encapsulate the information 
 """
 
+# ordinal of the 01.01.1970 which is the base of the minute ranges
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
 
 class University(models.Model):
     """
@@ -93,6 +98,12 @@ class Degree(models.Model):
     _ects_goal = models.IntegerField(db_column="ects_goal")
     _university = models.ForeignKey(University, db_column="university", on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            # the catalog import identifies the degrees of a university by their name
+            models.UniqueConstraint(fields=["_university", "_name"], name="degree_university_name_unique"),
+        ]
+
     @property
     def id(self) -> int:
         return self._id
@@ -146,6 +157,12 @@ class Course(models.Model):
     _degree = models.ForeignKey(Degree, db_column="degree", on_delete=models.CASCADE)
     _university = models.ForeignKey(University, db_column="university", on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            # the catalog import identifies the courses of a degree by their name
+            models.UniqueConstraint(fields=["_degree", "_name"], name="course_degree_name_unique"),
+        ]
+
     @property
     def id(self) -> int:
         return self._id
@@ -223,6 +240,12 @@ class Semester(models.Model):
     _name = models.CharField(db_column="name", max_length=255)
     _number = models.IntegerField(db_column="number")
 
+    class Meta:
+        constraints = [
+            # the catalog import identifies the semesters of a degree by their number
+            models.UniqueConstraint(fields=["_degree", "_number"], name="semester_degree_number_unique"),
+        ]
+
     @property
     def id(self) -> int:
         return self._id
@@ -267,6 +290,12 @@ class CourseSemester(models.Model):
     _course = models.ForeignKey(Course, db_column="course", on_delete=models.CASCADE)
     _semester = models.ForeignKey(Semester, db_column="semester", on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            # a course is assigned to a semester only once
+            models.UniqueConstraint(fields=["_course", "_semester"], name="coursesemester_unique"),
+        ]
+
     @property
     def id(self) -> int:
         return self._id
@@ -312,6 +341,12 @@ class StudentDegree(models.Model):
     _end_date = models.DateField(db_column="end_date")
     _ects_collected = models.IntegerField(db_column="ects_collected")
 
+    class Meta:
+        indexes = [
+            # the active degree is looked up by student and end date
+            models.Index(fields=["_student", "_end_date"], name="studentdegree_student_end_idx"),
+        ]
+
     @property
     def id(self) -> int:
         return self._id
@@ -380,6 +415,12 @@ class CourseRegistration(models.Model):
     _spent_hours = models.FloatField(db_column="spent_hours", default=0)
     _completed = models.BooleanField(db_column="completed", default=False)
 
+    class Meta:
+        indexes = [
+            # registrations are looked up by student and course
+            models.Index(fields=["_student", "_course"], name="registration_student_idx"),
+        ]
+
     @property
     def id(self) -> int:
         return self._id
@@ -437,6 +478,12 @@ class ExamOutcome(models.Model):
     _grade = models.FloatField(db_column="grade")
     _passed = models.BooleanField(db_column="passed", default=False)
 
+    class Meta:
+        indexes = [
+            # the last outcome of a registration and the passed outcomes are looked up
+            models.Index(fields=["_course_registration", "_passed"], name="examoutcome_registration_idx"),
+        ]
+
     @property
     def id(self) -> int:
         return self._id
@@ -481,6 +528,8 @@ class TimePlanBooking(models.Model):
     Students have a time plan which covers the course registrations.
     Each time plan entry captures date and time for the learning sessions
     of the course.
+    For range queries the start and end are also stored as minutes since 01.01.1970,
+    those are kept in sync with the date and time fields when the booking is saved.
     """
     _id = models.AutoField(db_column="id", primary_key=True)
     _course_registration = models.ForeignKey(CourseRegistration, db_column="course_registration",
@@ -489,6 +538,15 @@ class TimePlanBooking(models.Model):
     _from_time = models.TimeField(db_column="from_time")
     _until_date = models.DateField(db_column="until_date")
     _until_time = models.TimeField(db_column="until_time")
+    _start_minute = models.IntegerField(db_column="start_minute", editable=False)
+    _end_minute = models.IntegerField(db_column="end_minute", editable=False)
+
+    class Meta:
+        indexes = [
+            # bookings of the registrations of a student are looked up by their minute range
+            models.Index(fields=["_course_registration", "_start_minute", "_end_minute"],
+                         name="booking_registration_min_idx"),
+        ]
 
     @property
     def id(self) -> int:
@@ -538,8 +596,212 @@ class TimePlanBooking(models.Model):
     def until_time(self, until_time: datetime):
         self._until_time = until_time
 
+    @property
+    def start_minute(self) -> int:
+        return self._start_minute
+
+    @property
+    def end_minute(self) -> int:
+        return self._end_minute
+
+    @staticmethod
+    def to_minute(booking_date: date, booking_time: time) -> int:
+        """
+        Converts a date and time to the minutes since 01.01.1970
+        """
+        return (booking_date.toordinal() - EPOCH_ORDINAL) * 24 * 60 + booking_time.hour * 60 + booking_time.minute
+
+    @staticmethod
+    def from_minute(minute: int) -> datetime:
+        """
+        Converts the minutes since 01.01.1970 back to a date and time
+        """
+        day, minute_of_day = divmod(minute, 24 * 60)
+        return datetime.combine(date.fromordinal(EPOCH_ORDINAL + day), time(minute_of_day // 60, minute_of_day % 60))
+
+    def update_minutes(self):
+        """
+        Calculates the minute range out of the date and time fields, this needs to be called
+        before bulk operations because those skip the save method
+        """
+        self._start_minute = self.to_minute(self._from_date, self._from_time)
+        self._end_minute = self.to_minute(self._until_date, self._until_time)
+
+    def save(self, *args, **kwargs):
+        # keep the minute range in sync with the date and time fields
+        self.update_minutes()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "_start_minute", "_end_minute"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         """
         Format display name of the entries to be displayed as course name - student name - id
         """
         return f'{self._course_registration.course.name} - {self._course_registration.student.name} - {self.id}'
+
+
+class RecurringBooking(models.Model):
+    """
+    Students often plan the same learning session every week. Instead of a booking per week
+    the recurring booking stores the rule once, its occurrences are only expanded for the
+    requested range. Occurrences are saved as bookings on demand, the materialized date marks
+    the last day whose occurrences exist as bookings and count into the spent hours.
+    """
+    _id = models.AutoField(db_column="id", primary_key=True)
+    _course_registration = models.ForeignKey(CourseRegistration, db_column="course_registration",
+                                             on_delete=models.CASCADE)
+    _start_date = models.DateField(db_column="start_date")
+    _end_date = models.DateField(db_column="end_date")
+    _from_time = models.TimeField(db_column="from_time")
+    _until_time = models.TimeField(db_column="until_time")
+    _interval_weeks = models.PositiveSmallIntegerField(db_column="interval_weeks", default=1)
+    _materialized_until = models.DateField(db_column="materialized_until", null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the rules of a student that still have occurrences are looked up
+            models.Index(fields=["_course_registration", "_end_date"], name="recurring_registration_idx"),
+        ]
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @id.setter
+    def id(self, id: int):
+        self._id = id
+
+    @property
+    def course_registration(self) -> CourseRegistration:
+        return self._course_registration
+
+    @course_registration.setter
+    def course_registration(self, course_registration: CourseRegistration):
+        self._course_registration = course_registration
+
+    @property
+    def start_date(self) -> date:
+        return self._start_date
+
+    @start_date.setter
+    def start_date(self, start_date: date):
+        self._start_date = start_date
+
+    @property
+    def end_date(self) -> date:
+        return self._end_date
+
+    @end_date.setter
+    def end_date(self, end_date: date):
+        self._end_date = end_date
+
+    @property
+    def from_time(self) -> time:
+        return self._from_time
+
+    @from_time.setter
+    def from_time(self, from_time: time):
+        self._from_time = from_time
+
+    @property
+    def until_time(self) -> time:
+        return self._until_time
+
+    @until_time.setter
+    def until_time(self, until_time: time):
+        self._until_time = until_time
+
+    @property
+    def interval_weeks(self) -> int:
+        return self._interval_weeks
+
+    @interval_weeks.setter
+    def interval_weeks(self, interval_weeks: int):
+        self._interval_weeks = interval_weeks
+
+    @property
+    def materialized_until(self) -> date | None:
+        return self._materialized_until
+
+    @materialized_until.setter
+    def materialized_until(self, materialized_until: date | None):
+        self._materialized_until = materialized_until
+
+    def to_rule(self, exceptions: list[date] = ()) -> RecurrenceRule:
+        """
+        Converts the recurring booking to the rule that expands the occurrences in minutes since 01.01.1970
+        """
+        return RecurrenceRule(
+            self._start_date.toordinal() - EPOCH_ORDINAL, self._end_date.toordinal() - EPOCH_ORDINAL,
+            self._from_time.hour * 60 + self._from_time.minute, self._until_time.hour * 60 + self._until_time.minute,
+            self._interval_weeks * 7, [exception.toordinal() - EPOCH_ORDINAL for exception in exceptions],
+            self._materialized_until.toordinal() - EPOCH_ORDINAL if self._materialized_until else None, self._id)
+
+    def get_occurrences(self, rule: RecurrenceRule, start_minute: int, end_minute: int) -> list[TimePlanBooking]:
+        """
+        Expands the occurrences within the minute range to unsaved bookings
+        """
+        occurrences = []
+        for occurrence_start, occurrence_end in rule.iter_occurrences(start_minute, end_minute):
+            start = TimePlanBooking.from_minute(occurrence_start)
+            end = TimePlanBooking.from_minute(occurrence_end)
+            booking = TimePlanBooking(_course_registration=self._course_registration, _from_date=start.date(),
+                                      _from_time=start.time(), _until_date=end.date(), _until_time=end.time())
+            booking.update_minutes()
+            occurrences.append(booking)
+        return occurrences
+
+    def __str__(self):
+        """
+        Format display name of the entries to be displayed as course name - student name - weekday
+        """
+        return f'{self._course_registration.course.name} - {self._course_registration.student.name} - ' \
+               f'{self._start_date:%A} {self._from_time:%H:%M}'
+
+
+class RecurringBookingException(models.Model):
+    """
+    The exceptions store the days on which a recurring booking does not take place
+    """
+    _id = models.AutoField(db_column="id", primary_key=True)
+    _recurring_booking = models.ForeignKey(RecurringBooking, db_column="recurring_booking",
+                                           on_delete=models.CASCADE)
+    _exception_date = models.DateField(db_column="exception_date")
+
+    class Meta:
+        constraints = [
+            # a recurring booking is skipped at most once per day
+            models.UniqueConstraint(fields=["_recurring_booking", "_exception_date"],
+                                    name="recurring_exception_unique"),
+        ]
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @id.setter
+    def id(self, id: int):
+        self._id = id
+
+    @property
+    def recurring_booking(self) -> RecurringBooking:
+        return self._recurring_booking
+
+    @recurring_booking.setter
+    def recurring_booking(self, recurring_booking: RecurringBooking):
+        self._recurring_booking = recurring_booking
+
+    @property
+    def exception_date(self) -> date:
+        return self._exception_date
+
+    @exception_date.setter
+    def exception_date(self, exception_date: date):
+        self._exception_date = exception_date
+
+    def __str__(self):
+        """
+        Format display name of the entries to be displayed as recurring booking - date
+        """
+        return f'{self._recurring_booking} - {self._exception_date}'
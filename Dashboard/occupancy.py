@@ -0,0 +1,92 @@
+from array import array
+
+"""
+This file contains the compact occupancy of the 15 minute slots of a calendar week
+
+Each day stores a bitmap with one bit per slot and an array with the number of the booking shown
+in each slot. The bookings themselves are stored once in a small table, so a week needs a few
+hundred bytes instead of one object per slot.
+"""
+
+SLOTS_PER_DAY = 24 * 4
+
+
+class WeekOccupancy:
+    """
+    This class stores which booking occupies the slots of the seven days of a week.
+    The bitmaps allow to test ranges of slots with a single operation, the slot arrays
+    reference the booking table with the booking index + 1, 0 marks a free slot
+    """
+    _bitmaps: list[int]
+    _slots: list[array]
+    _bookings: list[tuple[str, str, str]]
+
+    def __init__(self):
+        self._bitmaps = [0] * 7
+        self._slots = [array("H", bytes(2 * SLOTS_PER_DAY)) for _ in range(0, 7)]
+        self._bookings = []
+
+    @property
+    def bookings(self) -> list[tuple[str, str, str]]:
+        return self._bookings
+
+    def add_booking(self, entry_name: str, bg_color: str, fg_color: str) -> int:
+        """
+        Adds a booking to the booking table and returns its index
+        """
+        self._bookings.append((entry_name, bg_color, fg_color))
+        return len(self._bookings) - 1
+
+    def set(self, day: int, start_slot: int, end_slot: int, booking_index: int):
+        """
+        Occupies the slots from the start until the end slot (exclusive) with the booking.
+        Slots that are already occupied keep their booking, so the first booking set wins
+        """
+        mask = self.__get_mask(start_slot, end_slot)
+        free = mask & ~self._bitmaps[day]
+        slots = self._slots[day]
+        while free:
+            slot = (free & -free).bit_length() - 1
+            slots[slot] = booking_index + 1
+            free &= free - 1
+        self._bitmaps[day] |= mask
+
+    def is_free(self, day: int, start_slot: int, end_slot: int) -> bool:
+        """
+        Checks if all slots from the start until the end slot (exclusive) are free
+        """
+        return self._bitmaps[day] & self.__get_mask(start_slot, end_slot) == 0
+
+    def is_occupied(self, day: int, slot: int) -> bool:
+        return self._bitmaps[day] >> slot & 1 == 1
+
+    def get_booking(self, day: int, slot: int) -> tuple[str, str, str] | None:
+        """
+        Returns the entry name and the colors of the booking in the slot, None if the slot is free
+        """
+        booking_number = self._slots[day][slot]
+        return self._bookings[booking_number - 1] if booking_number else None
+
+    def get_runs(self, day: int) -> list[tuple[int, int, tuple[str, str, str] | None]]:
+        """
+        Returns the consecutive slots of the day with the same booking, or no booking, as tuples
+        of start slot, number of slots and booking
+        """
+        # a free day is a single run, so the slots are not scanned at all
+        if self._bitmaps[day] == 0:
+            return [(0, SLOTS_PER_DAY, None)]
+
+        runs = []
+        slots = self._slots[day]
+        start_slot = 0
+        for slot in range(1, SLOTS_PER_DAY + 1):
+            if slot == SLOTS_PER_DAY or slots[slot] != slots[start_slot]:
+                booking_number = slots[start_slot]
+                runs.append((start_slot, slot - start_slot, self._bookings[booking_number - 1] if booking_number
+                             else None))
+                start_slot = slot
+        return runs
+
+    def __get_mask(self, start_slot: int, end_slot: int) -> int:
+        # bits of the slots from the start until the end slot (exclusive)
+        return (1 << end_slot) - (1 << start_slot) if end_slot > start_slot else 0
@@ -0,0 +1,145 @@
+import cProfile
+import io
+import pstats
+import re
+import time
+import tracemalloc
+from pathlib import Path
+from threading import Lock
+
+from django.conf import settings
+
+"""
+This file contains the opt-in profiling of single requests
+
+A request is profiled with cProfile and optionally tracemalloc. The results are written to
+the capture directory as pstats dump and as text summary with the slowest functions and the
+top allocation sites. Only the newest captures are kept.
+"""
+
+# names of the capture files are generated and must match this pattern to be served
+CAPTURE_NAME_PATTERN = re.compile(r"^[\w.-]+\.(prof|txt)$")
+
+# only one profiler can be active per process since python 3.12, so only one request is profiled at a time
+_capture_lock = Lock()
+
+
+class ProfileCapture:
+    """
+    This class profiles a block of code and writes the results to the capture directory
+    """
+
+    def __init__(self, label: str, trace_memory: bool = False):
+        self._label = label
+        self._trace_memory = trace_memory
+        self._profiler = cProfile.Profile()
+        self._started_tracing = False
+        self._active = False
+        self._name = None
+
+    @property
+    def name(self) -> str | None:
+        return self._name
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def __enter__(self):
+        # while another capture is active the block is executed without profiling
+        if not _capture_lock.acquire(blocking=False):
+            return self
+        try:
+            self._profiler.enable()
+        except ValueError:
+            # another profiling tool like a debugger is active
+            _capture_lock.release()
+            return self
+        self._active = True
+
+        # tracemalloc traces the whole process, so allocations of parallel requests are included
+        if self._trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc):
+        if not self._active:
+            return False
+        self._profiler.disable()
+        snapshot = tracemalloc.take_snapshot() if self._trace_memory and tracemalloc.is_tracing() else None
+        if self._started_tracing:
+            tracemalloc.stop()
+        _capture_lock.release()
+
+        self._name = self.__write(snapshot)
+        rotate_captures()
+        return False
+
+    def __write(self, snapshot) -> str:
+        directory = get_capture_directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        # the name starts with the time so that the captures are sorted by their creation
+        label_slug = re.sub(r"[^\w]+", "-", self._label)[:60]
+        now = time.time_ns()
+        timestamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now // 10 ** 9))
+        name = f"{timestamp}-{now // 1000 % 10 ** 6:06d}-{label_slug}"
+
+        # the pstats dump can be analyzed with tools like snakeviz
+        self._profiler.dump_stats(directory / f"{name}.prof")
+
+        summary = io.StringIO()
+        summary.write(f"{self._label}\n\n")
+        stats = pstats.Stats(self._profiler, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(settings.DASHBOARD_PROFILE_TOP_ENTRIES)
+
+        if snapshot is not None:
+            summary.write("\nTop allocation sites\n\n")
+            for statistic in snapshot.statistics("lineno")[:settings.DASHBOARD_PROFILE_TOP_ENTRIES]:
+                summary.write(f"{statistic}\n")
+
+        (directory / f"{name}.txt").write_text(summary.getvalue())
+        return name
+
+
+def get_capture_directory() -> Path:
+    return Path(settings.DASHBOARD_PROFILE_DIR)
+
+
+def list_captures() -> list[dict]:
+    """
+    Returns the captures of the directory, newest first
+    """
+    directory = get_capture_directory()
+    if not directory.exists():
+        return []
+
+    captures = []
+    for summary in sorted(directory.glob("*.txt"), reverse=True):
+        captures.append({
+            "name": summary.stem,
+            "created": time.strftime("%d.%m.%Y %H:%M:%S", time.localtime(summary.stat().st_mtime)),
+            "label": summary.read_text().split("\n", 1)[0],
+            "summary": f"{summary.stem}.txt",
+            "dump": f"{summary.stem}.prof",
+        })
+    return captures
+
+
+def get_capture_file(file_name: str) -> Path | None:
+    """
+    Returns the path of a capture file, names that were not generated by a capture are rejected
+    """
+    if not CAPTURE_NAME_PATTERN.match(file_name):
+        return None
+    path = get_capture_directory() / file_name
+    return path if path.is_file() else None
+
+
+def rotate_captures():
+    """
+    Removes the oldest captures so that only the configured number of captures is kept
+    """
+    for capture in list_captures()[settings.DASHBOARD_PROFILE_KEEP:]:
+        for file_name in (capture["summary"], capture["dump"]):
+            (get_capture_directory() / file_name).unlink(missing_ok=True)
@@ -0,0 +1,126 @@
+import re
+from datetime import date, time
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from Dashboard.forms import GradeManagementForm, TimePlanManagementForm
+from Dashboard.models import StudentDegree
+from Dashboard.services import UniversityService, StudentService, CourseService, CalendarService, ExamService
+
+"""
+This file contains the check that the service queries are supported by indexes
+
+The service methods of the hot paths are executed for a student and their sql statements are captured.
+For each statement the sqlite query plan is requested with EXPLAIN QUERY PLAN and searched for tables
+that are scanned completely. The check is used by the tests and the command check_query_plans.
+"""
+
+
+def get_student_with_degree() -> int | None:
+    return StudentDegree.objects.filter(_end_date__gte=date.today()).order_by("_id").values_list(
+        "_student", flat=True).first()
+
+
+class QueryPlanChecker:
+    """
+    This class captures the queries of the service methods and returns the tables they scan completely.
+    It only supports sqlite databases
+    """
+
+    # tables that are listed completely on purpose, e.g. for the university selection
+    full_scan_tables = ["Dashboard_university"]
+
+    # keywords that can follow a table name instead of an alias
+    sql_keywords = ["WHERE", "ON", "LEFT", "INNER", "ORDER", "GROUP", "LIMIT", "SET"]
+
+    def __init__(self, student_id: int):
+        self._student_id = student_id
+        # all tables of the dashboard models are checked for full scans
+        self._model_tables = [model._meta.db_table for model in apps.get_app_config("Dashboard").get_models()]
+
+    def get_full_scans_per_method(self) -> list[tuple[str, list[tuple[str, list[str]]]]]:
+        """
+        Returns the service methods with their queries and the tables each query scans completely
+        """
+        return [(name, [(sql, self.get_full_scans(sql)) for sql in queries])
+                for name, queries in self.capture_service_queries()]
+
+    def capture_service_queries(self) -> list[tuple[str, list[str]]]:
+        """
+        Executes the service methods and captures the executed sql statements.
+        Write operations are executed within a transaction that is rolled back afterwards
+        """
+        student_id = self._student_id
+        student_service = StudentService()
+        course_service = CourseService()
+        calendar_service = CalendarService()
+        student = student_service.get_student_for_id(student_id)
+        course = course_service.get_courses_with_registration(student_id).first()
+
+        service_calls = [
+            ("UniversityService.get_university_list", lambda: UniversityService().get_university_list()),
+            ("StudentService.get_student_list", lambda: student_service.get_student_list(student.university.id)),
+            ("StudentService.get_student_detail", lambda: student_service.get_student_detail(student_id)),
+            ("StudentService.get_student_grade_average", lambda: student_service.get_student_grade_average(student_id)),
+            ("CourseService.get_course_list", lambda: course_service.get_course_list(student_id, "progress")),
+            ("CourseService.get_course_page", lambda: course_service.get_course_page(student_id, "grade", "desc")),
+            ("CourseService.get_course_options", lambda: course_service.get_course_options(student_id)),
+            ("CourseService.get_courses_for_student", lambda: list(course_service.get_courses_for_student(student_id))),
+            ("CourseService.get_course_registration_for_student",
+             lambda: course_service.get_course_registration_for_student(student_id, course.id)),
+            ("ExamService.get_all_exam_outcomes_for_student",
+             lambda: list(ExamService().get_all_exam_outcomes_for_student(student_id))),
+            ("CalendarService.get_time_plan_booking_between",
+             lambda: calendar_service.get_time_plan_booking_between(student_id, date.today(), time(8),
+                                                                    time(9)).exists()),
+            ("CalendarService.generate_calendar_week", lambda: calendar_service.generate_calendar_week(student_id)),
+            ("CourseService.save_grade_for_course", lambda: self.__save_grade(student_id, course.id)),
+            ("CalendarService.save_time_plan_booking", lambda: self.__save_time_plan_booking(student, course.id)),
+        ]
+
+        captured = []
+        for name, service_call in service_calls:
+            with transaction.atomic(), CaptureQueriesContext(connection) as context:
+                service_call()
+                transaction.set_rollback(True)
+            captured.append((name, [query["sql"] for query in context.captured_queries
+                                    if query["sql"].startswith(("SELECT", "UPDATE", "DELETE"))]))
+        return captured
+
+    def __save_grade(self, student_id: int, course_id: int):
+        grade_form = GradeManagementForm({"course_id": str(course_id), "grade": 1.0})
+        grade_form.is_valid()
+        CourseService().save_grade_for_course(student_id, grade_form)
+
+    def __save_time_plan_booking(self, student, course_id: int):
+        time_plan_form = TimePlanManagementForm({
+            "course_id": str(course_id), "student_id": str(student.id),
+            "from_date": date.today(), "from_time": time(3), "until_date": date.today(), "until_time": time(4)
+        })
+        time_plan_form.is_valid()
+        CalendarService().save_time_plan_booking(student, time_plan_form)
+
+    def get_full_scans(self, sql: str) -> list[str]:
+        """
+        Returns the model tables that are scanned completely according to the sqlite query plan.
+        The query plan uses the table aliases of the query, so they are resolved to the table names first
+        """
+        aliases = {}
+        for table, alias in re.findall(r'(?:FROM|JOIN) "(\w+)"(?: (\w+))?', sql):
+            aliases[table] = table
+            if alias and alias not in self.sql_keywords:
+                aliases[alias] = table
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = [row[-1] for row in cursor.fetchall()]
+
+        full_scans = []
+        for detail in plan:
+            match = re.match(r"SCAN (\w+)", detail)
+            table = aliases.get(match.group(1)) if match else None
+            if table in self._model_tables and table not in self.full_scan_tables:
+                full_scans.append(f"{table} ({detail})")
+        return full_scans
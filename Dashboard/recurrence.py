@@ -0,0 +1,71 @@
+"""
+This file contains the rule of a recurring booking which is expanded lazily
+
+The rule works on minutes since 01.01.1970 like the booking index. Only the occurrences that
+overlap a requested range are calculated, so a recurrence over a whole semester is stored as
+a single row and never expanded completely.
+"""
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class RecurrenceRule:
+    """
+    This class describes a booking that repeats every few weeks between a first and a last day.
+    The days are counted since 01.01.1970. Exceptions are days without an occurrence, occurrences
+    up to the materialized day exist as bookings and are skipped as well
+    """
+
+    def __init__(self, first_day: int, last_day: int, start_offset: int, end_offset: int, interval_days=7,
+                 exceptions=frozenset(), materialized_day: int | None = None, key=None):
+        self._first_day = first_day
+        self._last_day = last_day
+        # the start and end of each occurrence in minutes since the start of its day
+        self._start_offset = start_offset
+        self._end_offset = end_offset
+        self._interval_days = interval_days
+        self._exceptions = frozenset(exceptions)
+        self._materialized_day = materialized_day
+        self._key = key
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def duration(self) -> int:
+        return self._end_offset - self._start_offset
+
+    def iter_days(self, first_day: int, last_day: int):
+        """
+        Yields the days of the occurrences between the first and the last day (inclusive)
+        """
+        # occurrences before the window or already materialized are skipped arithmetically
+        if self._materialized_day is not None:
+            first_day = max(first_day, self._materialized_day + 1)
+        first_day = max(first_day, self._first_day)
+        number = -(-(first_day - self._first_day) // self._interval_days)
+        day = self._first_day + number * self._interval_days
+        while day <= min(last_day, self._last_day):
+            if day not in self._exceptions:
+                yield day
+            day += self._interval_days
+
+    def get_pending_minutes(self, until_day: int | None = None) -> int:
+        """
+        Returns the minutes of the occurrences that are not materialized yet,
+        optionally only the occurrences up to the given day (inclusive)
+        """
+        last_day = self._last_day if until_day is None else until_day
+        return self.duration * sum(1 for _ in self.iter_days(self._first_day, last_day))
+
+    def iter_occurrences(self, start_minute: int, end_minute: int):
+        """
+        Yields the occurrences that overlap the given minute range as tuples of start and end minute
+        """
+        # the first day whose occurrence ends after the range starts and the last day whose occurrence
+        # starts before the range ends
+        first_day = (start_minute - self._end_offset) // MINUTES_PER_DAY + 1
+        last_day = (end_minute - self._start_offset - 1) // MINUTES_PER_DAY
+        for day in self.iter_days(first_day, last_day):
+            yield day * MINUTES_PER_DAY + self._start_offset, day * MINUTES_PER_DAY + self._end_offset
@@ -0,0 +1,87 @@
+import heapq
+
+from Dashboard.booking_index import BookingIntervalIndex
+
+"""
+This file contains the scheduler that plans learning sessions for the remaining hours of the courses
+
+The scheduler works on minutes since 01.01.1970 like the booking index. It walks the days of the
+planning window once, takes the free ranges of each day from the booking index and fills them with
+sessions of the courses with the most remaining minutes. The daily quota spreads the remaining
+minutes evenly over the remaining days, so the plan is finished at the last day if possible.
+"""
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class StudyPlanScheduler:
+    """
+    This class plans sessions that neither overlap each other nor the bookings of the index.
+    Each course gets one session per day at most, a session is followed by a break
+    """
+
+    def __init__(self, booking_index: BookingIntervalIndex, daily_minutes: int, session_minutes: int,
+                 break_minutes=15, hours=(8, 22), granularity=15, min_session_minutes=30):
+        self._booking_index = booking_index
+        self._daily_minutes = daily_minutes
+        self._session_minutes = session_minutes
+        self._break_minutes = break_minutes
+        self._first_hour, self._last_hour = hours
+        self._granularity = granularity
+        self._min_session_minutes = min_session_minutes
+
+    def schedule(self, demands: dict[int, int], start_minute: int, end_minute: int) -> \
+            tuple[list[tuple[int, int, int]], dict[int, int]]:
+        """
+        Plans the demanded minutes per key between the start and the end minute.
+        Returns the sessions as tuples of key, start and end minute ordered by their start
+        and the minutes per key that did not fit into the window
+        """
+        remaining = {key: self.__round_up(minutes) for key, minutes in demands.items() if minutes > 0}
+        total = sum(remaining.values())
+
+        # the course with the most remaining minutes is planned first, the key keeps the order stable
+        queue = [(-minutes, key) for key, minutes in remaining.items()]
+        heapq.heapify(queue)
+
+        sessions = []
+        first_day = start_minute // MINUTES_PER_DAY
+        last_day = (end_minute - 1) // MINUTES_PER_DAY
+        for day in range(first_day, last_day + 1):
+            if total == 0:
+                break
+            # the remaining minutes are spread over the remaining days
+            quota = min(self._daily_minutes, self.__round_up(-(-total // (last_day - day + 1))))
+            day_start = max(start_minute, day * MINUTES_PER_DAY + self._first_hour * 60)
+            day_end = min(end_minute, day * MINUTES_PER_DAY + self._last_hour * 60)
+
+            planned_today = []
+            for free_start, free_end in self._booking_index.iter_free_ranges(day_start, day_end):
+                session_start = self.__round_up(free_start)
+                while queue and quota >= self._granularity:
+                    length = self.__round_down(min(self._session_minutes, -queue[0][0], quota,
+                                                   free_end - session_start))
+                    # short rests of a free range are skipped unless they finish the course
+                    if length < min(self._min_session_minutes, -queue[0][0]):
+                        break
+                    minutes, key = heapq.heappop(queue)
+                    sessions.append((key, session_start, session_start + length))
+                    planned_today.append((minutes + length, key))
+                    quota -= length
+                    total -= length
+                    session_start = self.__round_up(session_start + length + self._break_minutes)
+                if not queue or quota < self._granularity:
+                    break
+
+            # the courses planned today are available again from the next day on
+            for minutes, key in planned_today:
+                if minutes < 0:
+                    heapq.heappush(queue, (minutes, key))
+
+        return sessions, {key: -minutes for minutes, key in queue}
+
+    def __round_up(self, minute: int) -> int:
+        return -(-minute // self._granularity) * self._granularity
+
+    def __round_down(self, minute: int) -> int:
+        return minute // self._granularity * self._granularity
@@ -1,28 +1,53 @@
 from datetime import datetime, timedelta, time, date
-from operator import attrgetter
 
-from django.db.models import Sum, Avg, Q
-
-from Dashboard.dto import WeekDto, WeekDayDto, TimeSlotDto, CourseDto, StudentDto, StudentDetailsDto, UniversityDto
-from Dashboard.forms import TimePlanManagementForm, GradeManagementForm
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Sum, Avg, Q, F, FilteredRelation, OuterRef, QuerySet, Subquery, Case, When, Value, \
+    FloatField, DurationField, ExpressionWrapper, Count, IntegerField
+from django.db.models.functions import Coalesce, Round, Mod
+
+from Dashboard.analytics import UniversityAnalytics, QUARTERS_PER_WEEK
+from Dashboard.cache import DashboardCache, bump_student_version, bump_global_version
+from Dashboard.booking_index import BookingIntervalIndex, booking_index_registry
+from Dashboard.dto import WeekDto, WeekDayDto, CourseDto, StudentDto, StudentDetailsDto, UniversityDto, CoursePageDto, \
+    FreeSlotDto, StudyPlanDto, BookingImportDto, CatalogImportDto, CourseAnalyticsDto, DegreeAnalyticsDto, \
+    UniversityAnalyticsDto
+from Dashboard.exporter import GroupedRows
+from Dashboard.forms import TimePlanManagementForm, GradeManagementForm, BookingImportRowForm, CatalogRowForm
+from Dashboard.instrumentation import instrumented
+from Dashboard.loader import get_request_loader
+from Dashboard.metrics import CALENDAR_GENERATION_SECONDS, COURSE_LIST_SECONDS
 from Dashboard.models import Course, CourseRegistration, Student, StudentDegree, TimePlanBooking, CourseSemester, \
-    ExamOutcome, University
+    ExamOutcome, University, RecurringBooking, Degree, Semester
+from Dashboard.occupancy import WeekOccupancy
+from Dashboard.recurrence import RecurrenceRule, MINUTES_PER_DAY
+from Dashboard.scheduler import StudyPlanScheduler
 
 """
 This file contains all services that interact with the database models
 """
 
 
+@instrumented
 class UniversityService:
     """
     This service handled operations on the university database model.
     """
 
     def is_university_existing(self, university_id: int) -> bool:
-        return University.objects.filter(_id=university_id).exists()
+        return self.__load_university(university_id) is not None
 
     def get_university_for_id(self, university_id: int) -> University:
-        return University.objects.get(_id=university_id)
+        university = self.__load_university(university_id)
+        if university is None:
+            raise University.DoesNotExist(f"university with id {university_id} was not found")
+        return university
+
+    def __load_university(self, university_id: int) -> University | None:
+        # the university is only loaded once per request
+        return get_request_loader().get("university", int(university_id),
+                                        lambda: University.objects.filter(_id=university_id).first())
 
     def get_universities(self) -> list[University]:
         return University.objects.all()
@@ -32,17 +57,207 @@ class UniversityService:
         universities = self.get_universities()
         return [UniversityDto(x.id, x.name) for x in universities]
 
+    def get_university_analytics(self, university_id: int) -> UniversityAnalyticsDto:
+        """
+        Returns the analytics of the courses and degrees of the university. They are cached with a short
+        timeout, because they are not invalidated if the data of a student changes
+        """
+        return DashboardCache().get_or_set("analytics", lambda: self.__calculate_university_analytics(
+            university_id), int(university_id), timeout=settings.DASHBOARD_ANALYTICS_TIMEOUT)
 
+    def __calculate_university_analytics(self, university_id: int) -> UniversityAnalyticsDto:
+        """
+        Aggregates the exam outcomes, registrations, degrees and bookings of the university with one query each,
+        the statistics of all courses and degrees are calculated out of the aggregated rows
+        """
+        university = self.get_university_for_id(university_id)
+        courses = list(Course.objects.filter(_university___id=university_id).order_by("_id").values_list(
+            "_id", "_name", "_degree___name", "_expected_hours"))
+        degrees = list(Degree.objects.filter(_university___id=university_id).order_by("_id").values_list(
+            "_id", "_name", "_ects_goal"))
+        analytics = UniversityAnalytics([course[0] for course in courses], [degree[0] for degree in degrees])
+
+        registrations, average_spent_hours = analytics.get_registration_statistics(
+            CourseRegistration.objects.filter(_course___university___id=university_id).values_list(
+                "_course").annotate(Count("_id"), Sum("_spent_hours")).order_by())
+        exam_attempts, pass_rates, average_grades, grade_distributions = analytics.get_exam_statistics(
+            ExamOutcome.objects.filter(_course_registration___course___university___id=university_id).values_list(
+                "_course_registration___course", "_grade").annotate(Count("_id")).order_by())
+        students, average_progress, median_progress, progress_distributions = analytics.get_progress_statistics(
+            StudentDegree.objects.filter(_degree___university___id=university_id).values_list(
+                "_degree", "_degree___ects_goal", "_ects_collected").annotate(Count("_id")).order_by())
+
+        # the bookings are grouped by the quarter hour of the week in which they start and their length,
+        # the bookings start and end at quarter hours
+        booking_density = analytics.get_booking_density(
+            TimePlanBooking.objects.filter(_course_registration___course___university___id=university_id).annotate(
+                week_quarter=Mod(F("_start_minute") / 15, QUARTERS_PER_WEEK, output_field=IntegerField()),
+                quarters=(F("_end_minute") - F("_start_minute") + 14) / 15
+            ).values_list("week_quarter", "quarters").annotate(Count("_id")).order_by())
+
+        return UniversityAnalyticsDto(
+            university.id, university.name,
+            [CourseAnalyticsDto(course_id, name, degree_name, expected_hours, *statistics)
+             for (course_id, name, degree_name, expected_hours), *statistics in zip(
+                courses, registrations, average_spent_hours, exam_attempts, pass_rates, average_grades,
+                grade_distributions)],
+            [DegreeAnalyticsDto(degree_id, name, ects_goal, *statistics)
+             for (degree_id, name, ects_goal), *statistics in zip(
+                degrees, students, average_progress, median_progress, progress_distributions)],
+            booking_density, datetime.now())
+
+    def import_catalog(self, university: University, rows, dry_run=False) -> CatalogImportDto:
+        """
+        Imports the degrees, semesters and courses of a catalog for the university. The degrees are identified
+        by their name, the semesters by their number and the courses by their name within the degree.
+        The rows are validated and merged in memory first, a catalog with errors is not imported at all.
+        Afterwards the catalog is compared with the existing entries and only the changes are written with one
+        bulk upsert per model within one transaction. Entries that are missing in the catalog are kept
+        """
+        errors = []
+        degrees = {}
+        semesters = {}
+        courses = {}
+        course_semesters = set()
+        for row in rows:
+            if "error" in row:
+                errors.append((row["line"], row["error"]))
+                continue
+            form = CatalogRowForm(row)
+            if not form.is_valid():
+                errors.append((row["line"], "; ".join(error if field == "__all__" else f"{field}: {error}"
+                                                      for field, field_errors in form.errors.items()
+                                                      for error in field_errors)))
+                continue
+
+            data = form.cleaned_data
+            degree = data["degree"]
+            self.__merge_catalog_entry(degrees, degree, {"ects_goal": data["ects_goal"]}, row["line"], errors)
+            if data["semester"] is not None:
+                self.__merge_catalog_entry(semesters, (degree, data["semester"]),
+                                           {"name": data["semester_name"] or None}, row["line"], errors)
+            if data["course"]:
+                self.__merge_catalog_entry(courses, (degree, data["course"]), {
+                    "ects_points": data["ects_points"], "expected_hours": data["expected_hours"],
+                    "bg_color": data["bg_color"] or None, "fg_color": data["fg_color"] or None,
+                }, row["line"], errors)
+                if data["semester"] is not None:
+                    course_semesters.add((degree, data["course"], data["semester"]))
+        if errors:
+            return CatalogImportDto([], errors)
+
+        # the existing entries are loaded with their natural keys, so the catalog is compared in memory
+        existing_degrees = {name: {"ects_goal": ects_goal} for name, ects_goal in Degree.objects.filter(
+            _university=university).values_list("_name", "_ects_goal")}
+        existing_semesters = {(degree, number): {"name": name} for degree, number, name in Semester.objects.filter(
+            _degree___university=university).values_list("_degree___name", "_number", "_name")}
+        existing_courses = {(degree, name): {
+            "ects_points": ects_points, "expected_hours": expected_hours, "bg_color": bg_color, "fg_color": fg_color,
+        } for degree, name, ects_points, expected_hours, bg_color, fg_color in Course.objects.filter(
+            _degree___university=university).values_list(
+            "_degree___name", "_name", "_ects_points", "_expected_hours", "_bg_color", "_fg_color")}
+        existing_course_semesters = set(CourseSemester.objects.filter(_course___degree___university=university)
+                                        .values_list("_course___degree___name", "_course___name",
+                                                     "_semester___number"))
+
+        changes = []
+        changed_degrees = self.__get_catalog_changes(changes, "degree", degrees, existing_degrees)
+        changed_semesters = self.__get_catalog_changes(changes, "semester", semesters, existing_semesters)
+        changed_courses = self.__get_catalog_changes(changes, "course", courses, existing_courses)
+        new_course_semesters = sorted(course_semesters - existing_course_semesters)
+        changes += [("create", "course semester", f"{degree} / {course} / {number}")
+                    for degree, course, number in new_course_semesters]
+        if dry_run or not changes:
+            return CatalogImportDto(changes, errors)
+
+        with transaction.atomic():
+            # bulk_create skips the signals, so the cached sections of all students are invalidated here
+            transaction.on_commit(bump_global_version)
+
+            # after each model the ids are loaded by the natural keys to resolve the foreign keys of the next one
+            Degree.objects.bulk_create([
+                Degree(_university=university, _name=name, **{f"_{field}": value for field, value in values.items()})
+                for name, values in changed_degrees
+            ], update_conflicts=True, unique_fields=["_university", "_name"], update_fields=["_ects_goal"],
+                batch_size=1000)
+            degree_ids = dict(Degree.objects.filter(_university=university).values_list("_name", "_id"))
+
+            # new semesters without a name are named after their number
+            Semester.objects.bulk_create([
+                Semester(_degree_id=degree_ids[degree], _number=number, _name=values["name"] or f"Semester {number}")
+                for (degree, number), values in changed_semesters
+            ], update_conflicts=True, unique_fields=["_degree", "_number"], update_fields=["_name"], batch_size=1000)
+            semester_ids = {(degree, number): semester_id for degree, number, semester_id in Semester.objects.filter(
+                _degree___university=university).values_list("_degree___name", "_number", "_id")}
+
+            Course.objects.bulk_create([
+                Course(_university=university, _degree_id=degree_ids[degree], _name=name,
+                       **{f"_{field}": value for field, value in values.items() if value is not None})
+                for (degree, name), values in changed_courses
+            ], update_conflicts=True, unique_fields=["_degree", "_name"],
+                update_fields=["_ects_points", "_expected_hours", "_bg_color", "_fg_color"], batch_size=1000)
+            course_ids = {(degree, name): course_id for degree, name, course_id in Course.objects.filter(
+                _degree___university=university).values_list("_degree___name", "_name", "_id")}
+
+            CourseSemester.objects.bulk_create([
+                CourseSemester(_course_id=course_ids[(degree, course)], _semester_id=semester_ids[(degree, number)])
+                for degree, course, number in new_course_semesters
+            ], ignore_conflicts=True, batch_size=1000)
+        return CatalogImportDto(changes, errors)
+
+    def __merge_catalog_entry(self, entries: dict, key, values: dict, line, errors: list):
+        """
+        Merges the values of a row into the catalog entry, a value that is not given does not change the entry.
+        If a row contains a different value than a previous row of the same entry the row is rejected
+        """
+        entry = entries.setdefault(key, {"line": line, **dict.fromkeys(values)})
+        for field, value in values.items():
+            if value is None:
+                continue
+            if entry[field] is None:
+                entry[field] = value
+            elif entry[field] != value:
+                errors.append((line, f"{field} {value} differs from {entry[field]} in line {entry['line']}"))
+
+    def __get_catalog_changes(self, changes: list, entry_type: str, entries: dict, existing_entries: dict) -> \
+            list[tuple]:
+        """
+        Compares the catalog entries with the existing ones, the changes are added to the list and the
+        created or updated entries are returned with their values. Values that are not given in the
+        catalog keep their existing value
+        """
+        changed_entries = []
+        for key, entry in entries.items():
+            values = {field: value for field, value in entry.items() if field != "line"}
+            description = " / ".join(str(part) for part in key) if isinstance(key, tuple) else key
+            existing = existing_entries.get(key)
+            if existing is None:
+                changes.append(("create", entry_type, description))
+                changed_entries.append((key, values))
+                continue
+
+            differences = [f"{field} {existing[field]} -> {value}" for field, value in values.items()
+                           if value is not None and existing[field] != value]
+            if differences:
+                changes.append(("update", entry_type, f"{description}: {', '.join(differences)}"))
+                changed_entries.append((key, {field: value if value is not None else existing[field]
+                                              for field, value in values.items()}))
+        return changed_entries
+
+
+@instrumented
 class StudentService:
     """
     This service handles the base operations on the Student database model
     """
 
     def is_student_existing(self, student_id: int) -> bool:
-        return Student.objects.filter(_id=student_id).exists()
+        return self.get_student_for_id(student_id) is not None
 
     def get_student_for_id(self, student_id: int) -> Student:
-        return Student.objects.filter(_id=student_id).first()
+        # the student is only loaded once per request
+        return get_request_loader().get("student", int(student_id),
+                                        lambda: Student.objects.filter(_id=student_id).first())
 
     def get_student_detail(self, student_id: int)-> StudentDetailsDto:
         """
@@ -79,27 +294,98 @@ class StudentService:
 
     def get_student_degree_for_student(self, student_id: int) -> StudentDegree:
         """
-        A student can have multiple degrees but the one that has not ended will be fetched
+        A student can have multiple degrees but the one that has not ended will be fetched.
+        The degree is only loaded once per request together with the student, university and degree
         """
-        return StudentDegree.objects.filter(_student___id=student_id, _end_date__gte=datetime.today()).first()
+        return get_request_loader().get("student_degree", int(student_id), lambda: self.get_active_student_degrees(
+            student_id).select_related("_student___university", "_degree").first())
 
+    def get_active_student_degrees(self, student_id: int) -> QuerySet[StudentDegree]:
+        """
+        Returns the degrees of the student that have not ended yet, ordered like the active degree lookup
+        so that the result can also be used as subquery
+        """
+        return StudentDegree.objects.filter(_student___id=student_id, _end_date__gte=datetime.today()).order_by("_id")
 
+    def iter_transcripts_for_university(self, university_id: int):
+        """
+        Yields the transcript of each student of the university as dictionary with the degrees and their
+        progress and the course registrations with their spent hours and exam outcomes.
+        The students, degrees, registrations and exam outcomes are read with one query each, all sorted by
+        the student, and merged while they are read in chunks. So the number of queries and the memory
+        do not depend on the number of students
+        """
+        chunk_size = settings.DASHBOARD_EXPORT_CHUNK_SIZE
+        students = Student.objects.filter(_university___id=university_id).order_by("_id").values_list(
+            "_id", "_first_name", "_last_name").iterator(chunk_size=chunk_size)
+        degrees = GroupedRows(StudentDegree.objects.filter(_student___university___id=university_id).order_by(
+            "_student", "_id").values_list(
+            "_student", "_degree", "_degree___name", "_degree___ects_goal", "_ects_collected", "_start_date",
+            "_end_date").iterator(chunk_size=chunk_size))
+        registrations = GroupedRows(CourseRegistration.objects.filter(
+            _student___university___id=university_id).order_by("_student", "_id").values_list(
+            "_student", "_id", "_course", "_course___name", "_course___degree", "_course___ects_points",
+            "_course___expected_hours", "_spent_hours", "_completed").iterator(chunk_size=chunk_size))
+        exam_outcomes = GroupedRows(ExamOutcome.objects.filter(
+            _course_registration___student___university___id=university_id).order_by(
+            "_course_registration___student", "_course_registration", "_id").values_list(
+            "_course_registration___student", "_course_registration", "_grade", "_passed").iterator(
+            chunk_size=chunk_size))
+
+        for student_id, first_name, last_name in students:
+            exams_per_registration = {}
+            for _, registration_id, grade, passed in exam_outcomes.pop(student_id):
+                exams_per_registration.setdefault(registration_id, []).append({"grade": grade, "passed": passed})
+
+            yield {
+                "student_id": student_id,
+                "first_name": first_name,
+                "last_name": last_name,
+                "degrees": [{
+                    "degree_id": degree_id,
+                    "name": name,
+                    "ects_goal": ects_goal,
+                    "ects_collected": ects_collected,
+                    "progress": round(ects_collected / ects_goal * 100, 1) if ects_goal else 0.0,
+                    "start_date": start_date.isoformat(),
+                    "end_date": end_date.isoformat(),
+                } for _, degree_id, name, ects_goal, ects_collected, start_date, end_date in degrees.pop(student_id)],
+                "courses": [{
+                    "course_id": course_id,
+                    "name": name,
+                    "degree_id": degree_id,
+                    "ects_points": ects_points,
+                    "expected_hours": expected_hours,
+                    "spent_hours": spent_hours,
+                    "completed": completed,
+                    "exams": exams_per_registration.get(registration_id, []),
+                } for _, registration_id, course_id, name, degree_id, ects_points, expected_hours, spent_hours,
+                    completed in registrations.pop(student_id)],
+            }
+
+
+@instrumented
 class CourseService:
     """
     This service handles the base operations on the Course database model
     """
 
     def is_course_existing(self, course_id: int) -> bool:
-        return Course.objects.filter(_id=course_id).exists()
+        return self.get_course_for_id(course_id) is not None
 
     def is_course_registered_for_student(self, student_id: int, course_id: int) -> bool:
-        return CourseRegistration.objects.filter(_student___id=student_id, _course___id=course_id).exists()
+        return self.get_course_registration_for_student(student_id, course_id) is not None
 
     def get_course_for_id(self, course_id: int) -> Course:
-        return Course.objects.filter(_id=course_id).first()
+        # the course is only loaded once per request
+        return get_request_loader().get("course", int(course_id),
+                                        lambda: Course.objects.filter(_id=course_id).first())
 
     def get_course_registration_for_student(self, student_id: int, course_id: int) -> CourseRegistration:
-        return CourseRegistration.objects.filter(_student___id=student_id, _course___id=course_id).first()
+        # the registration is only loaded once per request
+        return get_request_loader().get(
+            "course_registration", (int(student_id), int(course_id)),
+            lambda: CourseRegistration.objects.filter(_student___id=student_id, _course___id=course_id).first())
 
     def get_courses_for_student(self, student_id: int) -> list[CourseRegistration]:
         student_degree = StudentService().get_student_degree_for_student(student_id)
@@ -109,101 +395,220 @@ class CourseService:
         return CourseSemester.objects.filter(_course___id=course_id).first()
 
     def save_grade_for_course(self, student_id: int, grade_form: GradeManagementForm):
+        """
+        Saves the grade of the course and keeps the collected ects of the active degree up to date.
+        Instead of summing up all completed courses again, the ects points of the course are only
+        added or removed if the completed status of the registration changes
+        """
         course_id = grade_form.cleaned_data["course_id"]
         grade = grade_form.cleaned_data["grade"]
 
-        # verify that the registration exists, if not create a new one
-        if not self.is_course_registered_for_student(student_id, course_id):
-            self.save_new_course_registration(student_id, course_id)
+        with transaction.atomic():
+            # the cached dashboard of the student is invalidated once the changes are committed
+            transaction.on_commit(lambda: bump_student_version(student_id))
 
-        course_registration = self.get_course_registration_for_student(student_id, course_id)
+            # the registration and the degree are changed, so they are loaded again within this request
+            request_loader = get_request_loader()
+            request_loader.discard("course_registration", (int(student_id), int(course_id)))
+            request_loader.discard("student_degree", int(student_id))
 
-        # save the exam using the exam service
-        exam_service = ExamService()
-        exam_service.save_exam_outcome_for_registration(course_registration.id, grade)
+            # fetch the registration with its course, if none exists a new one is created
+            course_registration = self.get_or_create_course_registration(student_id, course_id, for_update=True)
 
-        # if exam is passed then mark course as complete
-        course_registration.completed = grade <= 4 and grade >= 1
-        course_registration.save()
+            # save the exam using the exam service
+            ExamService().save_exam_outcome_for_registration(course_registration.id, grade)
 
-        # fetch all completed course registrations for active degree and student that are completed
-        degree = StudentService().get_student_degree_for_student(student_id)
-        registrations = CourseRegistration.objects.filter(_student___id=student_id, _course___degree=degree.degree,
-                                                          _completed=True)
+            # if exam is passed then mark course as complete
+            completed = grade <= 4 and grade >= 1
+            if course_registration.completed == completed:
+                return
 
-        # sum up course total ects points
-        if registrations:
-            total_ects = registrations.aggregate(Sum("_course___ects_points"))["_course___ects_points__sum"]
-        else:
-            total_ects = 0
+            CourseRegistration.objects.filter(_id=course_registration.id).update(_completed=completed)
 
-        # update totals on degree status
-        degree.ects_collected = total_ects
-        degree.save()
+            # apply the ects points of the course as delta to the active degree the course belongs to
+            ects_points = course_registration.course.ects_points
+            ects_delta = ects_points if completed else -ects_points
+            StudentDegree.objects.filter(
+                _id__in=StudentService().get_active_student_degrees(student_id).values("_id")[:1],
+                _degree_id=course_registration.course._degree_id
+            ).update(_ects_collected=F("_ects_collected") + ects_delta)
+
+    def recompute_ects_collected(self, repair=False) -> list[tuple[StudentDegree, int, int]]:
+        """
+        Sums up the ects points of all completed courses for every student degree from scratch
+        and returns the degrees whose stored value differs as tuple with the stored and expected value.
+        If repair is set the stored values are corrected
+        """
+        completed_ects = CourseRegistration.objects.filter(
+            _student=OuterRef("_student"),
+            _course___degree=OuterRef("_degree"),
+            _completed=True
+        ).values("_student").annotate(total=Sum("_course___ects_points")).values("total")
+
+        student_degrees = StudentDegree.objects.select_related("_student", "_degree").annotate(
+            expected_ects=Coalesce(Subquery(completed_ects), 0)
+        ).exclude(_ects_collected=F("expected_ects")).order_by("_id")
+
+        drifts = [(student_degree, student_degree.ects_collected, student_degree.expected_ects)
+                  for student_degree in student_degrees]
+
+        if repair and drifts:
+            for student_degree, _, expected_ects in drifts:
+                student_degree.ects_collected = expected_ects
+            StudentDegree.objects.bulk_update([student_degree for student_degree, _, _ in drifts], ["_ects_collected"])
+
+        return drifts
 
     def save_new_course_registration(self, student_id: int, course_id: int):
         CourseRegistration.objects.create(
             _course=Course.objects.filter(_id=course_id).first(),
             _student=StudentService().get_student_for_id(student_id))
 
+    def get_or_create_course_registration(self, student_id: int, course_id: int,
+                                          for_update=False) -> CourseRegistration:
+        """
+        Returns the first registration of the student for the course with its course, if none exists a new one
+        is created. The schema allows duplicated registrations, so get_or_create is not used because it fails
+        on those
+        """
+        registrations = CourseRegistration.objects.select_related("_course").filter(
+            _student_id=student_id, _course_id=course_id)
+        course_registration = (registrations.select_for_update() if for_update else registrations).first()
+        if course_registration is None:
+            course_registration = CourseRegistration.objects.create(_student_id=student_id, _course_id=course_id)
+        return course_registration
+
+    @COURSE_LIST_SECONDS.labels(kind="list").time()
     def get_course_list(self, student_id: int, sort_field='', sort_direction='') -> list[CourseDto]:
         """
         This helper method is used to create a list of course dto object for display and
         allows also to hand in sorting options for the display
         """
-        course_list = []
-        degree = StudentService().get_student_degree_for_student(student_id)
-        courses = Course.objects.filter(_degree=degree.degree)
-        exam_service = ExamService()
-
-        # loop all courses
-        for course in courses:
-            # fetch the course registration if it exists
-            registration = self.get_course_registration_for_student(student_id, course.id)
-
-            grade = 0
-            progress = 0
-            hours_spent = 0
-            if registration:
-                # fetch grade information
-                exam_outcome = exam_service.get_last_exam_outcome_for_registration(registration.id)
-                if exam_outcome:
-                    grade = exam_outcome.grade
-
-                # fetch progress information
-                hours_spent = registration.spent_hours
-                progress = registration.spent_hours / course.expected_hours if registration is not None else 0
-                progress = round(progress, 2)
-                if grade > 0:
-                    progress = 1
-
-            # format the progress as nice decimal 0.00%
-            display_progress = f"{progress:.2%}"
-            if progress > 1:
-                display_progress = f"-{(progress - 1):.2%}"
-
-            # build the dto list
-            course_list.append(
-                CourseDto(
-                    course_id=course.id,
-                    name=course.name,
-                    progress=progress if grade == 0 else 1,
-                    formatted_progress=display_progress,
-                    expected_hours=course.expected_hours,
-                    spent_hours=hours_spent,
-                    grade=grade
-                )
-            )
+        courses = self.get_courses_with_registration(student_id).order_by(
+            *self.__get_course_ordering(sort_field, sort_direction))
+        return [self.__create_course_dto(course) for course in courses]
+
+    @COURSE_LIST_SECONDS.labels(kind="page").time()
+    def get_course_page(self, student_id: int, sort_field='', sort_direction='', page_number=1) -> CoursePageDto:
+        """
+        This method works like the course list but only fetches the courses of the requested page,
+        the dto objects are created for the visible courses only
+        """
+        courses = self.get_courses_with_registration(student_id).order_by(
+            *self.__get_course_ordering(sort_field, sort_direction))
+        page = Paginator(courses, settings.DASHBOARD_COURSE_PAGE_SIZE).get_page(page_number)
+        return CoursePageDto([self.__create_course_dto(course) for course in page.object_list],
+                             page.number, page.paginator.num_pages)
+
+    @COURSE_LIST_SECONDS.labels(kind="options").time()
+    def get_course_options(self, student_id: int) -> list[CourseDto]:
+        """
+        Fetches the courses for the selection fields of the forms, only the id, name and
+        progress are loaded from the database
+        """
+        courses = self.get_courses_with_registration(student_id).values_list("_id", "_name", "course_progress")
+        return [CourseDto(course_id=course_id, name=name, progress=progress)
+                for course_id, name, progress in courses]
 
+    def get_courses_with_registration(self, student_id: int) -> QuerySet[Course]:
+        """
+        Fetches all courses of the active degree of the student within a single query.
+        The registration of the student is joined with a LEFT JOIN and the grade of the
+        last exam outcome is annotated with a correlated subquery.
+        Progress and grade are also calculated by the database so that the courses can be sorted
+        """
+        last_exam_outcome = ExamOutcome.objects.filter(
+            _course_registration=OuterRef("student_registration___id")
+        ).order_by("-_id")
+        # the schema allows duplicated registrations, only the first registration per course is joined
+        first_registration = CourseRegistration.objects.filter(
+            _student=student_id, _course=OuterRef("_id")
+        ).order_by("_id")
+
+        # the occurrences of the recurring bookings up to today count into the spent hours,
+        # even if the materialization did not save them as bookings yet
+        pending_hours = get_request_loader().get(
+            "pending_hours", (int(student_id), date.today()),
+            lambda: CalendarService().get_pending_hours(date.today(), student_id=student_id))
+        registration_spent_hours = F("student_registration___spent_hours")
+        if pending_hours:
+            registration_spent_hours = registration_spent_hours + Case(
+                *[When(student_registration___id=registration_id, then=Value(hours))
+                  for registration_id, hours in pending_hours.items()],
+                default=Value(0.0), output_field=FloatField())
+
+        return Course.objects.filter(
+            _degree__in=StudentService().get_active_student_degrees(student_id).values("_degree")[:1]
+        ).alias(
+            first_registration_id=Subquery(first_registration.values("_id")[:1]),
+        ).annotate(
+            student_registration=FilteredRelation(
+                "courseregistration", condition=Q(courseregistration___id=F("first_registration_id"))
+            ),
+            registration_id=F("student_registration___id"),
+            registration_spent_hours=registration_spent_hours,
+            last_grade=Subquery(last_exam_outcome.values("_grade")[:1]),
+        ).annotate(
+            # the grade is 0 as long as no exam outcome exists
+            course_grade=Coalesce("last_grade", Value(0.0)),
+            # a graded course is always completed, otherwise the spent hours define the progress
+            course_progress=Case(
+                When(registration_id__isnull=True, then=Value(0.0)),
+                When(course_grade__gt=0, then=Value(1.0)),
+                default=Round(F("registration_spent_hours") / F("_expected_hours"), 2),
+                output_field=FloatField(),
+            ),
+        ).order_by("_id")
+
+    def __get_course_ordering(self, sort_field: str, sort_direction: str) -> list[str]:
+        """
+        Translates the sort options of the course table into database ordering.
+        The sort links of the table use 'asc' for the descending display and 'desc' for the ascending display
+        """
         # ensure that the correct sort field name is given otherwise remove sort
-        if sort_field in ['name', 'progress', 'grade']:
+        sort_fields = {'name': '_name', 'progress': 'course_progress', 'grade': 'course_grade'}
+        if sort_field in sort_fields:
             if sort_direction == 'asc' or sort_direction == '':
-                return sorted(course_list, key=attrgetter(sort_field), reverse=True)
+                return [f'-{sort_fields[sort_field]}', '_id']
             elif sort_direction == 'desc':
-                return sorted(course_list, key=attrgetter(sort_field), reverse=False)
-        return course_list
+                return [sort_fields[sort_field], '_id']
+        return ['_id']
 
+    def __create_course_dto(self, course: Course) -> CourseDto:
+        """
+        Creates the course dto out of a course that is annotated with the registration and grade
+        """
+        grade = 0
+        progress = 0
+        hours_spent = 0
+        if course.registration_id is not None:
+            # fetch grade information
+            if course.last_grade is not None:
+                grade = course.last_grade
+
+            # fetch progress information
+            hours_spent = course.registration_spent_hours
+            progress = round(hours_spent / course.expected_hours, 2)
+            if grade > 0:
+                progress = 1
+
+        # format the progress as nice decimal 0.00%
+        display_progress = f"{progress:.2%}"
+        if progress > 1:
+            display_progress = f"-{(progress - 1):.2%}"
+
+        return CourseDto(
+            course_id=course.id,
+            name=course.name,
+            progress=progress if grade == 0 else 1,
+            formatted_progress=display_progress,
+            expected_hours=course.expected_hours,
+            spent_hours=hours_spent,
+            grade=grade
+        )
 
+
+@instrumented
 class CalendarService:
     """
     This service handles the base operations on the TimePlanBooking database model.
@@ -211,7 +616,7 @@ class CalendarService:
     """
 
     def get_time_plan_bookings_for_student(self, student_id: int) -> list[TimePlanBooking]:
-        return TimePlanBooking.objects.filter(_course_registration___student__id=student_id).all()
+        return TimePlanBooking.objects.filter(_course_registration___student___id=student_id).all()
 
     def get_time_plan_bookings_form_date(self, student_id: str, from_date: date) -> list[TimePlanBooking]:
         return TimePlanBooking.objects.filter(_course_registration___student___id=student_id,
@@ -221,28 +626,277 @@ class CalendarService:
             list[TimePlanBooking]:
         # this model filter uses the Q object to build a more complex query
         # this allows the use of logic operations like AND , OR
+        # two bookings overlap if each one starts before the other one ends
         return TimePlanBooking.objects.filter(
             Q(_course_registration___student___id=student_id) &
-            Q(_from_date=from_date) &
-            Q(_from_time__lt=until_time) &
-            Q(_until_time__gt=from_time)
+            Q(_start_minute__lt=TimePlanBooking.to_minute(from_date, until_time)) &
+            Q(_end_minute__gt=TimePlanBooking.to_minute(from_date, from_time))
         ).all()
 
+    def get_booking_index(self, student_id: int) -> BookingIntervalIndex:
+        """
+        Returns the in memory index of the bookings of the student, it is built on first use
+        and invalidated if a booking of the student is saved or deleted. The index is also built again
+        if the cache versions of the student changed within another process. The recurring bookings
+        are kept as rules within the index
+        """
+        return booking_index_registry.get(
+            student_id,
+            lambda x: TimePlanBooking.objects.filter(_course_registration___student___id=x).values_list(
+                "_start_minute", "_end_minute", "_id"),
+            self.__get_recurrence_rules,
+            tuple(DashboardCache(student_id).get_versions()))
+
+    def has_time_plan_booking_conflict(self, student_id: int, from_date: date, from_time: time,
+                                       until_time: time) -> bool:
+        """
+        Checks if a booking of the student overlaps the given time range with the booking index,
+        so no query is needed once the index is built. Bookings saved within another process bump
+        the cache versions of the student, which rebuilds the index, if the cache is shared
+        """
+        return self.get_booking_index(student_id).has_overlapping(
+            TimePlanBooking.to_minute(from_date, from_time), TimePlanBooking.to_minute(from_date, until_time))
+
+    def get_time_plan_booking_ids_overlapping(self, student_id: int, start_minute: int, end_minute: int) -> list[int]:
+        """
+        Returns the ids of the bookings of the student that overlap the given minute range
+        """
+        return self.get_booking_index(student_id).get_overlapping(start_minute, end_minute)
+
+    def find_free_slots(self, student_id: int, duration: timedelta, window: tuple[datetime, datetime],
+                        granularity=15, limit=5) -> list[FreeSlotDto]:
+        """
+        Returns the next free slots of the student within the window that fit the duration.
+        Only the configured hours of each day are searched and a slot starts at a multiple of the
+        granularity. The free ranges are taken from the booking index, so each free range results
+        in one slot at its earliest start
+        """
+        # the duration is rounded up to the granularity like the bookings are
+        duration_minutes = -(-int(duration.total_seconds() // 60) // granularity) * granularity
+        first_hour, last_hour = settings.DASHBOARD_FREE_SLOT_HOURS
+        window_start = TimePlanBooking.to_minute(window[0].date(), window[0].time())
+        window_end = TimePlanBooking.to_minute(window[1].date(), window[1].time())
+        booking_index = self.get_booking_index(student_id)
+
+        free_slots = []
+        search_date = window[0].date()
+        while len(free_slots) < limit and search_date <= window[1].date():
+            # bookings are only allowed within a day, so every day is searched on its own
+            day_start = max(window_start, TimePlanBooking.to_minute(search_date, time(first_hour)))
+            day_end = min(window_end, TimePlanBooking.to_minute(search_date, time(0)) + last_hour * 60)
+
+            for free_start, free_end in booking_index.iter_free_ranges(day_start, day_end):
+                slot_start = -(-free_start // granularity) * granularity
+                if slot_start + duration_minutes <= free_end:
+                    free_slots.append(FreeSlotDto(TimePlanBooking.from_minute(slot_start),
+                                                  TimePlanBooking.from_minute(slot_start + duration_minutes)))
+                    if len(free_slots) == limit:
+                        break
+            search_date += timedelta(days=1)
+        return free_slots
+
+    def plan_study_sessions(self, student_id: int, window: tuple[datetime, datetime], daily_hours: float,
+                            session_hours=2.0) -> StudyPlanDto:
+        """
+        Proposes bookings for the hours the open courses of the student still need within the window.
+        The bookings are not saved, they fill the free ranges of the configured hours and neither
+        overlap each other nor the existing bookings of the student
+        """
+        # the spent hours already contain the planned bookings, so only the missing hours are planned
+        course_registrations = {registration.id: registration for registration in CourseRegistration.objects.filter(
+            _student___id=student_id, _completed=False,
+            _course___expected_hours__gt=F("_spent_hours")).select_related("_course").order_by("_id")}
+        demands = {registration_id: int(round((registration.course.expected_hours - registration.spent_hours) * 60))
+                   for registration_id, registration in course_registrations.items()}
+
+        # the occurrences of the recurring bookings that are not materialized yet will be spent as well
+        for recurring_booking in self.get_recurring_bookings(student_id):
+            if recurring_booking.course_registration.id in demands:
+                demands[recurring_booking.course_registration.id] -= self.__get_recurrence_rule(
+                    recurring_booking).get_pending_minutes()
+
+        scheduler = StudyPlanScheduler(self.get_booking_index(student_id), int(daily_hours * 60),
+                                       int(session_hours * 60), hours=settings.DASHBOARD_FREE_SLOT_HOURS)
+        sessions, unscheduled = scheduler.schedule(demands, TimePlanBooking.to_minute(window[0].date(),
+                                                                                      window[0].time()),
+                                                   TimePlanBooking.to_minute(window[1].date(), window[1].time()))
+
+        bookings = []
+        for registration_id, start_minute, end_minute in sessions:
+            start = TimePlanBooking.from_minute(start_minute)
+            end = TimePlanBooking.from_minute(end_minute)
+            booking = TimePlanBooking(_course_registration=course_registrations[registration_id],
+                                      _from_date=start.date(), _from_time=start.time(),
+                                      _until_date=end.date(), _until_time=end.time())
+            booking.update_minutes()
+            bookings.append(booking)
+
+        return StudyPlanDto(bookings, {course_registrations[registration_id]: minutes / 60
+                                       for registration_id, minutes in unscheduled.items()})
+
+    def save_study_plan(self, student_id: int, study_plan: StudyPlanDto) -> int:
+        """
+        Inserts the proposed bookings with a single bulk_create and adds their durations
+        to the spent hours of the registrations. Returns the number of saved bookings
+        """
+        if not study_plan.bookings:
+            return 0
+
+        with transaction.atomic():
+            self.__insert_bookings(study_plan.bookings)
+        booking_index_registry.invalidate(student_id)
+        return len(study_plan.bookings)
+
+    def __insert_bookings(self, bookings: list[TimePlanBooking]):
+        """
+        Inserts the bookings with a single bulk_create and adds their durations to the spent hours
+        of the registrations. bulk_create skips the signals, so the cached dashboards are invalidated
+        here, the caller has to drop the booking indexes after the transaction
+        """
+        spent_minutes = {}
+        student_ids = set()
+        for booking in bookings:
+            registration = booking.course_registration
+            if registration.id not in spent_minutes:
+                spent_minutes[registration.id] = 0
+                student_ids.add(registration._student_id)
+                # the registration is changed, so it is loaded again within this request
+                get_request_loader().discard("course_registration", (registration._student_id,
+                                                                     registration._course_id))
+            spent_minutes[registration.id] += booking.end_minute - booking.start_minute
+
+        for student_id in student_ids:
+            transaction.on_commit(lambda x=student_id: bump_student_version(x))
+        TimePlanBooking.objects.bulk_create(bookings)
+
+        # the spent hours of all registrations are updated with a single statement
+        CourseRegistration.objects.filter(_id__in=spent_minutes).update(_spent_hours=F("_spent_hours") + Case(
+            *[When(_id=registration_id, then=Value(minutes / 60)) for registration_id, minutes in
+              spent_minutes.items()], output_field=FloatField()))
+
+    def get_recurring_bookings(self, student_id: int) -> QuerySet[RecurringBooking]:
+        """
+        Returns the recurring bookings of the student that still have occurrences which are
+        not materialized, together with their course and exceptions
+        """
+        return RecurringBooking.objects.filter(
+            Q(_course_registration___student___id=student_id) &
+            (Q(_materialized_until__isnull=True) | Q(_materialized_until__lt=F("_end_date")))
+        ).select_related("_course_registration___course").prefetch_related(
+            "recurringbookingexception_set").order_by("_id")
+
+    def __get_recurrence_rules(self, student_id: int) -> list[RecurrenceRule]:
+        return [self.__get_recurrence_rule(recurring_booking) for recurring_booking in
+                self.get_recurring_bookings(student_id)]
+
+    def __get_recurrence_rule(self, recurring_booking: RecurringBooking) -> RecurrenceRule:
+        # the exceptions are prefetched with the recurring bookings
+        return recurring_booking.to_rule([exception.exception_date for exception in
+                                          recurring_booking.recurringbookingexception_set.all()])
+
+    def get_recurring_booking_conflict(self, student_id: int, from_date: date, from_time: time, until_time: time,
+                                       until_date: date, interval_weeks=1) -> date | None:
+        """
+        Checks every occurrence of a new recurring booking with the booking index like
+        has_time_plan_booking_conflict and returns the first date with a conflict, None if all occurrences are free
+        """
+        booking_index = self.get_booking_index(student_id)
+        current_date = from_date
+        while current_date <= until_date:
+            if booking_index.has_overlapping(TimePlanBooking.to_minute(current_date, from_time),
+                                             TimePlanBooking.to_minute(current_date, until_time)):
+                return current_date
+            current_date += timedelta(weeks=interval_weeks)
+        return None
+
+    def get_pending_hours(self, until_date: date, student_id: int | None = None,
+                          course_registration_id: int | None = None) -> dict[int, float]:
+        """
+        Returns the hours of the occurrences up to the given date that are not materialized yet
+        per course registration id. The recurring bookings can be limited to a student or a registration
+        """
+        until_day = TimePlanBooking.to_minute(until_date, time(0, 0)) // MINUTES_PER_DAY
+        pending_hours = {}
+        for recurring_booking in self.__get_due_recurring_bookings(
+                until_date, student_id, course_registration_id).prefetch_related("recurringbookingexception_set"):
+            registration_id = recurring_booking._course_registration_id
+            pending_hours[registration_id] = pending_hours.get(registration_id, 0) + self.__get_recurrence_rule(
+                recurring_booking).get_pending_minutes(until_day) / 60
+        return pending_hours
+
+    def save_recurring_booking(self, student: Student, course_id: int, from_date: date, from_time: time,
+                               until_time: time, until_date: date, interval_weeks=1) -> RecurringBooking:
+        """
+        Saves the rule of a recurring booking, the occurrences until today are materialized
+        right away so that they count into the spent hours like the other bookings
+        """
+        with transaction.atomic():
+            course_registration = CourseService().get_or_create_course_registration(student.id, course_id)
+            recurring_booking = RecurringBooking.objects.create(
+                _course_registration=course_registration, _start_date=from_date, _end_date=until_date,
+                _from_time=from_time, _until_time=until_time, _interval_weeks=interval_weeks)
+        self.materialize_recurring_bookings(date.today(), student_id=student.id)
+        return recurring_booking
+
+    def materialize_recurring_bookings(self, until_date: date, student_id: int | None = None,
+                                       course_registration_id: int | None = None) -> int:
+        """
+        Saves the occurrences of the recurring bookings until the given date as bookings, so that
+        they count into the spent hours. The recurring bookings can be limited to a student or a
+        registration. Returns the number of saved bookings. This writes to the database, so it is
+        only called when a rule is saved and by the command materialize_recurring_bookings
+        """
+        recurring_bookings = self.__get_due_recurring_bookings(until_date, student_id, course_registration_id)
+
+        # usually nothing is due, which is checked with a single query before any row is locked
+        recurring_booking_ids = list(recurring_bookings.values_list("_id", flat=True))
+        if not recurring_booking_ids:
+            return 0
+
+        with transaction.atomic():
+            # the rows are locked and checked again, so that concurrent requests do not save the same occurrences
+            recurring_bookings = list(recurring_bookings.filter(_id__in=recurring_booking_ids).select_related(
+                "_course_registration").prefetch_related("recurringbookingexception_set").select_for_update())
+
+            bookings = []
+            for recurring_booking in recurring_bookings:
+                last_date = min(until_date, recurring_booking.end_date)
+                bookings += recurring_booking.get_occurrences(
+                    self.__get_recurrence_rule(recurring_booking),
+                    TimePlanBooking.to_minute(recurring_booking.start_date, time(0, 0)),
+                    TimePlanBooking.to_minute(last_date + timedelta(days=1), time(0, 0)))
+                recurring_booking.materialized_until = last_date
+
+            RecurringBooking.objects.bulk_update(recurring_bookings, ["_materialized_until"])
+            self.__insert_bookings(bookings)
+
+        # only the indexes and pending hours of the students whose rules were materialized are dropped
+        for changed_student_id in {recurring_booking.course_registration._student_id
+                                   for recurring_booking in recurring_bookings}:
+            booking_index_registry.invalidate(changed_student_id)
+            get_request_loader().discard("pending_hours", (changed_student_id, date.today()))
+        return len(bookings)
+
+    def __get_due_recurring_bookings(self, until_date: date, student_id: int | None,
+                                     course_registration_id: int | None) -> QuerySet[RecurringBooking]:
+        """
+        Filters the recurring bookings with occurrences up to the given date that are not materialized yet
+        """
+        recurring_bookings = RecurringBooking.objects.filter(
+            Q(_start_date__lte=until_date) &
+            (Q(_materialized_until__isnull=True) | Q(_materialized_until__lt=F("_end_date")) &
+             Q(_materialized_until__lt=until_date)))
+        if student_id is not None:
+            recurring_bookings = recurring_bookings.filter(_course_registration___student___id=student_id)
+        if course_registration_id is not None:
+            recurring_bookings = recurring_bookings.filter(_course_registration___id=course_registration_id)
+        return recurring_bookings
+
     def save_time_plan_booking(self, student: Student, time_plan_form: TimePlanManagementForm):
         """
         This method is a helper to properly update the exam results and also
         update the status of the courses and registrations
         """
-        course_registration = CourseRegistration.objects.filter(_student=student,
-                                                                _course___id=time_plan_form.cleaned_data[
-                                                                    "course_id"]).first()
-        # verify that the course registration exists, otherwise create new one
-        if not course_registration:
-            CourseService().save_new_course_registration(student.id, time_plan_form.cleaned_data["course_id"])
-            course_registration = CourseRegistration.objects.filter(_student=student,
-                                                                    _course___id=time_plan_form.cleaned_data[
-                                                                        "course_id"]).first()
-
         # verify that the from time is in 15 min steps
         from_time = time_plan_form.cleaned_data["from_time"]
         if from_time.minute % 15 > 0:
@@ -253,31 +907,222 @@ class CalendarService:
         if until_time.minute % 15 > 0:
             until_time = time(until_time.hour, until_time.minute - until_time.minute % 15)
 
-        # create and save the new time booking
-        TimePlanBooking.objects.create(
-            _course_registration=course_registration,
-            _from_date=time_plan_form.cleaned_data["from_date"],
-            _from_time=from_time,
-            _until_date=time_plan_form.cleaned_data["until_date"],
-            _until_time=until_time
-        )
+        from_date = time_plan_form.cleaned_data["from_date"]
+        until_date = time_plan_form.cleaned_data["until_date"]
+
+        # a repeated booking is saved as a single rule instead of a booking per week
+        if time_plan_form.cleaned_data.get("repeat_until"):
+            self.save_recurring_booking(student, int(time_plan_form.cleaned_data["course_id"]), from_date, from_time,
+                                        until_time, time_plan_form.cleaned_data["repeat_until"])
+            return
+
+        with transaction.atomic():
+            # the cached dashboard of the student is invalidated once the changes are committed
+            transaction.on_commit(lambda: bump_student_version(student.id))
+
+            # the registration is changed, so it is loaded again within this request
+            get_request_loader().discard("course_registration",
+                                         (student.id, int(time_plan_form.cleaned_data["course_id"])))
+
+            # verify that the course registration exists, otherwise create new one
+            course_registration = CourseService().get_or_create_course_registration(
+                student.id, time_plan_form.cleaned_data["course_id"])
+
+            # create and save the new time booking
+            TimePlanBooking.objects.create(
+                _course_registration=course_registration,
+                _from_date=from_date,
+                _from_time=from_time,
+                _until_date=until_date,
+                _until_time=until_time
+            )
+
+            # only the duration of the new booking is added to the spent hours of the registration
+            time_in_seconds = (datetime.combine(until_date, until_time) -
+                               datetime.combine(from_date, from_time)).total_seconds()
+            CourseRegistration.objects.filter(_id=course_registration.id).update(
+                _spent_hours=F("_spent_hours") + time_in_seconds / 60 / 60)
 
-        # recalculate the spent time with timedelta to seconds
-        time_in_seconds = 0
-        result = TimePlanBooking.objects.filter(_course_registration=course_registration).all()
-        for entry in result:
-            time_in_seconds += (datetime.combine(entry.until_date, entry.until_time) -
-                                datetime.combine(entry.from_date, entry.from_time)).total_seconds()
+    def import_bookings(self, student: Student, rows, dry_run=False) -> BookingImportDto:
+        """
+        Imports the rows of a booking file for the student. Every row is validated with the rules of
+        the time plan form, afterwards the conflicts of all rows are checked in one pass over the rows
+        sorted by their start. The valid bookings are inserted with bulk_create and the spent hours
+        of the affected registrations are recomputed once
+        """
+        # the courses of the university of the student are looked up in memory,
+        # a course is given by its id or by its name
+        course_ids_by_name = dict(Course.objects.filter(_university___id=student.university.id).values_list(
+            "_name", "_id"))
+        course_ids = set(course_ids_by_name.values())
+
+        errors = []
+        candidates = []
+        for row_number, row in enumerate(rows, start=1):
+            if row_number > settings.DASHBOARD_IMPORT_MAX_ROWS:
+                errors.append((row["line"], f"only {settings.DASHBOARD_IMPORT_MAX_ROWS} rows can be imported"))
+                break
+            if "error" in row:
+                errors.append((row["line"], row["error"]))
+                continue
+
+            form = BookingImportRowForm(row)
+            if not form.is_valid():
+                errors.append((row["line"], "; ".join(error for field_errors in form.errors.values()
+                                                      for error in field_errors)))
+                continue
+
+            course = form.cleaned_data["course"]
+            course_id = int(course) if course.isnumeric() and int(course) in course_ids else \
+                course_ids_by_name.get(course)
+            if course_id is None:
+                errors.append((row["line"], f'course {course} does not exist'))
+                continue
+
+            from_date = form.cleaned_data["from_date"]
+            candidates.append((TimePlanBooking.to_minute(from_date, form.cleaned_data["from_time"]),
+                               TimePlanBooking.to_minute(from_date, form.cleaned_data["until_time"]),
+                               row["line"], course_id))
+
+        # the rows are checked against the existing bookings and against the previous rows of the file,
+        # the accepted rows do not overlap, so the end of the last accepted row is the latest end
+        booking_index = self.get_booking_index(student.id)
+        accepted = []
+        for start_minute, end_minute, line, course_id in sorted(candidates):
+            if booking_index.has_overlapping(start_minute, end_minute):
+                errors.append((line, "Booking are conflicting with an existing booking"))
+            elif accepted and start_minute < accepted[-1][1]:
+                errors.append((line, f"Booking are conflicting with the booking in line {accepted[-1][2]}"))
+            else:
+                accepted.append((start_minute, end_minute, line, course_id))
+
+        errors.sort()
+        if dry_run or not accepted:
+            return BookingImportDto(len(accepted), errors)
+
+        with transaction.atomic():
+            # bulk_create skips the signals, so the caches and indexes are invalidated here
+            transaction.on_commit(lambda: bump_student_version(student.id))
+
+            # the missing registrations are created like the time plan form does it, the registrations
+            # are sorted descending, so the first registration of a course is used like the lookups do it
+            course_registrations = {}
+            course_ids = {course_id for _, _, _, course_id in accepted}
+            for course_registration in CourseRegistration.objects.filter(
+                    _student=student, _course___id__in=course_ids).order_by("-_id"):
+                course_registrations[course_registration._course_id] = course_registration
+            new_registrations = [CourseRegistration(_student=student, _course_id=course_id)
+                                 for course_id in sorted(course_ids) if course_id not in course_registrations]
+            for course_registration in CourseRegistration.objects.bulk_create(new_registrations):
+                course_registrations[course_registration._course_id] = course_registration
+
+            bookings = []
+            for start_minute, end_minute, _, course_id in accepted:
+                start = TimePlanBooking.from_minute(start_minute)
+                end = TimePlanBooking.from_minute(end_minute)
+                booking = TimePlanBooking(_course_registration=course_registrations[course_id],
+                                          _from_date=start.date(), _from_time=start.time(),
+                                          _until_date=end.date(), _until_time=end.time())
+                booking.update_minutes()
+                bookings.append(booking)
+            TimePlanBooking.objects.bulk_create(bookings, batch_size=1000)
+
+            # the spent hours of each affected registration are recomputed once from its bookings
+            registrations = {registration.id: registration for registration in course_registrations.values()}
+            for registration_id, duration in TimePlanBooking.objects.filter(
+                    _course_registration___id__in=registrations).values("_course_registration").annotate(
+                    total=Sum(self.__get_booking_duration())).values_list("_course_registration", "total"):
+                registrations[registration_id].spent_hours = self.__get_hours_from_duration(duration)
+            CourseRegistration.objects.bulk_update(registrations.values(), ["_spent_hours"])
+
+            for course_id in course_registrations:
+                get_request_loader().discard("course_registration", (student.id, course_id))
+        booking_index_registry.invalidate(student.id)
+        return BookingImportDto(len(bookings), errors)
+
+    def iter_calendar_feed_events(self, student_id: int, start_minute: int | None = None,
+                                  end_minute: int | None = None):
+        """
+        Yields the bookings of the student that overlap the minute range as events of the calendar feed,
+        followed by the occurrences of the recurring bookings that are not materialized yet. The bookings
+        are read in chunks as tuples, so the models are never created and the whole plan is never in memory
+        """
+        bookings = TimePlanBooking.objects.filter(_course_registration___student___id=student_id)
+        if start_minute is not None:
+            bookings = bookings.filter(_end_minute__gt=start_minute)
+        if end_minute is not None:
+            bookings = bookings.filter(_start_minute__lt=end_minute)
+        for booking_id, booking_start, booking_end, name, bg_color, fg_color in bookings.order_by(
+                "_start_minute", "_id").values_list(
+                "_id", "_start_minute", "_end_minute", "_course_registration___course___name",
+                "_course_registration___course___bg_color", "_course_registration___course___fg_color"
+        ).iterator(chunk_size=settings.DASHBOARD_FEED_CHUNK_SIZE):
+            yield f"booking-{booking_id}@dashboard", booking_start, booking_end, name, bg_color, fg_color
+
+        # the occurrences are expanded lazily, the rules end at their last day if no range end is given
+        for recurring_booking in self.get_recurring_bookings(student_id):
+            course = recurring_booking.course_registration.course
+            rule = self.__get_recurrence_rule(recurring_booking)
+            for occurrence_start, occurrence_end in rule.iter_occurrences(
+                    start_minute if start_minute is not None else 0,
+                    end_minute if end_minute is not None else TimePlanBooking.to_minute(date.max, time(0, 0))):
+                yield (f"recurring-{recurring_booking.id}-{occurrence_start}@dashboard", occurrence_start,
+                       occurrence_end, course.name, course.bg_color, course.fg_color)
+
+    def get_spent_hours_for_registration(self, course_registration: int) -> float:
+        """
+        Calculates the spent hours of a course registration from scratch by summing up
+        the durations of all bookings within the database. The occurrences of the recurring
+        bookings up to today are counted as well, even if they are not materialized yet
+        """
+        duration = TimePlanBooking.objects.filter(_course_registration___id=course_registration).aggregate(
+            total=Sum(self.__get_booking_duration()))["total"]
+        pending_hours = self.get_pending_hours(date.today(), course_registration_id=course_registration)
+        return self.__get_hours_from_duration(duration) + pending_hours.get(int(course_registration), 0)
+
+    def recompute_spent_hours(self, repair=False) -> list[tuple[CourseRegistration, float, float]]:
+        """
+        Recalculates the spent hours of all course registrations from their bookings and returns
+        the registrations whose stored value differs as tuple with the stored and expected value.
+        If repair is set the stored values are corrected
+        """
+        booked_duration = TimePlanBooking.objects.filter(
+            _course_registration=OuterRef("_id")
+        ).values("_course_registration").annotate(total=Sum(self.__get_booking_duration())).values("total")
+
+        course_registrations = CourseRegistration.objects.select_related("_student", "_course").annotate(
+            booked_duration=Subquery(booked_duration, output_field=DurationField())
+        ).order_by("_id")
+
+        drifts = []
+        for course_registration in course_registrations:
+            expected_hours = self.__get_hours_from_duration(course_registration.booked_duration)
 
-        # convert seconds to hours
-        spent_hours = 0
-        if time_in_seconds > 0:
-            spent_hours = time_in_seconds / 60 / 60
+            # the hours are summed up as float, so small rounding differences are accepted
+            if abs(course_registration.spent_hours - expected_hours) > 1e-6:
+                drifts.append((course_registration, course_registration.spent_hours, expected_hours))
 
-        # assign the spent hours back to the registration
-        course_registration.spent_hours = spent_hours
-        course_registration.save()
+        if repair and drifts:
+            for course_registration, _, expected_hours in drifts:
+                course_registration.spent_hours = expected_hours
+            CourseRegistration.objects.bulk_update([registration for registration, _, _ in drifts], ["_spent_hours"])
 
+        return drifts
+
+    def __get_booking_duration(self) -> ExpressionWrapper:
+        """
+        Database expression for the duration of a booking out of the separate date and time columns
+        """
+        return ExpressionWrapper((F("_until_date") - F("_from_date")) + (F("_until_time") - F("_from_time")),
+                                 output_field=DurationField())
+
+    def __get_hours_from_duration(self, duration: timedelta | None) -> float:
+        # convert the duration to hours, registrations without bookings have no spent hours
+        if duration is None or duration.total_seconds() <= 0:
+            return 0
+        return duration.total_seconds() / 60 / 60
+
+    @CALENDAR_GENERATION_SECONDS.time()
     def generate_calendar_week(self, student_id: int, week_offset=0) -> WeekDto:
         """
             This method generated a data matrix for the display of the calendar
@@ -291,51 +1136,82 @@ class CalendarService:
             current_date += timedelta(weeks=week_offset)
 
         week_number = current_date.isocalendar()[1]
-        week = WeekDto(week_number=week_number)
+        occupancy = WeekOccupancy()
+        week = WeekDto(week_number=week_number, occupancy=occupancy)
 
         # the weekday 0 is always monday, so if the current weekday is subtracted from
         # the current date this results in the monday of that week
         first_day_of_week = current_date - timedelta(days=current_date.weekday())
 
+        # fetch all bookings of the week with a single query, the course is joined in
+        # so that the occupancy below does not trigger any further queries
+        bookings_per_day = self.get_time_plan_bookings_for_week(student_id, first_day_of_week.date())
+
         # loop the weekdays for the current week from monday
         for day in range(0, 7):
             current_week_day = first_day_of_week + timedelta(days=day)
-            week_day = WeekDayDto(day, current_week_day)
-
-            # each day has 24h hours
-            for hour in range(0, 24):
-                time_blocks = []
-
-                # calendar hour is splitted into 15 minute blocks and has max 60 min
-                for minute in range(0, 60, 15):
-                    from_time = time(hour, minute)
-
-                    # verify that there is no error if 60 is given
-                    buffer = minute + 15 if minute + 15 < 60 else 59
-                    until_time = time(hour, buffer)
-
-                    # fetch the time plan bookings for the current student, degree und in the time range
-                    booking = TimePlanBooking.objects.filter(_course_registration___student___id=student_id,
-                                                             _from_date=current_week_day,
-                                                             _from_time__lte=from_time,
-                                                             _until_time__gte=until_time).first()
+            day_start = TimePlanBooking.to_minute(current_week_day, time(0, 0))
 
-                    # create dto object for the timeslot
-                    time_slot = TimeSlotDto(from_time,
-                                            booking.course_registration.course.name if booking else "",
-                                            booking.course_registration.course.bg_color if booking else "",
-                                            booking.course_registration.course.fg_color if booking else "")
-                    time_blocks.append(time_slot)
+            # overlapping bookings resolve to the oldest entry, so the bookings are set ordered by id
+            # and the slots that are already occupied are kept, occurrences without id are set last
+            for booking in sorted(bookings_per_day.get(current_week_day.date(), []),
+                                  key=lambda x: (x.id is None, x.id or 0)):
+                start_slot, end_slot = self.__get_booking_slots(day_start, booking)
+                if start_slot < end_slot:
+                    course = booking.course_registration.course
+                    occupancy.set(day, start_slot, end_slot,
+                                  occupancy.add_booking(course.name, course.bg_color, course.fg_color))
 
-                # here we have a tuple list with 4 items per hour that is added
-                week_day.time_slots.append((hour, time_blocks))
-
-            # here we add the complete day with 24 entries
-            week.week_days.append(week_day)
+            # the time slots and blocks of the day are built from the occupancy when they are displayed
+            week.week_days.append(WeekDayDto(day, current_week_day, occupancy))
 
         return week
 
-
+    def __get_booking_slots(self, day_start: int, booking: TimePlanBooking) -> tuple[int, int]:
+        """
+        Returns the range of the 15 minute slots of the day that are covered by the booking, the day start
+        is given in minutes. A slot is covered if the booking starts before the slot and ends at the end of
+        the slot or later, the last block of an hour ends at minute 59 to stay within the hour
+        """
+        start = booking.start_minute - day_start
+        end = booking.end_minute - day_start
+
+        # the first slot that starts at the start of the booking or later
+        start_slot = max(0, -(-start // 15))
+        end_slot = start_slot
+        while end_slot < 24 * 4 and end >= end_slot * 15 + (15 if end_slot % 4 < 3 else 14):
+            end_slot += 1
+        return start_slot, end_slot
+
+    def get_time_plan_bookings_for_week(self, student_id: int, first_day_of_week: date) -> \
+            dict[date, list[TimePlanBooking]]:
+        """
+        Loads all bookings of the student that start within the week of the given monday
+        and groups them by their start date, the occurrences of the recurring bookings are
+        added as unsaved bookings
+        """
+        bookings = TimePlanBooking.objects.filter(
+            _course_registration___student___id=student_id,
+            _start_minute__gte=TimePlanBooking.to_minute(first_day_of_week, time(0, 0)),
+            _start_minute__lt=TimePlanBooking.to_minute(first_day_of_week + timedelta(days=7), time(0, 0))
+        ).select_related("_course_registration___course").order_by("_start_minute", "_id")
+
+        bookings_per_day = {}
+        for booking in bookings:
+            bookings_per_day.setdefault(booking.from_date, []).append(booking)
+
+        # the recurring bookings are only expanded for the days of the week
+        week_start = TimePlanBooking.to_minute(first_day_of_week, time(0, 0))
+        week_end = week_start + 7 * 24 * 60
+        for recurring_booking in self.get_recurring_bookings(student_id).filter(
+                _start_date__lt=first_day_of_week + timedelta(days=7), _end_date__gte=first_day_of_week):
+            for booking in recurring_booking.get_occurrences(self.__get_recurrence_rule(recurring_booking),
+                                                             week_start, week_end):
+                bookings_per_day.setdefault(booking.from_date, []).append(booking)
+        return bookings_per_day
+
+
+@instrumented
 class ExamService:
     def is_exam_outcome_existing(self, course_registration: int) -> bool:
         return ExamOutcome.objects.filter(_course_registration___id=course_registration).exists()
@@ -354,10 +1230,10 @@ class ExamService:
         This method saves the exam result, currently there will be only one
         entry that is overridden with the corrected grade, if none exists a new one is created
         """
-        if not self.is_exam_outcome_existing(course_registration):
+        outcome = self.get_last_exam_outcome_for_registration(course_registration)
+        if outcome is None:
             ExamOutcome.objects.create(_course_registration_id=course_registration, _grade=grade)
         else:
-            outcome = self.get_last_exam_outcome_for_registration(course_registration)
             outcome.grade = grade
             outcome._passed = grade <= 4 and grade >= 1
             outcome.save()
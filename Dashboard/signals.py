@@ -0,0 +1,126 @@
+from weakref import WeakKeyDictionary
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from Dashboard.booking_index import booking_index_registry
+from Dashboard.cache import bump_student_version, bump_global_version
+from Dashboard.models import TimePlanBooking, CourseRegistration, ExamOutcome, StudentDegree, Student, University, \
+    Degree, Course, Semester, CourseSemester, RecurringBooking, RecurringBookingException
+
+"""
+This file contains the signal handlers that keep derived data in sync with the database models
+The handlers are connected in the DashboardConfig when the app is ready
+"""
+
+
+def get_student_id_for_registration_entry(entry: TimePlanBooking | ExamOutcome | RecurringBooking) -> int | None:
+    """
+    Determines the student of a booking or exam outcome, the registration is only fetched if it is not loaded yet
+    """
+    if type(entry)._course_registration.is_cached(entry):
+        return entry.course_registration._student_id
+    return CourseRegistration.objects.filter(_id=entry._course_registration_id).values_list(
+        "_student", flat=True).first()
+
+
+def invalidate_student(student_id: int | None):
+    """
+    Drops the booking index of the student and bumps the version of the student after the commit
+    """
+    booking_index_registry.invalidate(student_id)
+    transaction.on_commit(lambda: bump_student_version(student_id))
+
+
+# the students of the entries that are deleted by a queryset, so that each registration is only looked up once
+_deleted_student_ids = WeakKeyDictionary()
+
+
+@receiver(pre_save, sender=TimePlanBooking)
+@receiver(pre_save, sender=ExamOutcome)
+def remember_previous_student(sender, instance: TimePlanBooking | ExamOutcome, **kwargs):
+    # an entry that is moved to another registration changes the dashboard of its previous student as well
+    instance._previous_student_id = None if instance._state.adding else sender.objects.filter(
+        pk=instance.pk).exclude(_course_registration=instance._course_registration_id).values_list(
+        "_course_registration___student", flat=True).first()
+
+
+@receiver(post_save, sender=TimePlanBooking)
+def invalidate_booking_index_for_booking(sender, instance: TimePlanBooking, **kwargs):
+    # if the student cannot be determined anymore all indexes are dropped
+    booking_index_registry.invalidate(get_student_id_for_registration_entry(instance))
+    if getattr(instance, "_previous_student_id", None) is not None:
+        booking_index_registry.invalidate(instance._previous_student_id)
+
+
+@receiver(post_delete, sender=TimePlanBooking)
+@receiver(post_delete, sender=ExamOutcome)
+def invalidate_student_for_deleted_entry(sender, instance: TimePlanBooking | ExamOutcome, origin=None, **kwargs):
+    """
+    Invalidates the caches of the student of a deleted booking or exam outcome. Entries that are deleted
+    together with their registration or student are covered by the receivers of the registration,
+    so they are skipped without looking up their student
+    """
+    if isinstance(origin, QuerySet):
+        if origin.model is not sender:
+            return
+        student_ids = _deleted_student_ids.setdefault(origin, {})
+        if instance._course_registration_id in student_ids:
+            return
+        student_ids[instance._course_registration_id] = student_id = get_student_id_for_registration_entry(instance)
+    elif origin is instance:
+        student_id = get_student_id_for_registration_entry(instance)
+    else:
+        return
+    invalidate_student(student_id)
+
+
+@receiver([post_save, post_delete], sender=RecurringBooking)
+def invalidate_booking_index_for_recurring_booking(sender, instance: RecurringBooking, **kwargs):
+    # the rules of the recurring bookings are part of the index
+    student_id = get_student_id_for_registration_entry(instance)
+    booking_index_registry.invalidate(student_id)
+    transaction.on_commit(lambda: bump_student_version(student_id))
+
+
+@receiver([post_save, post_delete], sender=RecurringBookingException)
+def invalidate_booking_index_for_recurring_exception(sender, instance: RecurringBookingException, **kwargs):
+    # the exceptions are only changed in the admin panel, so all indexes and dashboards are dropped
+    booking_index_registry.invalidate()
+    transaction.on_commit(bump_global_version)
+
+
+@receiver(post_delete, sender=CourseRegistration)
+def invalidate_booking_index_for_registration(sender, instance: CourseRegistration, **kwargs):
+    # deleting a registration also deletes its bookings and exam outcomes
+    booking_index_registry.invalidate(instance._student_id)
+
+
+@receiver(post_save, sender=TimePlanBooking)
+@receiver(post_save, sender=ExamOutcome)
+def invalidate_dashboard_for_registration_entry(sender, instance: TimePlanBooking | ExamOutcome, **kwargs):
+    # the version is bumped after the commit, so that no outdated data is cached with the new version
+    student_id = get_student_id_for_registration_entry(instance)
+    transaction.on_commit(lambda: bump_student_version(student_id))
+    previous_student_id = getattr(instance, "_previous_student_id", None)
+    if previous_student_id is not None:
+        transaction.on_commit(lambda: bump_student_version(previous_student_id))
+
+
+@receiver([post_save, post_delete], sender=CourseRegistration)
+@receiver([post_save, post_delete], sender=StudentDegree)
+def invalidate_dashboard_for_student_entry(sender, instance: CourseRegistration | StudentDegree, **kwargs):
+    transaction.on_commit(lambda: bump_student_version(instance._student_id))
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=University)
+@receiver([post_save, post_delete], sender=Degree)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Semester)
+@receiver([post_save, post_delete], sender=CourseSemester)
+def invalidate_dashboard_for_catalog(sender, **kwargs):
+    # those models are shared by the students, so all cached sections are invalidated
+    transaction.on_commit(bump_global_version)
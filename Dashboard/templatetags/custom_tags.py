@@ -1,6 +1,7 @@
 from datetime import datetime, time, timedelta
 
 from django import template
+from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
 
 """
@@ -11,15 +12,6 @@ This file contains all custom template tags used for rendering
 register = template.Library()
 
 
-@register.simple_tag
-def get_grade_avg(request):
-    """
-    fetches the grade average from the service class and returns it to the frontend
-    """
-    from Dashboard.services import StudentService
-    return StudentService().get_student_grade_average(request.session["student_id"])
-
-
 @register.simple_tag
 def get_formatted_date(date):
     """
@@ -28,22 +20,6 @@ def get_formatted_date(date):
     return date.strftime("%d.%m.%Y")
 
 
-@register.simple_tag
-def get_formatted_time(hour, minute):
-    """
-    Formats a given hour and minute as time format
-    """
-    return time(hour, minute).strftime("%H:%M")
-
-
-@register.simple_tag
-def get_array_index_value(array, index):
-    """
-    Fetch an array index value
-    """
-    return array[index]
-
-
 @register.simple_tag
 def get_calendar_week(request):
     """
@@ -112,10 +88,31 @@ def get_course_sort_link(request, field):
     return mark_safe(
         f'<a href="?sort={field}&direction={sort_direction}" class="courseHeadSorter">{field.title()} {sort_icon}</a>')
 
+
+@register.simple_tag
+def get_course_page_link(request, page_number):
+    """
+    Generate the link to another page of the course list, the current sorting is kept
+    """
+    return "?" + urlencode({
+        "sort": request.GET.get("sort", ""),
+        "direction": request.GET.get("direction", ""),
+        "page": page_number,
+    })
+
+
 @register.filter
 def compare_ids(id1, id2):
     """
     This filter is needed to compare the dropdown ids which may not have the same datatype
     so this function ensures both are string that can be compared
     """
-    return str(id1) == str(id2)
\ No newline at end of file
+    return str(id1) == str(id2)
+
+
+@register.simple_tag
+def get_share_percent(value, maximum):
+    """
+    Calculates the share of a value in percent of the maximum for the bars and the heatmap of the analytics
+    """
+    return round(100 * value / maximum) if maximum else 0
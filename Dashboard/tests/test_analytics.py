@@ -0,0 +1,38 @@
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from Dashboard.analytics import GRADE_BIN_EDGES, UniversityAnalytics, is_analytics_available
+
+"""
+This file contains the tests of the university analytics, they require the optional numpy
+"""
+
+
+@skipUnless(is_analytics_available(), "the analytics require numpy")
+class ExamStatisticsTest(SimpleTestCase):
+    """
+    The exam statistics only count the grades of the grade bins and derive the passed exams from the grade
+    """
+
+    def test_grades_outside_of_the_bins_are_not_counted(self):
+        analytics = UniversityAnalytics([1, 2], [])
+        # the grade 0 marks a deleted grade, the grade 7 is out of range
+        attempts, pass_rates, average_grades, distributions = analytics.get_exam_statistics(
+            [(1, 0.0, 3), (1, 2.0, 1), (1, 6.0, 1), (1, 7.0, 2), (2, 0.0, 1)])
+
+        self.assertEqual(attempts, [2, 0])
+        self.assertEqual(average_grades, [4.0, None])
+        self.assertEqual(sum(distributions[0]), 2)
+        self.assertEqual(distributions[0][GRADE_BIN_EDGES.index(2.0)], 1)
+        # the grade 6.0 is the upper edge of the last bin
+        self.assertEqual(distributions[0][-1], 1)
+        self.assertEqual(distributions[1], [0] * (len(GRADE_BIN_EDGES) - 1))
+
+    def test_exams_up_to_the_grade_4_are_passed(self):
+        analytics = UniversityAnalytics([1], [])
+        attempts, pass_rates, average_grades, distributions = analytics.get_exam_statistics(
+            [(1, 1.0, 1), (1, 4.0, 1), (1, 4.5, 1), (1, 5.0, 1)])
+
+        self.assertEqual(attempts, [4])
+        self.assertEqual(pass_rates, [0.5])
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+
+from Dashboard.generator import SyntheticDataGenerator
+from Dashboard.models import Course, Student
+from Dashboard.services import CalendarService
+
+"""
+This file contains the tests of the import of booking files
+"""
+
+
+class BookingImportCourseTest(TestCase):
+    """
+    The courses of the imported rows are looked up within the university of the student,
+    by their id or by their name
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(universities=2, students=1, registrations=5, years=0).generate()
+        cls.student = Student.objects.order_by("_id").first()
+        cls.course = Course.objects.filter(_university=cls.student.university).first()
+        cls.other_course = Course.objects.exclude(_university=cls.student.university).first()
+
+    def get_row(self, line: int, course: str, hour: int) -> dict:
+        booking_date = (date.today() + timedelta(days=1)).isoformat()
+        return {"line": line, "course": course, "from_date": booking_date, "from_time": f"0{hour}:00",
+                "until_date": booking_date, "until_time": f"0{hour + 1}:00"}
+
+    def test_courses_of_the_university(self):
+        result = CalendarService().import_bookings(self.student, [
+            self.get_row(1, str(self.course.id), 1),
+            self.get_row(2, self.course.name, 3),
+            self.get_row(3, str(self.other_course.id), 5),
+            self.get_row(4, self.other_course.name, 7),
+        ], dry_run=True)
+
+        self.assertEqual(result.imported, 2)
+        self.assertEqual(result.errors, [(3, f"course {self.other_course.id} does not exist"),
+                                         (4, f"course {self.other_course.name} does not exist")])
@@ -0,0 +1,89 @@
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from Dashboard.booking_index import BookingIndexRegistry, booking_index_registry
+from Dashboard.cache import bump_student_version
+from Dashboard.generator import SyntheticDataGenerator
+from Dashboard.models import CourseRegistration, Student, TimePlanBooking
+from Dashboard.services import CalendarService
+
+"""
+This file contains the tests of the booking index and its registry
+"""
+
+
+class BookingIndexRegistryTest(SimpleTestCase):
+    """
+    The registry holds a bounded number of indexes and builds an index again if its version changed
+    """
+
+    def test_least_recently_used_indexes_are_dropped(self):
+        registry = BookingIndexRegistry(max_size=2)
+        loads = []
+        loader = lambda student_id: loads.append(student_id) or []
+
+        registry.get(1, loader)
+        registry.get(2, loader)
+        registry.get(1, loader)
+        registry.get(3, loader)
+        self.assertEqual(len(registry), 2)
+
+        # student 2 was used least recently, so only its index is built again
+        registry.get(1, loader)
+        registry.get(2, loader)
+        self.assertEqual(loads, [1, 2, 3, 2])
+
+    def test_index_is_built_again_for_a_new_version(self):
+        registry = BookingIndexRegistry(max_size=2)
+        registry.get(1, lambda student_id: [(0, 60, 1)], version=(1, 1))
+        index = registry.get(1, lambda student_id: [(0, 60, 1), (60, 120, 2)], version=(1, 2))
+        self.assertEqual(index.booking_ids, [1, 2])
+
+
+class BookingConflictTest(TestCase):
+    """
+    The conflicts are checked with the booking index only. A booking saved by another process
+    bumps the cache version of the student, so the index is built again
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=1, registrations=5, years=0).generate()
+        cls.student = Student.objects.get()
+
+    def setUp(self):
+        cache.clear()
+        booking_index_registry.invalidate()
+
+    def test_built_index_needs_no_query(self):
+        booking_date = date.today() + timedelta(days=1)
+        calendar_service = CalendarService()
+        calendar_service.has_time_plan_booking_conflict(self.student.id, booking_date, time(3), time(4))
+
+        with self.assertNumQueries(0):
+            self.assertFalse(calendar_service.has_time_plan_booking_conflict(self.student.id, booking_date, time(3),
+                                                                              time(4)))
+            self.assertIsNone(calendar_service.get_recurring_booking_conflict(
+                self.student.id, booking_date, time(3), time(4), booking_date + timedelta(weeks=4)))
+
+    def test_booking_of_another_process_is_a_conflict(self):
+        booking_date = date.today() + timedelta(days=1)
+        calendar_service = CalendarService()
+        self.assertFalse(calendar_service.has_time_plan_booking_conflict(self.student.id, booking_date, time(3),
+                                                                          time(4)))
+
+        # bulk_create skips the signals, like a save within another process the index is not invalidated,
+        # only the shared cache version of the student is bumped
+        booking = TimePlanBooking(
+            _course_registration=CourseRegistration.objects.filter(_student=self.student).first(),
+            _from_date=booking_date, _from_time=time(3), _until_date=booking_date, _until_time=time(4))
+        booking.update_minutes()
+        TimePlanBooking.objects.bulk_create([booking])
+        bump_student_version(self.student.id)
+
+        self.assertTrue(calendar_service.has_time_plan_booking_conflict(self.student.id, booking_date, time(3),
+                                                                         time(4)))
+        self.assertEqual(calendar_service.get_recurring_booking_conflict(
+            self.student.id, booking_date - timedelta(weeks=1), time(3), time(4), booking_date), booking_date)
@@ -0,0 +1,64 @@
+from datetime import date, time, timedelta
+
+from django.test import TestCase
+
+from Dashboard.forms import GradeManagementForm, TimePlanManagementForm
+from Dashboard.generator import SyntheticDataGenerator
+from Dashboard.models import CourseRegistration, ExamOutcome, RecurringBooking, Student
+from Dashboard.services import CourseService, CalendarService
+
+"""
+This file contains the tests of the services that write to the course registrations of a student
+"""
+
+
+class DuplicatedCourseRegistrationTest(TestCase):
+    """
+    The schema allows more than one registration of a student for a course,
+    the services use the first of them like the lookups of the registrations do
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=1, registrations=5, exam_ratio=0, years=0).generate()
+        cls.student = Student.objects.get()
+        cls.registration = CourseRegistration.objects.filter(_student=cls.student).order_by("_id").first()
+        cls.duplicate = CourseRegistration.objects.create(_student=cls.student, _course=cls.registration.course)
+
+    def test_save_grade_for_course(self):
+        grade_form = GradeManagementForm({"course_id": str(self.registration.course.id), "grade": 2.0})
+        self.assertTrue(grade_form.is_valid())
+        CourseService().save_grade_for_course(self.student.id, grade_form)
+
+        self.assertTrue(ExamOutcome.objects.filter(_course_registration=self.registration).exists())
+        self.assertTrue(CourseRegistration.objects.get(_id=self.registration.id).completed)
+        self.assertFalse(CourseRegistration.objects.get(_id=self.duplicate.id).completed)
+
+    def test_save_time_plan_booking(self):
+        spent_hours = self.registration.spent_hours
+        # the generated bookings start at 8 o'clock, so the new booking does not overlap them
+        booking_date = date.today() + timedelta(days=1)
+        time_plan_form = TimePlanManagementForm({
+            "course_id": str(self.registration.course.id), "student_id": str(self.student.id),
+            "from_date": booking_date, "from_time": time(3), "until_date": booking_date, "until_time": time(4)})
+        self.assertTrue(time_plan_form.is_valid(), time_plan_form.errors)
+        CalendarService().save_time_plan_booking(self.student, time_plan_form)
+
+        self.assertEqual(CourseRegistration.objects.get(_id=self.registration.id).spent_hours, spent_hours + 1)
+        self.assertEqual(CourseRegistration.objects.get(_id=self.duplicate.id).spent_hours, 0)
+
+    def test_save_recurring_booking(self):
+        booking_date = date.today() + timedelta(days=1)
+        CalendarService().save_recurring_booking(self.student, self.registration.course.id, booking_date, time(3),
+                                                 time(4), booking_date + timedelta(weeks=4))
+
+        self.assertEqual(RecurringBooking.objects.get().course_registration.id, self.registration.id)
+
+    def test_get_course_list(self):
+        course_ids = [course.course_id for course in CourseService().get_course_list(self.student.id)]
+        self.assertEqual(len(course_ids), len(set(course_ids)))
+        self.assertIn(self.registration.course.id, course_ids)
+
+    def test_get_course_options(self):
+        course_ids = [course.course_id for course in CourseService().get_course_options(self.student.id)]
+        self.assertEqual(len(course_ids), len(set(course_ids)))
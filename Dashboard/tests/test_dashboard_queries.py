@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from Dashboard.generator import SyntheticDataGenerator
+from Dashboard.models import Student
+
+"""
+This file contains the tests that pin the number of queries of the dashboard
+"""
+
+
+@override_settings(DASHBOARD_QUERY_BUDGET_STRICT=True)
+class DashboardQueryCountTest(TestCase):
+    """
+    The dashboard is rendered with a fixed number of queries, independent of the number of
+    courses and bookings of the student. Cached sections and unchanged pages need no service queries
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=3, registrations=5, years=1).generate()
+        cls.student = Student.objects.order_by("_id").first()
+
+    def setUp(self):
+        cache.clear()
+        session = self.client.session
+        session["university_id"] = self.student.university.id
+        session["student_id"] = self.student.id
+        session.save()
+
+    def test_cold_dashboard_get(self):
+        # the session, one query per section of the dashboard and the pending hours of the recurring bookings
+        with self.assertNumQueries(14):
+            response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_warm_dashboard_get(self):
+        self.client.get("/dashboard/")
+
+        # all sections are cached, only the session is queried
+        with self.assertNumQueries(1):
+            response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_dashboard_get(self):
+        etag = self.client.get("/dashboard/")["ETag"]
+
+        # the etag is calculated out of the cache versions, only the session is queried
+        with self.assertNumQueries(1):
+            response = self.client.get("/dashboard/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
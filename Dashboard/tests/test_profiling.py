@@ -0,0 +1,31 @@
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from Dashboard.profiling import ProfileCapture
+
+"""
+This file contains the tests of the profiling of single requests
+"""
+
+
+class ProfileCaptureTest(SimpleTestCase):
+    """
+    Only one capture is active at a time, a capture that starts while another one is active
+    executes its block without profiling instead of failing
+    """
+
+    def test_concurrent_captures(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(DASHBOARD_PROFILE_DIR=directory):
+            with ProfileCapture("outer") as outer:
+                with ProfileCapture("inner") as inner:
+                    sum(range(1000))
+                self.assertFalse(inner.active)
+                self.assertIsNone(inner.name)
+            self.assertTrue(outer.active)
+            self.assertIsNotNone(outer.name)
+
+            # the next capture is profiled again
+            with ProfileCapture("next") as capture:
+                sum(range(1000))
+            self.assertTrue(capture.active)
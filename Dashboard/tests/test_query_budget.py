@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from Dashboard.generator import SyntheticDataGenerator
+from Dashboard.instrumentation import QueryBudgetExceeded
+from Dashboard.models import Student
+
+"""
+This file contains the tests of the query budgets of the views
+"""
+
+
+@override_settings(DASHBOARD_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(TestCase):
+    """
+    With strict budgets a view that executes more queries than its budget fails the request,
+    without them the exceeded budget is only logged
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=1, registrations=5, years=0).generate()
+        cls.student = Student.objects.get()
+
+    def setUp(self):
+        cache.clear()
+        session = self.client.session
+        session["university_id"] = self.student.university.id
+        session["student_id"] = self.student.id
+        session.save()
+
+    def test_dashboard_within_budget(self):
+        # the queries of the request are only logged at debug level
+        with self.assertNoLogs("Dashboard.instrumentation", "INFO"):
+            response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_request_metrics_are_logged_at_debug_level(self):
+        with self.assertLogs("Dashboard.instrumentation", "DEBUG") as logs:
+            self.client.get("/dashboard/")
+        self.assertIn('"event": "request_metrics"', logs.output[-1])
+
+    @override_settings(DASHBOARD_QUERY_BUDGETS={"DashboardView": 5})
+    def test_dashboard_over_budget(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "the budget is 5"):
+            self.client.get("/dashboard/")
+
+    @override_settings(DASHBOARD_QUERY_BUDGETS={"DashboardView": 5}, DASHBOARD_QUERY_BUDGET_STRICT=False)
+    def test_dashboard_over_budget_is_logged(self):
+        with self.assertLogs("Dashboard.instrumentation", "WARNING") as logs:
+            response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("DashboardView executed", logs.output[-1])
+
+    @override_settings(DASHBOARD_QUERY_BUDGETS={"DashboardView": 5})
+    def test_cached_dashboard_within_budget(self):
+        # the cached sections are not part of the budget of the warm request
+        with self.settings(DASHBOARD_QUERY_BUDGET_STRICT=False):
+            self.client.get("/dashboard/")
+        response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,30 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from Dashboard.generator import SyntheticDataGenerator
+from Dashboard.query_plans import QueryPlanChecker, get_student_with_degree
+
+"""
+This file contains the tests that verify the query plans of the service methods
+"""
+
+
+@skipUnless(connection.vendor == "sqlite", "query plans can only be checked on a sqlite database")
+class QueryPlanTest(TestCase):
+    """
+    The queries of the hot paths must be supported by indexes, a complete scan of a table
+    grows with the number of students and bookings
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=3, registrations=5, years=1).generate()
+
+    def test_service_queries_use_indexes(self):
+        for name, queries in QueryPlanChecker(get_student_with_degree()).get_full_scans_per_method():
+            with self.subTest(name):
+                self.assertNotEqual(queries, [])
+                for sql, full_scans in queries:
+                    self.assertEqual(full_scans, [], sql)
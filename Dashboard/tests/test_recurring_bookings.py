@@ -0,0 +1,101 @@
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from Dashboard.booking_index import booking_index_registry
+from Dashboard.generator import SyntheticDataGenerator
+from Dashboard.models import CourseRegistration, RecurringBooking, Student, TimePlanBooking
+from Dashboard.services import CalendarService, CourseService
+
+"""
+This file contains the tests of the materialization of the recurring bookings
+"""
+
+
+class RecurringBookingMaterializationTest(TestCase):
+    """
+    The due occurrences are saved by the command, the dashboard only reads them
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=2, registrations=5, years=0).generate()
+        cls.student, cls.other_student = Student.objects.order_by("_id")
+        cls.registration = CourseRegistration.objects.filter(_student=cls.student).first()
+        # the rule started three weeks ago at night, so it does not overlap the generated bookings
+        RecurringBooking.objects.create(
+            _course_registration=cls.registration, _start_date=date.today() - timedelta(weeks=3),
+            _end_date=date.today() + timedelta(weeks=3), _from_time=time(3), _until_time=time(4))
+
+    def setUp(self):
+        cache.clear()
+        booking_index_registry.invalidate()
+
+    def test_dashboard_does_not_materialize(self):
+        session = self.client.session
+        session["university_id"] = self.student.university.id
+        session["student_id"] = self.student.id
+        session.save()
+        bookings = TimePlanBooking.objects.count()
+
+        self.client.get("/dashboard/")
+        self.assertEqual(TimePlanBooking.objects.count(), bookings)
+
+    def test_command_materializes_due_occurrences(self):
+        spent_hours = self.registration.spent_hours
+        calendar_service = CalendarService()
+        calendar_service.get_booking_index(self.other_student.id)
+
+        call_command("materialize_recurring_bookings", stdout=StringIO())
+
+        # the occurrences of the last three weeks and today are saved
+        self.assertEqual(CourseRegistration.objects.get(_id=self.registration.id).spent_hours, spent_hours + 4)
+        self.assertEqual(calendar_service.get_spent_hours_for_registration(self.registration.id), spent_hours + 4)
+
+        # the index of the other student is kept
+        self.assertEqual(len(booking_index_registry), 1)
+
+
+class PendingRecurringBookingTest(TestCase):
+    """
+    The occurrences that are due but not materialized yet count into the spent hours when they are read
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=1, registrations=5, years=0).generate()
+        cls.student = Student.objects.get()
+        cls.registration = CourseRegistration.objects.filter(_student=cls.student).order_by("_id").first()
+
+    def setUp(self):
+        cache.clear()
+        booking_index_registry.invalidate()
+
+    def test_pending_occurrences_count_into_the_spent_hours(self):
+        calendar_service = CalendarService()
+        spent_hours = calendar_service.get_spent_hours_for_registration(self.registration.id)
+        bookings = TimePlanBooking.objects.count()
+
+        # the rule starts tomorrow, so nothing is materialized when it is saved
+        start_date = date.today() + timedelta(days=1)
+        calendar_service.save_recurring_booking(self.student, self.registration.course.id, start_date, time(3),
+                                                time(4), start_date + timedelta(weeks=4))
+        self.assertEqual(calendar_service.get_spent_hours_for_registration(self.registration.id), spent_hours)
+
+        # eight days later two occurrences are due, the command did not run in between
+        class NextWeek(date):
+            @classmethod
+            def today(cls):
+                return start_date + timedelta(days=7)
+
+        with mock.patch("Dashboard.services.date", NextWeek):
+            self.assertEqual(calendar_service.get_spent_hours_for_registration(self.registration.id),
+                             spent_hours + 2)
+            course = next(course for course in CourseService().get_course_list(self.student.id)
+                          if course.course_id == self.registration.course.id)
+            self.assertEqual(course.spent_hours, self.registration.spent_hours + 2)
+        self.assertEqual(TimePlanBooking.objects.count(), bookings)
@@ -0,0 +1,108 @@
+from django.contrib.admin import site
+from django.core.cache import cache
+from django.test import TestCase
+
+from Dashboard.booking_index import booking_index_registry
+from Dashboard.cache import DashboardCache
+from Dashboard.generator import SyntheticDataGenerator
+from Dashboard.models import CourseRegistration, ExamOutcome, Student, TimePlanBooking
+from Dashboard.services import CalendarService
+
+"""
+This file contains the tests of the signal handlers that invalidate the caches of the students
+"""
+
+
+class StudentDeletionTest(TestCase):
+    """
+    The bookings and exam outcomes of a deleted student are deleted with a constant number of queries,
+    independent of their number, and the caches of the student are invalidated
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=1, registrations=5, years=1).generate()
+        cls.student = Student.objects.get()
+
+    def setUp(self):
+        cache.clear()
+        booking_index_registry.invalidate()
+
+    def test_delete_student(self):
+        self.assertGreater(TimePlanBooking.objects.count(), 200)
+        CalendarService().get_booking_index(self.student.id)
+        etag = DashboardCache(self.student.id).get_etag()
+
+        # each table is read and deleted once, the students of the cascaded entries are not looked up
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(12):
+            self.student.delete()
+
+        self.assertEqual(TimePlanBooking.objects.count(), 0)
+        self.assertEqual(len(booking_index_registry), 0)
+        self.assertNotEqual(DashboardCache(self.student.id).get_etag(), etag)
+
+    def test_delete_bookings_in_admin_panel(self):
+        CalendarService().get_booking_index(self.student.id)
+        etag = DashboardCache(self.student.id).get_etag()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            site._registry[TimePlanBooking].delete_model(None, TimePlanBooking.objects.first())
+
+        self.assertEqual(len(booking_index_registry), 0)
+        self.assertNotEqual(DashboardCache(self.student.id).get_etag(), etag)
+
+
+class RegistrationEntryChangeTest(TestCase):
+    """
+    Saved, moved and deleted bookings and exam outcomes invalidate the caches of their students
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(students=2, registrations=5, years=0).generate()
+        cls.student, cls.other_student = Student.objects.order_by("_id")
+
+    def setUp(self):
+        cache.clear()
+        booking_index_registry.invalidate()
+
+    def test_delete_bookings_with_queryset(self):
+        CalendarService().get_booking_index(self.student.id)
+        etag = DashboardCache(self.student.id).get_etag()
+        other_etag = DashboardCache(self.other_student.id).get_etag()
+        bookings = TimePlanBooking.objects.filter(_course_registration___student=self.student)
+        registrations = bookings.values("_course_registration").distinct().count()
+
+        # the bookings are read and deleted once, the student is looked up once per registration
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(2 + registrations):
+            bookings.delete()
+
+        self.assertEqual(len(booking_index_registry), 0)
+        self.assertNotEqual(DashboardCache(self.student.id).get_etag(), etag)
+        self.assertEqual(DashboardCache(self.other_student.id).get_etag(), other_etag)
+
+    def test_delete_exam_outcome(self):
+        exam_outcome = ExamOutcome.objects.create(
+            _course_registration=CourseRegistration.objects.filter(_student=self.student).first(), _grade=2.0)
+        etag = DashboardCache(self.student.id).get_etag()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamOutcome.objects.get(_id=exam_outcome.id).delete()
+
+        self.assertNotEqual(DashboardCache(self.student.id).get_etag(), etag)
+
+    def test_move_booking_to_another_student(self):
+        calendar_service = CalendarService()
+        calendar_service.get_booking_index(self.student.id)
+        calendar_service.get_booking_index(self.other_student.id)
+        etag = DashboardCache(self.student.id).get_etag()
+        other_etag = DashboardCache(self.other_student.id).get_etag()
+
+        booking = TimePlanBooking.objects.filter(_course_registration___student=self.student).first()
+        booking.course_registration = CourseRegistration.objects.filter(_student=self.other_student).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+
+        self.assertEqual(len(booking_index_registry), 0)
+        self.assertNotEqual(DashboardCache(self.student.id).get_etag(), etag)
+        self.assertNotEqual(DashboardCache(self.other_student.id).get_etag(), other_etag)
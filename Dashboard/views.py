@@ -1,7 +1,24 @@
+import io
+import time
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.contrib import admin
+from django.http import HttpResponse, FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.template.response import TemplateResponse
-from django.views.generic import TemplateView
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.generic import TemplateView, View
 
-from Dashboard.forms import GradeManagementForm, TimePlanManagementForm, SwitchStudentForm, SwitchUniversityForm
+from Dashboard.analytics import is_analytics_available, GRADE_BIN_EDGES, PROGRESS_BINS
+from Dashboard.cache import DashboardCache
+from Dashboard.forms import GradeManagementForm, TimePlanManagementForm, SwitchStudentForm, SwitchUniversityForm, \
+    FreeSlotForm, StudyPlanForm, CalendarFeedForm
+from Dashboard.exporter import IcsFeedWriter, TRANSCRIPT_FORMATS
+from Dashboard.importer import get_booking_reader
+from Dashboard.instrumentation import get_request_metrics
+from Dashboard.metrics import registry, REQUEST_DURATION_SECONDS, REQUEST_QUERIES, TEMPLATE_RENDER_SECONDS
+from Dashboard.profiling import list_captures, get_capture_file
 from Dashboard.services import CourseService, CalendarService, StudentService, UniversityService
 
 """
@@ -24,12 +41,49 @@ class DashboardView(TemplateView):
         self.__time_plan_form = "timePlanManagement"
         self.__student_form = "studentSelection"
         self.__university_form = "universitySelection"
+        self.__study_plan_form = "studyPlan"
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        This method is called for every request, it records the duration and the
+        database queries of the request for the metrics
+        """
+        start = time.perf_counter()
+        response = super().dispatch(request, *args, **kwargs)
+
+        # only known form types are used as label to keep the number of metrics small
+        form_type = "none"
+        if request.method == "POST":
+            form_type = request.POST.get("formType")
+            if form_type not in (self.__grade_form, self.__time_plan_form, self.__student_form,
+                                 self.__university_form, self.__study_plan_form):
+                form_type = "other"
+
+        REQUEST_DURATION_SECONDS.labels(method=request.method, form_type=form_type).observe(
+            time.perf_counter() - start)
+        request_metrics = get_request_metrics()
+        if request_metrics is not None:
+            REQUEST_QUERIES.labels(method=request.method, form_type=form_type).observe(
+                request_metrics.total.queries)
+        return response
 
     def get(self, request, *args, **kwargs):
         """
         This method is called it a GET request is sent
         """
-        return self.prepare_template_response(request, {})
+        self.__prepare_session(request)
+
+        # answer with 304 Not Modified if the browser already has the current page
+        # profiled requests are always rendered
+        etag = quote_etag(self.__get_etag(request))
+        response = None if self.__is_profiling(request) else get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.prepare_template_response(request, {})
+        response["ETag"] = etag
+
+        # the page depends on the session, so the browser has to validate it on every request
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     def post(self, request, *args, **kwargs):
         """
@@ -62,6 +116,21 @@ class DashboardView(TemplateView):
             else:
                 form_errors = time_plan_form.errors["__all__"]
 
+        # is the study plan form submitted
+        elif request.POST.get("formType") == self.__study_plan_form:
+            form = StudyPlanForm(request.POST)
+            if form.is_valid():
+                study_plan = self.__calendar_service.plan_study_sessions(
+                    student_id, (form.cleaned_data["window_start"], form.cleaned_data["window_end"]),
+                    form.cleaned_data["daily_hours"], form.cleaned_data["session_hours"])
+                self.__calendar_service.save_study_plan(student_id, study_plan)
+
+                # the hours that do not fit are reported like the errors of the forms
+                form_errors = [f'{registration.course.name}: {hours:.2f} hours do not fit until '
+                               f'{form.cleaned_data["until_date"]}'
+                               for registration, hours in study_plan.unscheduled_hours.items()]
+            else:
+                form_errors = [error for errors in form.errors.values() for error in errors]
 
         # is the switch student form submitted
         elif request.POST.get("formType") == self.__student_form:
@@ -83,34 +152,92 @@ class DashboardView(TemplateView):
         This helper method is used to reduce code duplication for get and post
         it prepares the template context to render the view
         """
-        # prepare the university session attribute
-        if not self.__get_university_id_from_session(request):
-            self.__set_university_id_from_session(request, 1)
-
-        # prepare the student session attribute
-        if not self.__get_student_id_from_session(request):
-            self.__set_student_id_from_session(request, self.__student_service.get_students_for_university(
-                self.__get_university_id_from_session(request)).first().id)
+        self.__prepare_session(request)
 
         # capture GET parameters to filter and sort the search and calendar
         week_offset = int(request.GET.get("offset")) if request.GET.get("offset") is not None else 0
         course_sort_field = request.GET.get("sort") if request.GET.get("sort") is not None else ''
         course_sort_direction = request.GET.get("direction") if request.GET.get("direction") is not None else ''
+        course_page = request.GET.get("page") if request.GET.get("page") is not None else 1
 
         # fetch needed session attributes
         student_id = self.__get_student_id_from_session(request)
         university_id = self.__get_university_id_from_session(request)
 
+        # the sections are cached until data of the student or the shared data changes
+        # the calendar week and the spent hours of the courses depend on the current date, so it is part of the key
+        shared_cache = DashboardCache(enabled=not self.__is_profiling(request))
+        student_cache = DashboardCache(student_id, enabled=not self.__is_profiling(request))
+
+        # the free slots are suggested from the next quarter hour on
+        free_slot_start = self.__get_current_time_slot() + timedelta(minutes=15)
+
         # prepare rendering context and fill in data objects
-        return TemplateResponse(request, "Dashboard/dashboard.html", {
-            "universities": self.__university_service.get_university_list(),
-            "students": self.__student_service.get_student_list(university_id),
-            "studentDetail": self.__student_service.get_student_detail(student_id),
-            "courses": self.__course_service.get_course_list(student_id, course_sort_field, course_sort_direction),
-            "calendarWeek": self.__calendar_service.generate_calendar_week(student_id, week_offset),
+        response = TemplateResponse(request, "Dashboard/dashboard.html", {
+            "universities": shared_cache.get_or_set(
+                "universities", self.__university_service.get_university_list),
+            "students": shared_cache.get_or_set(
+                "students", lambda: self.__student_service.get_student_list(university_id), university_id),
+            "studentDetail": student_cache.get_or_set(
+                "studentDetail", lambda: self.__student_service.get_student_detail(student_id)),
+            "gradeAverage": student_cache.get_or_set(
+                "gradeAverage", lambda: self.__student_service.get_student_grade_average(student_id)),
+            "coursePage": student_cache.get_or_set(
+                "coursePage", lambda: self.__course_service.get_course_page(
+                    student_id, course_sort_field, course_sort_direction, course_page),
+                course_sort_field, course_sort_direction, course_page, date.today()),
+            "courses": student_cache.get_or_set(
+                "courses", lambda: self.__course_service.get_course_options(student_id), date.today()),
+            "calendarWeek": student_cache.get_or_set(
+                "calendarWeek", lambda: self.__calendar_service.generate_calendar_week(student_id, week_offset),
+                date.today(), week_offset),
+            "freeSlots": student_cache.get_or_set(
+                "freeSlots", lambda: self.__calendar_service.find_free_slots(
+                    student_id, timedelta(hours=1), (free_slot_start, free_slot_start + timedelta(
+                        days=settings.DASHBOARD_FREE_SLOT_DAYS))),
+                free_slot_start),
             "formErrors": form_errors,
         })
 
+        # the template is rendered here to measure the render time
+        with TEMPLATE_RENDER_SECONDS.time():
+            response.render()
+        return response
+
+    def __prepare_session(self, request):
+        """
+        Ensures that a university and a student are selected within the session
+        """
+        # prepare the university session attribute
+        if not self.__get_university_id_from_session(request):
+            self.__set_university_id_from_session(request, 1)
+
+        # prepare the student session attribute
+        if not self.__get_student_id_from_session(request):
+            self.__set_student_id_from_session(request, self.__student_service.get_students_for_university(
+                self.__get_university_id_from_session(request)).first().id)
+
+    def __get_etag(self, request) -> str:
+        """
+        The etag is calculated out of the cache versions of the student, the selection within the session
+        and the query parameters, so that no service needs to be called
+        """
+        # the prefilled times of the time plan form and the free slots change every 15 minutes
+        return DashboardCache(self.__get_student_id_from_session(request)).get_etag(
+            self.__get_university_id_from_session(request),
+            sorted(request.GET.items()),
+            self.__get_current_time_slot(),
+        )
+
+    # helper method to get the start of the current quarter hour
+    def __get_current_time_slot(self) -> datetime:
+        now = datetime.now()
+        return now.replace(minute=now.minute - now.minute % 15, second=0, microsecond=0)
+
+    # helper method to check if the request is profiled, those skip the caches
+    def __is_profiling(self, request) -> bool:
+        return getattr(request, "profiling", False)
+
     # helper method to access university id from session
     def __get_university_id_from_session(self, request) -> int | None:
         return request.session.get('university_id')
@@ -128,3 +255,219 @@ class DashboardView(TemplateView):
     # helper method to set student id to session
     def __set_student_id_from_session(self, request, value):
         request.session['student_id'] = value
+
+
+class FreeSlotView(View):
+    """
+    This view returns the next free slots of the selected student as json,
+    the time plan form uses them to suggest times for a new booking
+    """
+
+    def get(self, request, *args, **kwargs):
+        student_id = request.session.get('student_id')
+        if student_id is None:
+            return JsonResponse({"errors": {"__all__": ["no student is selected"]}}, status=400)
+
+        form = FreeSlotForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+
+        free_slots = CalendarService().find_free_slots(
+            student_id, timedelta(minutes=form.cleaned_data["duration"]),
+            (form.cleaned_data["window_start"], form.cleaned_data["window_end"]),
+            limit=form.cleaned_data["limit"])
+
+        # the values are formatted like the fields of the time plan form expect them
+        return JsonResponse({"free_slots": [{
+            "from_date": free_slot.date.strftime("%Y-%m-%d"),
+            "from_time": free_slot.from_time.strftime("%H:%M"),
+            "until_date": free_slot.date.strftime("%Y-%m-%d"),
+            "until_time": free_slot.until_time.strftime("%H:%M"),
+        } for free_slot in free_slots]})
+
+
+class BookingImportView(View):
+    """
+    This view imports an uploaded iCalendar or csv file as bookings of the selected student
+    and returns the number of imported bookings and the rejected rows as json
+    """
+
+    def post(self, request, *args, **kwargs):
+        student_id = request.session.get('student_id')
+        uploaded_file = request.FILES.get("file")
+        if student_id is None or uploaded_file is None:
+            return JsonResponse({"errors": [{"line": 0, "error": "a student and a file are required"}]}, status=400)
+
+        # the file is read line by line, uploads above the memory limit are streamed from a temporary file
+        lines = io.TextIOWrapper(uploaded_file.file, encoding="utf-8-sig", errors="replace", newline="")
+        try:
+            reader = get_booking_reader(uploaded_file.name, lines)
+        except ValueError as error:
+            return JsonResponse({"errors": [{"line": 0, "error": str(error)}]}, status=400)
+
+        result = CalendarService().import_bookings(StudentService().get_student_for_id(student_id), reader,
+                                                   dry_run=request.POST.get("dry_run") == "1")
+        return JsonResponse({"imported": result.imported,
+                             "errors": [{"line": line, "error": error} for line, error in result.errors]})
+
+
+class CalendarFeedView(View):
+    """
+    This view streams the time plan of a student as iCalendar feed, the query parameters from and to
+    limit the feed to a range of days. Calendar clients poll the feed, so unchanged feeds are answered
+    with 304 Not Modified out of the cache versions without a database query
+    """
+
+    def get(self, request, student_id: int, *args, **kwargs):
+        form = CalendarFeedForm({"from_date": request.GET.get("from"), "to_date": request.GET.get("to")})
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+        start_minute = form.cleaned_data["start_minute"]
+        end_minute = form.cleaned_data["end_minute"]
+
+        etag = quote_etag(DashboardCache(student_id).get_etag("calendar-feed", start_minute, end_minute))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            student = StudentService().get_student_for_id(student_id)
+            if student is None:
+                raise Http404("student does not exist")
+
+            # the bookings are queried while the response is streamed
+            events = CalendarService().iter_calendar_feed_events(student_id, start_minute, end_minute)
+            response = StreamingHttpResponse(IcsFeedWriter(events, f"Time plan {student.name}"),
+                                             content_type="text/calendar; charset=utf-8")
+            response["Content-Disposition"] = f'inline; filename="time-plan-{student_id}.ics"'
+        response["ETag"] = etag
+
+        # the clients have to validate the feed on every poll
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class TranscriptExportView(View):
+    """
+    This view streams the transcripts of all students of a university within the admin panel,
+    the query parameter format selects csv or jsonl
+    """
+
+    def get(self, request, university_id: int, *args, **kwargs):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in TRANSCRIPT_FORMATS:
+            return JsonResponse({"errors": {"format": [
+                f"{export_format} is not one of {', '.join(TRANSCRIPT_FORMATS)}"]}}, status=400)
+        if not UniversityService().is_university_existing(university_id):
+            raise Http404("university does not exist")
+
+        # the rows are queried while the response is streamed
+        writer, content_type = TRANSCRIPT_FORMATS[export_format]
+        response = StreamingHttpResponse(writer(StudentService().iter_transcripts_for_university(university_id)),
+                                         content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="transcripts-{university_id}.{export_format}"'
+        return response
+
+
+class UniversityAnalyticsView(TemplateView):
+    """
+    This view shows the analytics of the courses, degrees and bookings of a university
+    """
+    template_name = "Dashboard/analytics.html"
+
+    def get_context_data(self, **kwargs):
+        university_id = kwargs["university_id"]
+        if not UniversityService().is_university_existing(university_id):
+            raise Http404("university does not exist")
+
+        # without numpy the page only shows a message
+        analytics = UniversityService().get_university_analytics(university_id) if is_analytics_available() else None
+        return {
+            **super().get_context_data(**kwargs),
+            "title": "Analytics",
+            "analytics": analytics,
+            "density_maximum": max(max(hours) for hours in analytics.booking_density) if analytics else 0,
+            "booking_density": list(zip(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
+                                        analytics.booking_density)) if analytics else [],
+            "hours": range(24),
+            "grade_bins": [f"{edge:.1f}" for edge in GRADE_BIN_EDGES[:-1]],
+            "progress_bins": [f"{number * 100 // PROGRESS_BINS}%" for number in range(PROGRESS_BINS)],
+        }
+
+
+class UniversityAnalyticsJsonView(View):
+    """
+    This view returns the analytics of a university as json
+    """
+
+    def get(self, request, university_id: int, *args, **kwargs):
+        if not UniversityService().is_university_existing(university_id):
+            raise Http404("university does not exist")
+        if not is_analytics_available():
+            return JsonResponse({"errors": {"__all__": ["the analytics require numpy, which is not installed"]}},
+                                status=503)
+
+        analytics = UniversityService().get_university_analytics(university_id)
+        return JsonResponse({
+            "university_id": analytics.university_id,
+            "university_name": analytics.university_name,
+            "created": analytics.created.isoformat(timespec="seconds"),
+            "grade_bins": GRADE_BIN_EDGES,
+            "courses": [{
+                "course_id": course.course_id,
+                "name": course.name,
+                "degree": course.degree_name,
+                "expected_hours": course.expected_hours,
+                "registrations": course.registrations,
+                "average_spent_hours": course.average_spent_hours,
+                "spent_ratio": course.spent_ratio,
+                "exam_attempts": course.exam_attempts,
+                "pass_rate": course.pass_rate,
+                "average_grade": course.average_grade,
+                "grade_distribution": course.grade_distribution,
+            } for course in analytics.courses],
+            "degrees": [{
+                "degree_id": degree.degree_id,
+                "name": degree.name,
+                "ects_goal": degree.ects_goal,
+                "students": degree.students,
+                "average_progress": degree.average_progress,
+                "median_progress": degree.median_progress,
+                "progress_distribution": degree.progress_distribution,
+            } for degree in analytics.degrees],
+            # booked hours per hour of the week, monday first
+            "booking_density": analytics.booking_density,
+        })
+
+
+class MetricsView(View):
+    """
+    This view exports the metrics of the dashboard in the Prometheus text format
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.export(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ProfileCaptureListView(TemplateView):
+    """
+    This view lists the recent profile captures within the admin panel
+    """
+    template_name = "Dashboard/profile_captures.html"
+
+    def get_context_data(self, **kwargs):
+        return {
+            **super().get_context_data(**kwargs),
+            **admin.site.each_context(self.request),
+            "title": "Profile captures",
+            "captures": list_captures(),
+        }
+
+
+class ProfileCaptureDownloadView(View):
+    """
+    This view returns a file of a profile capture
+    """
+
+    def get(self, request, file_name, *args, **kwargs):
+        path = get_capture_file(file_name)
+        if path is None:
+            raise Http404(f"capture {file_name} was not found")
+        return FileResponse(path.open("rb"), as_attachment=path.suffix == ".prof", filename=file_name)
@@ -40,12 +40,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "Dashboard.instrumentation.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "Dashboard.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "Dashboard.middleware.RequestLoaderMiddleware",
 ]
 
 ROOT_URLCONF = "DjangoSettings.urls"
@@ -120,3 +123,88 @@ STATICFILES_DIRS = (
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# the local memory cache is process local, deployments with multiple processes
+# must use a shared backend so that the dashboard versions are seen by all processes.
+# The booking indexes of the processes are only rebuilt if those versions change
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "dashboard",
+        "OPTIONS": {
+            "MAX_ENTRIES": 10000,
+        },
+    }
+}
+
+# Dashboard settings
+# number of courses shown per page in the course table of the dashboard
+DASHBOARD_COURSE_PAGE_SIZE = 25
+
+# seconds the sections of the dashboard are kept in the cache
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+# maximum number of students whose booking index is held in memory per process
+DASHBOARD_BOOKING_INDEX_SIZE = 1000
+
+# maximum number of sql queries per request for each view, exceeding views are logged as warning
+DASHBOARD_QUERY_BUDGETS = {
+    "DashboardView": 30,
+}
+
+# raise an exception instead of logging a warning if a budget is exceeded, should be enabled for tests
+DASHBOARD_QUERY_BUDGET_STRICT = False
+
+# add the query statistics of the request as X-Query-Stats response header
+DASHBOARD_QUERY_STATS_HEADER = DEBUG
+
+# directory for the profile captures of single requests, only the newest captures are kept
+DASHBOARD_PROFILE_DIR = BASE_DIR / "profiles"
+DASHBOARD_PROFILE_KEEP = 20
+
+# number of functions and allocation sites listed in the summary of a profile capture
+DASHBOARD_PROFILE_TOP_ENTRIES = 40
+
+# hours of the day in which free slots are suggested for new bookings and the number of days searched
+DASHBOARD_FREE_SLOT_HOURS = (8, 22)
+DASHBOARD_FREE_SLOT_DAYS = 14
+
+# directory for the results of the benchmark command
+DASHBOARD_BENCHMARK_DIR = BASE_DIR / "benchmarks"
+
+# maximum number of rows of a file that is imported as bookings
+DASHBOARD_IMPORT_MAX_ROWS = 20000
+
+# number of bookings fetched per query while the calendar feed is streamed
+DASHBOARD_FEED_CHUNK_SIZE = 2000
+
+# number of rows fetched per query while the transcripts of a university are exported
+DASHBOARD_EXPORT_CHUNK_SIZE = 2000
+
+# seconds the analytics of a university are cached, they contain the data of all students
+# and are not invalidated if the data of a single student changes
+DASHBOARD_ANALYTICS_TIMEOUT = 10 * 60
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        # the queries of each request are logged at DEBUG by Dashboard.instrumentation,
+        # exceeded query budgets are logged as warning
+        "Dashboard": {
+            "handlers": ["console"],
+            "level": "INFO",
+        },
+    },
+}
@@ -7,10 +7,21 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path
 
-from Dashboard.views import DashboardView
+from Dashboard.views import DashboardView, MetricsView, ProfileCaptureListView, ProfileCaptureDownloadView, \
+    FreeSlotView, BookingImportView, CalendarFeedView, TranscriptExportView, UniversityAnalyticsView, \
+    UniversityAnalyticsJsonView
 
 urlpatterns = [
+    path("admin/profiles/", admin.site.admin_view(ProfileCaptureListView.as_view())),
+    path("admin/profiles/<str:file_name>", admin.site.admin_view(ProfileCaptureDownloadView.as_view())),
+    path("admin/transcripts/<int:university_id>", admin.site.admin_view(TranscriptExportView.as_view())),
     path("admin/", admin.site.urls),
     path("", DashboardView.as_view()),
-    path("dashboard/", DashboardView.as_view())
+    path("dashboard/", DashboardView.as_view()),
+    path("dashboard/free-slots", FreeSlotView.as_view()),
+    path("dashboard/import", BookingImportView.as_view()),
+    path("dashboard/students/<int:student_id>/calendar.ics", CalendarFeedView.as_view()),
+    path("dashboard/universities/<int:university_id>/analytics", UniversityAnalyticsView.as_view()),
+    path("dashboard/universities/<int:university_id>/analytics.json", UniversityAnalyticsJsonView.as_view()),
+    path("metrics", MetricsView.as_view())
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)